@@ -11,6 +11,11 @@ from quotaion_module.servers.email_scrapper_server import router as email_router
 
 from quotaion_module.servers.price_scraper_withUpdate import router as price_router2
 from quotaion_module.servers.email_scraper_withUpdate import router as email_router2
+from quotaion_module.scrapper_common.driver_pool import get_driver_pool
+from quotaion_module.scrapper_common.strategy_store import flush_strategy_stores
+from quotaion_module.scrapper_common.llm_backends import configure_llm_backends
+from quotaion_module.price_scrapper.config import LLM_BACKEND as PRICE_LLM_BACKEND, STREAM_LLM_BACKEND as PRICE_STREAM_LLM_BACKEND
+from quotaion_module.email_scrapper.config import LLM_BACKEND as EMAIL_LLM_BACKEND
 
 
 
@@ -28,6 +33,21 @@ app.include_router(email_router, prefix="/email_router", tags=["Email Scrpper AP
 app.include_router(price_router2, prefix="/price_router2", tags=["Price Scrpper APIs"])
 app.include_router(email_router2, prefix="/email_router2", tags=["Email Scrpper APIs"])
 
+@app.on_event("startup")
+async def start_llm_backends():
+    # Build the LLM clients once, so requests share them and their connection pools
+    configure_llm_backends({
+        "price": [PRICE_LLM_BACKEND, PRICE_STREAM_LLM_BACKEND],
+        "email": [EMAIL_LLM_BACKEND],
+    })
+
+@app.on_event("shutdown")
+async def shutdown_scrapers():
+    # Quit the pooled Chrome browsers shared by the scrapers
+    get_driver_pool().close()
+    # Persist the fetch-strategy attempts recorded since the last periodic write
+    flush_strategy_stores()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Combined API!"}
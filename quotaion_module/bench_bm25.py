@@ -0,0 +1,98 @@
+"""
+Benchmark the sparse-matrix BM25 scorer against langchain's BM25Retriever.
+
+Builds a synthetic corpus of page-sized chunks and times building each retriever,
+answering queries, and answering queries from the long-lived chunk index.
+
+    python -m quotaion_module.bench_bm25 --chunks 2000 --chunk-words 1500 --queries 20
+"""
+import argparse
+import random
+import time
+
+from langchain.schema import Document
+from langchain_community.retrievers import BM25Retriever
+from quotaion_module.scrapper_common.bm25 import SparseBM25Retriever, tokenize
+from quotaion_module.scrapper_common.chunk_index import ChunkIndex
+
+PRODUCT_WORDS = ["iphone", "samsung", "galaxy", "price", "sar", "vat", "128gb", "256gb", "pro", "max", "case", "offer"]
+
+
+def make_corpus(n_chunks: int, chunk_words: int, vocabulary_size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(vocabulary_size)] + PRODUCT_WORDS * 20
+    return [
+        Document(
+            page_content=" ".join(rng.choices(words, k=chunk_words)),
+            metadata={"source": f"https://shop{i // 5}.example.com/item"}
+        )
+        for i in range(n_chunks)
+    ]
+
+
+def make_queries(n_queries: int, query_words: int, vocabulary_size: int, seed: int) -> list:
+    # Product queries mix a few listing words with model names and specs
+    rng = random.Random(seed + 1)
+    return [
+        " ".join(rng.sample(PRODUCT_WORDS, 3) + [f"word{rng.randrange(vocabulary_size)}" for _ in range(query_words - 3)])
+        for _ in range(n_queries)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--chunk-words", type=int, default=1500, help="About CHUNK_SIZE=10000 characters")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--query-words", type=int, default=8)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    documents = make_corpus(args.chunks, args.chunk_words, args.vocabulary, args.seed)
+    queries = make_queries(args.queries, args.query_words, args.vocabulary, args.seed)
+    print(f"{len(documents)} chunks of {args.chunk_words} words, {len(queries)} queries, k={args.k}")
+
+    def query_all(retriever):
+        return [retriever.get_relevant_documents(query) for query in queries]
+
+    # Same tokenizer for both, so the rankings are comparable
+    baseline, build = timed(lambda: BM25Retriever.from_documents(documents, preprocess_func=tokenize))
+    baseline.k = args.k
+    baseline_results, run = timed(lambda: query_all(baseline))
+    print(f"BM25Retriever        build {build:8.3f}s  query {run / len(queries) * 1000:9.2f}ms")
+
+    sparse, build = timed(lambda: SparseBM25Retriever.from_documents(documents))
+    sparse.k = args.k
+    sparse_results, run = timed(lambda: query_all(sparse))
+    print(f"SparseBM25Retriever  build {build:8.3f}s  query {run / len(queries) * 1000:9.2f}ms")
+
+    index = ChunkIndex("bench", max_chunks=len(documents))
+    _, build = timed(lambda: index.add_chunks(
+        [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+    ))
+    sources = list(dict.fromkeys(doc.metadata["source"] for doc in documents))
+    indexed = index.retriever(sources, k=args.k)
+    # The first query builds the request's matrix from the stored term counts
+    _, first = timed(lambda: indexed.get_relevant_documents(queries[0]))
+    _, run = timed(lambda: query_all(indexed))
+    print(f"ChunkIndex           add   {build:8.3f}s  query {run / len(queries) * 1000:9.2f}ms"
+          f"  (first query {first * 1000:.2f}ms)")
+
+    # rank_bm25 floors negative idf differently, so compare the top-k sets rather than exact order
+    overlap = [
+        len({doc.page_content for doc in a} & {doc.page_content for doc in b}) / max(len(a), 1)
+        for a, b in zip(baseline_results, sparse_results)
+    ]
+    print(f"Top-{args.k} overlap with BM25Retriever: {sum(overlap) / len(overlap):.1%}")
+
+
+if __name__ == "__main__":
+    main()
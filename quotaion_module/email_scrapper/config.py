@@ -23,13 +23,59 @@ ALLOWED_DOMAINS = [
     "electroon"
 ]
 
-# Chunking settings
-CHUNK_SIZE = 1500000000
-CHUNK_OVERLAP = 0
-
-# Selenium Chrome options (if you wish to customize further)
-CHROME_OPTIONS = [
-    "--headless",  # Run in headless mode
-    "--no-sandbox",
-    "--disable-dev-shm-usage"
-]
\ No newline at end of file
+# A page fetched over plain HTTP is only used if it shows an email address;
+# otherwise the fetch escalates to the browser, then to ZenRows
+EMAIL_SIGNAL_PATTERN = r"mailto:|[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+
+# HTML cleaning rules applied before markdown conversion (see scrapper_common/html_cleaner.py)
+# Footers are kept: contact emails usually live there
+CLEAN_HTML_ENABLED = os.getenv("CLEAN_HTML_ENABLED", "true").lower() == "true"
+CLEAN_RULES = {
+    "tags": ["header", "img", "video", "audio"],
+    "classes": ["ad", "advertisement", "ad-banner", "ad-overlay", "ads",
+                "comments", "comment-box", "review", "reviews", "user-comments", "feedback"],
+    "ids": ["ad", "advertisement", "ad-banner", "ad-overlay", "ads"],
+    "href_patterns": ["javascript:void(0)", "/-/en/"],
+    # UI labels: single words only blank a text that is exactly the label, phrases
+    # match as whole words (see CleanRules). Generic words such as "Video" or "Play"
+    # would hit product names ("Video Doorbell", "PlayStation"), so they are not listed.
+    "text_keywords": [
+        "Play Video", "Mute", "Submit Review", "Post Comment", "Leave a Comment",
+        "Unable to add item to List", "The video showcases", "The video guides",
+        "Chapters", "Descriptions"
+    ]
+}
+
+# Main-content extraction applied after cleaning (see scrapper_common/content_extractor.py).
+# Contact regions are kept whole, and any block showing an email address is kept even
+# when it looks like page chrome (footers usually carry the contact email). Links
+# without an address are dropped even one at a time.
+MAIN_CONTENT_ENABLED = os.getenv("MAIN_CONTENT_ENABLED", "true").lower() == "true"
+# Log what main-content extraction removed from each page (debug output).
+MAIN_CONTENT_REPORT = os.getenv("MAIN_CONTENT_REPORT", "false").lower() == "true"
+MAIN_CONTENT_PROFILE = {
+    "keep_hints": ["contact", "email", "mail", "address", "support", "customer-service"],
+    "keep_pattern": EMAIL_SIGNAL_PATTERN,
+    "keep_hrefs": ["mailto:"],
+    "min_links": 1,
+    "signal_overrides_hints": True
+}
+
+# Chunking settings. Chunks are measured in model tokens and sized to fill the LLM's
+# context window next to the prompt and the answer (see scrapper_common/chunker.py)
+LLM_CONTEXT_TOKENS = int(os.getenv("EMAIL_LLM_CONTEXT_TOKENS", "8192"))    # llama3-8b-8192
+LLM_RESPONSE_TOKENS = int(os.getenv("EMAIL_LLM_RESPONSE_TOKENS", "1000"))  # Room left for the JSON answer
+CHUNK_OVERLAP_TOKENS = int(os.getenv("EMAIL_CHUNK_OVERLAP_TOKENS", "0"))
+
+# LLM backend of both routes: "groq" or "fake" (see scrapper_common/llm_backends.py)
+LLM_BACKEND = os.getenv("EMAIL_LLM_BACKEND", "groq")
+
+# Chunks are searched for addresses with a regex, not sent to the LLM, so there is no
+# depth cut (scrapper_common/retrieval_depth.py): the top RETRIEVAL_MAX_K chunks for
+# this contact query are all scanned. Words are matched as BM25 tokens, so an address
+# like sales@example.com counts as "sales", "example" and "com".
+RETRIEVAL_QUERY = "email mail contact contacts sales info support enquiries inquiries com sa"
+RETRIEVAL_MAX_K = int(os.getenv("EMAIL_RETRIEVAL_MAX_K", "40"))
+
+# Selenium Chrome options are shared by both scrapers through the driver pool
+# (see quotaion_module/scrapper_common/config.py)
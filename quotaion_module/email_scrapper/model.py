@@ -2,21 +2,56 @@ import json
 import re
 from langchain.schema import Document
 from langchain_groq import ChatGroq
+from quotaion_module.scrapper_common.text_normalizer import find_emails
+from quotaion_module.scrapper_common.llm_cache import LLMCache, llm_identity
+from quotaion_module.scrapper_common.llm_backends import FakeChatModel, load_fake_responses, register_backend
+from quotaion_module.scrapper_common.config import LLM_TIMEOUTS, LLM_MAX_RETRIES
+from quotaion_module.email_scrapper.config import LLM_API_KEY
+
+# Version of build_prompt and the routes' query prompt, part of every LLM cache key.
+# Bump it whenever either changes so answers cached for the old prompt are not reused.
+PROMPT_VERSION = "1"
 
 def initialize_llm(api_key: str, temperature: int = 0, model_name: str = "llama3-8b-8192") -> ChatGroq:
     """
     Initialize and return the ChatGroq LLM instance.
     """
-    return ChatGroq(groq_api_key=api_key, temperature=temperature, model_name=model_name)
+    return ChatGroq(groq_api_key=api_key, temperature=temperature, model_name=model_name,
+                    request_timeout=LLM_TIMEOUTS["groq"], max_retries=LLM_MAX_RETRIES)
+
+
+register_backend("email", "groq", "groq", lambda: initialize_llm(api_key=LLM_API_KEY))
+register_backend("email", "fake", "fake", lambda: FakeChatModel(load_fake_responses(["No email addresses found."])))
+
+def build_prompt(query_prompt: str, context: str, metadata: dict) -> str:
+    """
+    Build the prompt sent to the LLM for one chunk.
+    """
+    return f"""
+Query: {query_prompt}
+Context: {context}
+Metadata: {metadata}
+Provide the most accurate and concise response based on the context and query:
+"""
 
-def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq) -> list:
+def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq, cache: LLMCache = None) -> list:
     """
-    Process the query across document chunks using the LLM.
+    Process the query across document chunks using the LLM, reusing answers from the
+    cache (see get_llm_cache) when one is given.
     """
     responses = []
+    # This function words its prompt differently from build_prompt, so it keys its own answers
+    cache_keys = cache.keys_for(
+        llm, f"chunks-{PROMPT_VERSION}", query, [[(chunk["page_content"], chunk["metadata"])] for chunk in chunked_docs]
+    ) if cache else None
     for i, chunk in enumerate(chunked_docs):
         context = chunk["page_content"]
         metadata = chunk["metadata"]
+        if cache:
+            cached = cache.get(cache_keys[i])
+            if cached is not None:
+                responses.append({"response": cached, "metadata": metadata})
+                continue
         prompt_with_context = f"""
         Query: {query}
         Context: {context}
@@ -26,6 +61,8 @@ def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq) -
         try:
             response = llm.invoke(prompt_with_context)
             responses.append({"response": response.content, "metadata": metadata})
+            if cache:
+                cache.put(cache_keys[i], response.content, llm_identity(llm)[0])
         except Exception as e:
             print(f"Error processing chunk {i + 1}: {e}")
     return responses
@@ -63,17 +100,16 @@ def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq) -
 
 def extract_email_data(responses: list) -> list:
     """
-    Extracts email addresses from LLM responses by scraping text using regex.
+    Extracts email addresses from LLM responses by scraping text using the
+    precompiled email matcher.
     """
-    # Define a regex pattern for matching email addresses
-    email_regex = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
     final_data = []
 
     # Loop through each response
     for res in responses:
         text = res["response"]
-        # Use regex to find all email addresses in the text
-        emails = re.findall(email_regex, text)
+        # Find all email addresses in the text
+        emails = find_emails(text)
         # Retrieve the source from metadata; default to "Unknown" if not provided
         source = res["metadata"].get("source", "Unknown")
         for email in emails:
@@ -23,13 +23,179 @@ ALLOWED_DOMAINS = [
     "electroon"
 ]
 
-# Chunking settings
-CHUNK_SIZE = 10000
-CHUNK_OVERLAP = 500
-
-# Selenium Chrome options (if you wish to customize further)
-CHROME_OPTIONS = [
-    "--headless",  # Run in headless mode
-    "--no-sandbox",
-    "--disable-dev-shm-usage"
-]
+# A page fetched over plain HTTP is only used if it shows a price somewhere;
+# otherwise the fetch escalates to the browser, then to ZenRows
+PRICE_SIGNAL_PATTERN = r"(?:SAR|USD|AED|\$|ر\.س|ريال)\s?\d[\d,]*|\d[\d,]*(?:\.\d+)?\s?(?:SAR|USD|AED|ر\.س|ريال)"
+
+# HTML cleaning rules applied before markdown conversion (see scrapper_common/html_cleaner.py)
+CLEAN_HTML_ENABLED = os.getenv("CLEAN_HTML_ENABLED", "true").lower() == "true"
+CLEAN_RULES = {
+    "tags": ["header", "footer", "img", "video", "audio"],
+    "classes": ["ad", "advertisement", "ad-banner", "ad-overlay", "ads",
+                "comments", "comment-box", "review", "reviews", "user-comments", "feedback"],
+    "ids": ["ad", "advertisement", "ad-banner", "ad-overlay", "ads"],
+    "href_patterns": ["javascript:void(0)", "/-/en/"],
+    # UI labels: single words only blank a text that is exactly the label, phrases
+    # match as whole words (see CleanRules). Generic words such as "Video" or "Play"
+    # would hit product names ("Video Doorbell", "PlayStation"), so they are not listed.
+    "text_keywords": [
+        "Play Video", "Mute", "Submit Review", "Post Comment", "Leave a Comment",
+        "Unable to add item to List", "The video showcases", "The video guides",
+        "Chapters", "Descriptions"
+    ]
+}
+
+# Main-content extraction applied after cleaning (see scrapper_common/content_extractor.py).
+# Product and offer regions are kept whole; other blocks survive only if they show a
+# price or read as content rather than navigation.
+MAIN_CONTENT_ENABLED = os.getenv("MAIN_CONTENT_ENABLED", "true").lower() == "true"
+# Log what main-content extraction removed from each page (debug output).
+MAIN_CONTENT_REPORT = os.getenv("MAIN_CONTENT_REPORT", "false").lower() == "true"
+MAIN_CONTENT_PROFILE = {
+    "keep_hints": ["product", "offer", "price", "buybox", "buy-box", "add-to-cart",
+                   "pdp", "sku", "search-result", "s-result"],
+    "keep_pattern": PRICE_SIGNAL_PATTERN
+}
+
+# Structured-data fast path (see scrapper_common/structured_data.py). Product records
+# read from a page's JSON-LD, microdata or OpenGraph tags are used directly, and a page
+# whose records all have these fields skips the LLM.
+STRUCTURED_DATA_ENABLED = os.getenv("STRUCTURED_DATA_ENABLED", "true").lower() == "true"
+STRUCTURED_REQUIRED_FIELDS = ["product_name", "price", "currency"]
+
+# Per-site XPath extractors (see scrapper_common/site_plugins.py), keyed like ALLOWED_DOMAINS.
+# A page whose plugin returns complete records skips the LLM; otherwise it falls back to
+# structured data and then the LLM. "items" may match search-result cards or the product
+# block of a detail page.
+SITE_PLUGINS_ENABLED = os.getenv("SITE_PLUGINS_ENABLED", "true").lower() == "true"
+SITE_PLUGIN_FAILURE_ALERT = int(os.getenv("SITE_PLUGIN_FAILURE_ALERT", "3"))  # Warn after this many failures in a row
+SITE_PLUGINS = {
+    "amazon": {
+        "items": "//div[@data-component-type='s-search-result'] | //div[@id='dp-container']",
+        "fields": {
+            "product_name": [".//span[@id='productTitle']", ".//h2//span"],
+            "price": [
+                ".//div[@id='corePrice_feature_div']//span[contains(@class, 'a-price')]/span[@class='a-offscreen']",
+                ".//div[@id='corePriceDisplay_desktop_feature_div']//span[contains(@class, 'a-price')]/span[@class='a-offscreen']",
+                ".//span[contains(@class, 'a-price')]/span[@class='a-offscreen']"
+            ],
+            "vendor_name": [".//a[@id='sellerProfileTriggerId']", ".//div[@id='merchant-info']//a/span"],
+            "customer_rating": [".//span[@id='acrPopover']/@title", ".//span[@class='a-icon-alt']"]
+        },
+        "defaults": {"currency": "SAR", "vendor_name": "Amazon.sa"}
+    },
+    "ebay": {
+        "items": "//li[contains(@class, 's-item')][.//span[contains(@class, 's-item__price')]] | //div[@id='mainContent']",
+        "fields": {
+            "product_name": [".//h1[contains(@class, 'x-item-title__mainTitle')]//span",
+                             ".//div[contains(@class, 's-item__title')]//span"],
+            "price": [".//div[contains(@class, 'x-price-primary')]//span", ".//span[contains(@class, 's-item__price')]"],
+            "vendor_name": [".//div[contains(@class, 'x-sellercard-atf__info__about-seller')]//span",
+                            ".//span[contains(@class, 's-item__seller-info-text')]"]
+        },
+        "defaults": {"currency": "USD", "vendor_name": "eBay"}
+    },
+    "bestbuy": {
+        "items": "//li[contains(@class, 'sku-item')] | //div[contains(@class, 'shop-product-title')]/..",
+        "fields": {
+            "product_name": [".//h4[contains(@class, 'sku-title')]//a", ".//div[contains(@class, 'sku-title')]//h1"],
+            "price": ".//div[contains(@class, 'priceView-customer-price')]/span[1]",
+            "customer_rating": ".//div[contains(@class, 'c-ratings-reviews')]//p[contains(@class, 'visually-hidden')]"
+        },
+        "defaults": {"currency": "USD", "vendor_name": "Best Buy"}
+    },
+    "noon": {
+        "items": "//div[@data-qa='product-block'] | //h1[@data-qa='pdp-name']/ancestor::div[2]",
+        "fields": {
+            "product_name": [".//h1[@data-qa='pdp-name']", ".//div[@data-qa='product-name']/@title",
+                             ".//div[@data-qa='product-name']"],
+            "price": [".//div[@data-qa='div-price-now']", ".//strong[contains(@class, 'amount')]"],
+            "currency": ".//span[contains(@class, 'currency')]",
+            "vendor_name": ".//a[contains(@href, '/seller/')]"
+        },
+        "defaults": {"currency": "SAR", "vendor_name": "noon"}
+    },
+    "jarir": {
+        "items": "//div[contains(@class, 'product-tile')] | //div[contains(@class, 'product-info-main')]",
+        "fields": {
+            "product_name": [".//p[contains(@class, 'product-title__title')]", ".//h1[contains(@class, 'page-title')]//span"],
+            "price": [".//span[@data-price-type='finalPrice']//span[@class='price']",
+                      ".//span[contains(@class, 'price__currency')]/.."]
+        },
+        "defaults": {"currency": "SAR", "vendor_name": "Jarir"}
+    },
+    # Magento / WooCommerce storefronts
+    "shareefcorner": {
+        "items": "//li[contains(@class, 'product-item')] | //li[contains(@class, 'type-product')] | //div[contains(@class, 'product-info-main')]",
+        "fields": {
+            "product_name": [".//a[contains(@class, 'product-item-link')]", ".//h1[contains(@class, 'page-title')]//span",
+                             ".//h2[contains(@class, 'woocommerce-loop-product__title')]"],
+            "price": [".//span[@data-price-type='finalPrice']//span[@class='price']",
+                      ".//ins//span[contains(@class, 'woocommerce-Price-amount')]",
+                      ".//span[contains(@class, 'woocommerce-Price-amount')]"]
+        },
+        "defaults": {"currency": "SAR", "vendor_name": "Shareef Corner"}
+    },
+    "electroon": {
+        "items": "//li[contains(@class, 'product-item')] | //li[contains(@class, 'type-product')] | //div[contains(@class, 'product-info-main')]",
+        "fields": {
+            "product_name": [".//a[contains(@class, 'product-item-link')]", ".//h1[contains(@class, 'page-title')]//span",
+                             ".//h2[contains(@class, 'woocommerce-loop-product__title')]"],
+            "price": [".//span[@data-price-type='finalPrice']//span[@class='price']",
+                      ".//ins//span[contains(@class, 'woocommerce-Price-amount')]",
+                      ".//span[contains(@class, 'woocommerce-Price-amount')]"]
+        },
+        "defaults": {"currency": "SAR", "vendor_name": "Electroon"}
+    }
+}
+
+# Chunking settings. Chunks are measured in model tokens and sized to fill the LLM's
+# context window next to the prompt and the answer (see scrapper_common/chunker.py)
+LLM_CONTEXT_TOKENS = int(os.getenv("PRICE_LLM_CONTEXT_TOKENS", "20000"))   # num_ctx passed to Ollama
+LLM_RESPONSE_TOKENS = int(os.getenv("PRICE_LLM_RESPONSE_TOKENS", "2000"))  # Room left for the JSON answer
+CHUNK_OVERLAP_TOKENS = int(os.getenv("PRICE_CHUNK_OVERLAP_TOKENS", "100"))
+# Short chunks share one LLM call up to the context budget (see scrapper_common/prompt_packing.py);
+# more chunks per call means a longer answer, so keep LLM_RESPONSE_TOKENS in step
+PACK_MAX_CHUNKS = int(os.getenv("PACK_MAX_CHUNKS", "4"))
+
+# How the LLM answers: "schema" constrains decoding to the ProductList JSON schema (Ollama
+# `format`, Groq JSON mode) so every answer parses; "text" is free-form text, parsed with
+# the regex/salvage fallback as before
+LLM_OUTPUT_MODE = os.getenv("LLM_OUTPUT_MODE", "schema")
+
+# LLM backend of each route: "groq", "ollama" or "fake" (canned answers, for offline load
+# tests; see scrapper_common/llm_backends.py)
+LLM_BACKEND = os.getenv("PRICE_LLM_BACKEND", "ollama")                # POST /search
+STREAM_LLM_BACKEND = os.getenv("PRICE_STREAM_LLM_BACKEND", "groq")    # Streaming GET /search
+
+# Price-signal prefilter between BM25 retrieval and the LLM (see scrapper_common/chunk_signals.py).
+# BM25 retrieves PRICE_SIGNAL_POOL times as many chunks as the LLM stage takes; chunks
+# scoring below PRICE_SIGNAL_MIN_SCORE (no price evidence) are dropped and the rest are
+# ranked by BM25 and signal score combined. A lone amount scores about 1.4, a lone
+# currency mention or cart button about 0.7.
+PRICE_SIGNALS_ENABLED = os.getenv("PRICE_SIGNALS_ENABLED", "true").lower() == "true"
+PRICE_SIGNALS = {
+    "currency": {"pattern": r"(?<![A-Za-z])(?:SAR|USD|AED|EUR|GBP)(?![A-Za-z])|ر\.س|ريال|[$€£]", "weight": 1.0},
+    "amount": {"pattern": PRICE_SIGNAL_PATTERN, "weight": 2.0},
+    "cart": {"pattern": r"add to (?:cart|basket|bag)|buy now|أضف إلى السلة|اشتر الآن", "weight": 1.0},
+    "vat": {"pattern": r"(?<![A-Za-z])VAT(?![A-Za-z])|incl(?:\.|uding|usive of)? (?:tax|vat)|ضريبة", "weight": 0.5},
+}
+PRICE_SIGNAL_MIN_SCORE = float(os.getenv("PRICE_SIGNAL_MIN_SCORE", "1.0"))
+PRICE_SIGNAL_WEIGHT = float(os.getenv("PRICE_SIGNAL_WEIGHT", "0.3"))  # Share of the signal score in the ranking
+PRICE_SIGNAL_POOL = int(os.getenv("PRICE_SIGNAL_POOL", "3"))
+
+# Most chunks each route ranks and may send to the LLM
+RETRIEVAL_MAX_K = int(os.getenv("PRICE_RETRIEVAL_MAX_K", "50"))                # POST /search
+STREAM_RETRIEVAL_MAX_K = int(os.getenv("PRICE_STREAM_RETRIEVAL_MAX_K", "20"))  # GET /search (streaming)
+
+# How many ranked chunks go to the LLM, below the route's maximum
+# (see scrapper_common/retrieval_depth.py and RETRIEVAL_DEPTH_MODE)
+RETRIEVAL_DEPTH = {
+    "min_k": 3,
+    "min_relative_score": 0.25,
+    "knee": True,
+    "source_cap": 6
+}
+
+# Selenium Chrome options are shared by both scrapers through the driver pool
+# (see quotaion_module/scrapper_common/config.py)
@@ -1,32 +1,232 @@
 import json
 import re
-from langchain.schema import Document
+from langchain.schema import Document, HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
 from langchain_ollama import ChatOllama
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from quotaion_module.price_scrapper.config import (
+    STRUCTURED_REQUIRED_FIELDS,
+    PRICE_SIGNALS_ENABLED,
+    PRICE_SIGNALS,
+    PRICE_SIGNAL_MIN_SCORE,
+    PRICE_SIGNAL_WEIGHT,
+    PRICE_SIGNAL_POOL,
+    PACK_MAX_CHUNKS,
+    LLM_OUTPUT_MODE,
+    LLM_API_KEY,
+    LLM_CONTEXT_TOKENS,
+)
+from quotaion_module.scrapper_common.config import OLLAMA_BASE_URL, LLM_TIMEOUTS, LLM_MAX_RETRIES
+from quotaion_module.scrapper_common.structured_data import is_complete
+from quotaion_module.scrapper_common.chunk_signals import SignalScorer, rerank_by_signals
+from quotaion_module.scrapper_common.llm_cache import LLMCache, llm_identity
+from quotaion_module.scrapper_common.chunker import count_tokens
+from quotaion_module.scrapper_common.prompt_packing import tag_document, pack_chunks
+from quotaion_module.scrapper_common.page_cache import canonical_url
+from quotaion_module.scrapper_common.llm_backends import FakeChatModel, load_fake_responses, register_backend
+
+_price_signals = SignalScorer(PRICE_SIGNALS)
+
+# Version of EXTRACTION_INSTRUCTIONS and build_messages, part of every LLM cache key.
+# Bump it whenever either changes so answers cached for the old prompt are not reused.
+PROMPT_VERSION = "3"
+
+# Extraction instructions, identical for every call. They go first, as the system
+# message, so Ollama (and providers with prompt caching) can reuse the prefix.
+EXTRACTION_INSTRUCTIONS = '''
+Extract details of the product named in the query from the provided documents. If any information is incomplete, ambiguous, or missing, do not guess or fabricate details. Only include information that you are confident is accurate and complete. Provide the results in **JSON format** with the following specifications:
+
+### Fields:
+1. **"product_name"**: The full and properly formatted name of the product, including brand and relevant specifications. Avoid truncation or abbreviation. Exclude any entries where the product name is incomplete or unclear.
+2. **"price"**: The exact total price of the product should be represented as a decimal number, reflecting the complete, one-time cost. **Do not include any monthly installment, financing, or partial payment amounts.** Ensure the number is preserved as it is without currency symbols, commas, or any other formatting characters.
+3. **"currency"**: The currency in which the price is denominated, extracted from the document.
+4. **"vat_status"**: A string indicating whether the price is after vat or before vat. Only include this field if the document explicitly provides this information.
+5. **"payment_type"**: A string that indicates whether the payment is a "one time payment" or an "installment", based on explicit information in the document. If the payment type is not explicitly provided, do not include this field.
+6. **"vendor_name"**: The name of the vendor selling the product, exactly as provided in the document. Exclude this field if the vendor name is incomplete or not explicitly stated.
+7. **"features_of_product"**: Details on the features of the product as provided in the document. Include this field only if the information is complete and reliable.
+8. **"source"**: The URL of the document from which the product details were extracted.
+9. **"customer_rating"**: The customer rating for the product as provided in the document. Include this field only if the information is explicitly stated and complete.
+
+
+### Output Style:
+{
+    "products": [
+        {
+            "product_name": "Full product name with accurate details",
+            "price": price,
+            "currency": "Currency code (e.g., USD, SAR)",
+            "vat_status": "after vat / before vat",
+            "payment_type": "one time payment / installment",
+            "vendor_name": "Vendor name as per document",
+            "features_of_product": "Product features details, if provided",
+            "source": "URL of the document",
+            "customer_rating": "Customer rating details if available"
+        },
+        {
+            "product_name": "Another valid product name",
+            "price": price,
+            "currency": "Currency code (e.g., USD, SAR)",
+            "vat_status": "after vat / before vat",
+            "payment_type": "one time payment / installment",
+            "vendor_name": "Vendor name as per document",
+            "features_of_product": "Product features details, if provided",
+            "source": "URL of the document",
+            "customer_rating": "Customer rating details if available"
+        }
+    ]
+}
+
+### Important Notes:
+1. Extract data strictly based on the provided document chunks. Do not infer or create information beyond what is present.
+2. Include entries only when all fields are complete and reliable.
+3. Properly format product names with capitalization and full details.
+4. For the "price" field, ensure that only the full product price is provided, excluding any installment or financing details.
+5. For the "currency" field, use the currency explicitly mentioned in the document.
+6. For the "vat_status" field, extract the information indicating if the price is before vat or after vat as stated in the document. If not explicitly stated, do not include this field.
+7. For the "payment_type" field, determine if the payment method is one time payment or installment as explicitly mentioned in the document. If not explicitly mentioned, do not include this field.
+8. For the "vendor_name" field, include the vendor name exactly as it appears in the document if it is complete and reliable.
+9. For the "product_quality_review" field, include product review or quality information only if it is explicitly provided and complete.
+10. For the "source" field, use the source URL of the <document> tag the product was found in. Several documents may be given; attribute each product to its own document.
+11. If no valid information is available, output {"products": []}.
+'''
+
+
+class ProductRecord(BaseModel):
+    """
+    One product in an LLM answer; the fields process_product reads. Fields the
+    instructions say to leave out when the document does not state them are optional.
+    """
+    product_name: str
+    price: float
+    currency: str
+    vat_status: Optional[str] = None
+    payment_type: Optional[str] = None
+    vendor_name: Optional[str] = None
+    features_of_product: Optional[str] = None
+    source: str
+    customer_rating: Optional[str] = None
+
+
+class ProductList(BaseModel):
+    """
+    A whole LLM answer. JSON mode needs an object at the top level, so the products
+    are wrapped rather than sent as a bare array.
+    """
+    products: List[ProductRecord]
 
 
 def initialize_llm(api_key: str, temperature: int = 0, model_name: str = "qwen-2.5-32b") -> ChatGroq:
     """
-    Initialize and return the ChatGroq LLM instance.
+    Initialize and return the ChatGroq LLM instance. In schema output mode it answers
+    in JSON mode (valid JSON, checked against ProductList on parsing).
     """
-    return ChatGroq(groq_api_key=api_key, temperature=temperature, model_name=model_name)
+    model_kwargs = {"response_format": {"type": "json_object"}} if LLM_OUTPUT_MODE == "schema" else {}
+    return ChatGroq(groq_api_key=api_key, temperature=temperature, model_name=model_name, model_kwargs=model_kwargs,
+                    request_timeout=LLM_TIMEOUTS["groq"], max_retries=LLM_MAX_RETRIES)
 
 
-def initialize_llm_ollam(base_url: str = "http://127.0.0.1:11435", temperature: int = 0, model: str = "qwen2.5:14b") -> ChatOllama:
+def initialize_llm_ollam(base_url: str = OLLAMA_BASE_URL, temperature: int = 0, model: str = "qwen2.5:14b",
+                         num_ctx: int = LLM_CONTEXT_TOKENS) -> ChatOllama:
     """
-    Initialize and return the ChatOllama LLM instance.
+    Initialize and return the ChatOllama LLM instance. In schema output mode its
+    decoding is constrained to the ProductList JSON schema.
     """
-     # Set context window to 32768 tokens
-    return ChatOllama(base_url=base_url, model=model, temperature=temperature)
+    output_format = ProductList.model_json_schema() if LLM_OUTPUT_MODE == "schema" else None
+    return ChatOllama(base_url=base_url, model=model, temperature=temperature, format=output_format,
+                      num_ctx=num_ctx, client_kwargs={"timeout": LLM_TIMEOUTS["ollama"]})
 
-def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq) -> list:
+
+# Canned answers of the fake backend: one product (its source falls back to the call's
+# best source) and nothing found, so load tests exercise both paths of extraction
+FAKE_ANSWERS = [
+    json.dumps({"products": [{
+        "product_name": "Fake Phone 15 Pro 256GB", "price": 4999, "currency": "SAR",
+        "vat_status": "after vat", "vendor_name": "Fake Store", "source": ""
+    }]}),
+    json.dumps({"products": []}),
+]
+
+register_backend("price", "groq", "groq", lambda: initialize_llm(api_key=LLM_API_KEY))
+register_backend("price", "ollama", "ollama", initialize_llm_ollam)
+register_backend("price", "fake", "fake", lambda: FakeChatModel(load_fake_responses(FAKE_ANSWERS)))
+
+def build_messages(query_prompt: str, documents: list) -> list:
     """
-    Process the query across document chunks using the LLM.
+    Build the messages for one LLM call: the static extraction instructions as the
+    system message, then the query and the tagged documents.
+
+    Args:
+        query_prompt (str): What to extract, e.g. "Extract details of iphone 15".
+        documents (list): (context, metadata) pairs sent together in this call.
+    """
+    tagged = "\n\n".join(tag_document(context, metadata) for context, metadata in documents)
+    return [
+        SystemMessage(content=EXTRACTION_INSTRUCTIONS),
+        HumanMessage(content=f"""
+Query: {query_prompt}
+Documents:
+{tagged}
+Provide the most accurate and concise response based on the documents and query:
+"""),
+    ]
+
+
+def count_message_tokens(messages: list) -> int:
+    return sum(count_tokens(message.content) for message in messages)
+
+
+def build_llm_requests(query_prompt: str, chunks: list, context_tokens: int, response_tokens: int) -> list:
+    """
+    Pack the retrieved chunks into LLM calls. Short chunks share a call, up to
+    PACK_MAX_CHUNKS and the context window left after the instructions, the query and
+    the answer; each keeps its own source tag for attribution.
+
+    Args:
+        chunks (list): Retrieved Documents, best first.
+
+    Returns:
+        list: (messages, metadata) per call, in rank order. metadata["source"] is the
+            best chunk's source, metadata["sources"] every source in the call,
+            metadata["documents"] its (content, metadata) chunks (what its cache key
+            is computed from) and metadata["chunks"] how many it packs.
+    """
+    overhead = count_message_tokens(build_messages(query_prompt, []))
+    costs = [count_tokens(tag_document(chunk.page_content, chunk.metadata)) for chunk in chunks]
+    requests = []
+    for pack in pack_chunks(costs, context_tokens - response_tokens - overhead, PACK_MAX_CHUNKS):
+        documents = [(chunks[i].page_content, chunks[i].metadata) for i in pack]
+        sources = []
+        for _, metadata in documents:
+            for source in metadata.get("sources") or [metadata["source"]]:
+                if source not in sources:
+                    sources.append(source)
+        requests.append((
+            build_messages(query_prompt, documents),
+            {"source": sources[0], "sources": sources, "documents": documents, "chunks": len(pack)}
+        ))
+    print(f"Packed {len(chunks)} chunks into {len(requests)} LLM calls")
+    return requests
+
+def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq, cache: LLMCache = None) -> list:
+    """
+    Process the query across document chunks using the LLM, reusing answers from the
+    cache (see get_llm_cache) when one is given.
     """
     responses = []
+    # This function words its prompt differently from build_messages, so it keys its own answers
+    cache_keys = cache.keys_for(
+        llm, f"chunks-{PROMPT_VERSION}", query, [[(chunk["page_content"], chunk["metadata"])] for chunk in chunked_docs],
+        output_mode=LLM_OUTPUT_MODE
+    ) if cache else None
     for i, chunk in enumerate(chunked_docs):
         context = chunk["page_content"]
         metadata = chunk["metadata"]
+        if cache:
+            cached = cache.get(cache_keys[i])
+            if cached is not None:
+                responses.append({"response": cached, "metadata": metadata})
+                continue
         prompt_with_context = f"""
         Query: {query}
         Context: {context}
@@ -36,6 +236,8 @@ def process_query_across_chunks(query: str, chunked_docs: list, llm: ChatGroq) -
         try:
             response = llm.invoke(prompt_with_context)
             responses.append({"response": response.content, "metadata": metadata})
+            if cache:
+                cache.put(cache_keys[i], response.content, llm_identity(llm)[0])
         except Exception as e:
             print(f"Error processing chunk {i + 1}: {e}")
     return responses
@@ -61,7 +263,12 @@ def process_product(product: dict, metadata: str = None) -> dict:
     product_name = product.get("product_name", "Null ")
     price = product.get("price", "Null ")
     currency = product.get("currency", "Null ")
-    source = product.get("source", metadata["source"])
+    source = product.get("source") or metadata["source"]
+    # Calls can carry several documents; map the model's URL back to the one it was given,
+    # and fall back to the call's best source for a URL it was not given
+    if metadata.get("sources") and source not in metadata["sources"]:
+        given = {canonical_url(url): url for url in metadata["sources"]}
+        source = given.get(canonical_url(str(source)), metadata["source"])
     vat_status = product.get("vat_status", "Null ")
     payment_type = product.get("payment_type", "Null ")
     features_of_product = product.get("features_of_product", "Null ")
@@ -93,44 +300,191 @@ def process_product(product: dict, metadata: str = None) -> dict:
 
 
 
-def extract_product_data(responses: list) -> list:
+def take_structured_products(documents: list) -> tuple:
+    """
+    Separates pages whose embedded structured data (JSON-LD, microdata, OpenGraph)
+    already gives complete product records from the pages that still need the LLM.
+    The records are removed from each document's metadata either way.
+
+    Args:
+        documents (list): The fetched Documents.
+
+    Returns:
+        tuple: (products, llm_documents). products are the normalized records from
+            complete pages; llm_documents are the pages to chunk and send to the LLM.
+    """
+    products = []
+    llm_documents = []
+    for doc in documents:
+        records = doc.metadata.pop("structured_products", None) or []
+        if records and all(is_complete(record, STRUCTURED_REQUIRED_FIELDS) for record in records):
+            for record in records:
+                processed_product = process_product(record, doc.metadata)
+                if processed_product is not None:
+                    products.append(processed_product)
+        else:
+            llm_documents.append(doc)
+    if products:
+        print(f"Structured data gave {len(products)} products from {len(documents) - len(llm_documents)} pages, skipping the LLM for them")
+    return products, llm_documents
+
+
+def retrieve_price_chunks(retriever, query: str) -> tuple:
+    """
+    Rank the chunks that may go to the LLM. With the price-signal prefilter on, the
+    retriever's pool is widened, chunks without price evidence are dropped, and the
+    rest are ranked by BM25 and price signals combined.
+
+    Args:
+        retriever: The request's retriever, with k set to the number of chunks wanted.
+        query (str): The search query.
+
+    Returns:
+        tuple: (scored_chunks, debug_rows). scored_chunks are up to k (Document, score)
+            pairs, best first; debug_rows hold every candidate's scores (empty when the
+            prefilter is off).
+    """
+    if not PRICE_SIGNALS_ENABLED:
+        return retriever.get_scored_documents(query), []
+    k = retriever.k
+    retriever.k = k * PRICE_SIGNAL_POOL
+    scored_chunks, rows = rerank_by_signals(
+        retriever.get_scored_documents(query), _price_signals, k, PRICE_SIGNAL_MIN_SCORE, PRICE_SIGNAL_WEIGHT
+    )
+    retriever.k = k
+    dropped = sum(1 for row in rows if row["signal"] < PRICE_SIGNAL_MIN_SCORE)
+    print(f"Price signals: {len(rows)} candidates, {dropped} without price evidence dropped, {len(scored_chunks)} kept")
+    return scored_chunks, rows
+
+
+_json_decoder = json.JSONDecoder()
+
+
+def _products_in(value) -> list:
+    """
+    The product dicts in a decoded JSON value: a list of them, a ProductList-shaped
+    {"products": [...]} object, or a single product (an object with a name or price).
+    """
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    if isinstance(value, dict):
+        if isinstance(value.get("products"), list):
+            return _products_in(value["products"])
+        if "product_name" in value or "price" in value:
+            return [value]
+    return []
+
+
+def _scan_json(text: str) -> tuple:
+    """
+    Decode the JSON arrays and objects embedded in free text, left to right.
+    raw_decode follows nesting and strings, so brackets inside a product's fields or
+    a nested list do not cut a value short the way a regex would.
+
+    Returns:
+        tuple: (values, cut_short) where cut_short is the text of the array or object
+            the answer ended in the middle of (it ran out of tokens), or None.
+    """
+    values = []
+    position = 0
+    while True:
+        starts = [index for index in (text.find("[", position), text.find("{", position)) if index >= 0]
+        if not starts:
+            return values, None
+        start = min(starts)
+        try:
+            value, position = _json_decoder.raw_decode(text, start)
+        except json.JSONDecodeError as e:
+            if e.pos >= len(text.rstrip()) or e.msg.startswith("Unterminated string"):
+                return values, text[start:]
+            # A bracket in prose, e.g. "[see below]"
+            position = start + 1
+            continue
+        values.append(value)
+
+
+def _salvage(fragment: str) -> list:
+    """
+    Recover the complete products of an answer cut short: drop everything after the
+    last closed object and close the array (and the wrapping object, if any).
+    """
+    head = fragment[:fragment.rfind("}") + 1]
+    for closing in ("]", "]}", "}]", "}]}"):
+        try:
+            return _products_in(json.loads(head + closing))
+        except json.JSONDecodeError:
+            continue
+    return []
+
+
+def _needs_salvage(text: str) -> bool:
+    """
+    Whether the free-text parser below would have to salvage an answer cut short.
+    """
+    return _scan_json(text)[1] is not None
+
+
+def _parse_free_text(res: dict, final_data: list, invalid_data: list, stats: dict) -> None:
+    """
+    Pull products out of a free-form answer: every JSON array or object in it, and
+    the complete products of one cut short (kept apart, in invalid_data).
+    """
+    values, cut_short = _scan_json(res["response"])
+    for value in values:
+        for product in _products_in(value):
+            processed_product = process_product(product, res["metadata"])
+            if processed_product is not None:
+                final_data.append(processed_product)
+    if cut_short is not None:
+        print(f"Answer was cut short, salvaging: {cut_short[:200]}")
+        stats["salvage_attempts"] += 1
+        salvaged = _salvage(cut_short)
+        if not salvaged:
+            print(f"Could not salvage the answer from {res['metadata'].get('source')}")
+        for product in salvaged:
+            processed_product = process_product(product, res["metadata"])
+            if processed_product is not None:
+                invalid_data.append(processed_product)
+
+
+def extract_product_data(responses: list, structured_products: list = None) -> list:
     """
     Extracts and normalizes product data from LLM responses.
     For any missing field in the JSON, the field is set to "Null ".
+    Products already read from structured data (see take_structured_products) are
+    merged in before sorting.
+
+    In schema output mode each answer is validated against ProductList. An answer
+    that does not validate (possible with Groq, whose JSON mode guarantees JSON but
+    not the schema) falls back to the free-text parser. parse_stats counts the
+    answers parsed each way, the salvage attempts made, and how many schema-parsed
+    answers the free-text parser would have had to salvage.
     """
-    final_data = []
-    invalid_json = []
+    final_data = list(structured_products or [])
     invalid_data=[]
+    stats = {"responses": len(responses), "schema_parsed": 0, "fallback_parses": 0,
+             "salvage_attempts": 0, "salvage_avoided": 0}
 
     for res in responses:
-        # Find JSON-like arrays in the response
-        json_matches = re.findall(r'\[.*?\]', res["response"], re.DOTALL)
-        for match in json_matches:
+        if LLM_OUTPUT_MODE == "schema":
             try:
-                products = json.loads(match)
-                for product in products:
-                    processed_product = process_product(product,res["metadata"])
+                answer = ProductList.model_validate_json(res["response"])
+            except ValidationError as e:
+                print(f"Answer does not match the product schema, parsing it as text: {e.error_count()} errors")
+                stats["fallback_parses"] += 1
+            else:
+                stats["schema_parsed"] += 1
+                if _needs_salvage(res["response"]):
+                    stats["salvage_avoided"] += 1
+                for product in answer.products:
+                    processed_product = process_product(product.model_dump(exclude_none=True), res["metadata"])
                     if processed_product is not None:
                         final_data.append(processed_product)
+                continue
+        _parse_free_text(res, final_data, invalid_data, stats)
 
-            except json.JSONDecodeError:
-                print(f"Invalid JSON found: {match}" + "}]")
-                try:
-                    salvage = json.loads(match + "}]")
-                    if isinstance(salvage, list):
-                        for prod in salvage:
-                            processed_product = process_product(prod,res["metadata"])
-                            if processed_product is not None:
-                                invalid_data.append(processed_product)
-                    elif isinstance(salvage, dict):
-                        processed_product = process_product(salvage,res["metadata"])
-                        if processed_product is not None:
-                            invalid_data.append(processed_product)
-                except Exception as e:
-                    print(f"Could not salvage invalid JSON for match: {match}. Error: {e}")
-                invalid_json.append(res["response"])
-
+    print(f"Parsed LLM answers: {stats}")
     #final_data.extend(invalid_data)
     # Sort products by price (lowest first). Products with a missing price ("Null ") are placed at the end.
     final_data.sort(key=lambda x: x["price"] if isinstance(x["price"], (int, float)) else float('inf'))
-    return {'final_data':final_data, 'invalid_json':invalid_data}
+    return {'final_data':final_data, 'invalid_json':invalid_data, 'parse_stats':stats}
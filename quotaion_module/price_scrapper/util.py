@@ -1,30 +1,35 @@
 import re
 import time
-from bs4 import BeautifulSoup
 import html2text
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from quotaion_module.price_scrapper.config import CHROME_OPTIONS
-from zenrows import ZenRowsClient  
+from quotaion_module.scrapper_common.clean_pool import run_clean_stage
+from quotaion_module.scrapper_common.driver_pool import get_driver_pool
+from quotaion_module.scrapper_common.content_extractor import extract_main_content, format_report
+from quotaion_module.scrapper_common.html_cleaner import parse_html, clean_tree, serialize_html
+from quotaion_module.scrapper_common.http_fetch import fetch_page_http, fetch_html_tiered, is_content_sufficient
+from quotaion_module.scrapper_common.page_cache import get_page_cache
+from quotaion_module.scrapper_common.scheduler import domain_of
+from quotaion_module.scrapper_common.text_normalizer import normalize_text
+from quotaion_module.scrapper_common.structured_data import extract_structured_products
+from quotaion_module.scrapper_common.site_plugins import PluginRegistry
+from quotaion_module.scrapper_common.strategy_store import get_strategy_store
+from quotaion_module.scrapper_common.zenrows_client import get_zenrows_runner
+from quotaion_module.price_scrapper.config import (
+    CLEAN_HTML_ENABLED, CLEAN_RULES, MAIN_CONTENT_ENABLED, MAIN_CONTENT_PROFILE, MAIN_CONTENT_REPORT, STRUCTURED_DATA_ENABLED,
+    STRUCTURED_REQUIRED_FIELDS, SITE_PLUGINS_ENABLED, SITE_PLUGINS, SITE_PLUGIN_FAILURE_ALERT, ALLOWED_DOMAINS,
+    ZENROWS_API_KEY, PRICE_SIGNAL_PATTERN
+)
 import os 
 from langchain.schema import Document
 from playwright.sync_api import sync_playwright
 def fetch_html_selenium(url: str, headless: bool = True) -> str:
     """
-    Fetch HTML content from the given URL using Selenium.
+    Fetch HTML content from the given URL using a browser leased from the shared driver pool.
     """
-    chrome_options = Options()
-    for opt in CHROME_OPTIONS:
-        chrome_options.add_argument(opt)
-        
-    driver = webdriver.Chrome(options=chrome_options)
-    try:
+    with get_driver_pool().lease() as driver:
         driver.get(url)
         # Optionally: add explicit wait logic if needed
         html_content = driver.page_source
         return html_content
-    finally:
-        driver.quit()
 
 # from playwright.sync_api import sync_playwright
 
@@ -43,59 +48,31 @@ def fetch_html_selenium(url: str, headless: bool = True) -> str:
 #         browser.close()
 #         return html_content
 
-def clean_html(html_content: str) -> str:
+def clean_html(html_content: str, url: str = None, root=None) -> str:
     """
-    Cleans the HTML by removing headers, footers, images, ads, media, and unwanted text.
+    Cleans the HTML by removing headers, footers, images, ads, media, and unwanted text
+    (the declarative CLEAN_RULES in config.py), then cuts it down to the page's main
+    content (MAIN_CONTENT_PROFILE). The page is parsed only once for both steps; pass
+    `root` if it has already been parsed with parse_html (it is modified in place).
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Remove headers and footers
-    for element in soup.find_all(['header', 'footer']):
-        element.decompose()
-
-    # Remove images
-    for img in soup.find_all('img'):
-        img.decompose()
-
-    # Remove advertisements by class or ID
-    ad_classes = ['ad', 'advertisement', 'ad-banner', 'ad-overlay', 'ads']
-    ad_ids = ['ad', 'advertisement', 'ad-banner', 'ad-overlay', 'ads']
-    for ad in soup.find_all(class_=ad_classes):
-        ad.decompose()
-    for ad in soup.find_all(id=ad_ids):
-        ad.decompose()
-
-    # Remove links with javascript or specific patterns
-    for link in soup.find_all('a', href=True):
-        if 'javascript:void(0)' in link['href'] or '/-/en/' in link['href']:
-            link.decompose()
+    if root is None:
+        root = parse_html(html_content)
+    if root is None:
+        return ""
+    if CLEAN_HTML_ENABLED:
+        clean_tree(root, CLEAN_RULES)
+    if MAIN_CONTENT_ENABLED:
+        report = extract_main_content(root, MAIN_CONTENT_PROFILE)
+        if MAIN_CONTENT_REPORT:
+            print(format_report(url or "page", report))
+    return serialize_html(root)
 
-    # Remove video and audio tags
-    for media in soup.find_all(['video', 'audio']):
-        media.decompose()
-
-    # Remove comment boxes and reviews
-    comment_classes = ['comments', 'comment-box', 'review', 'reviews', 'user-comments', 'feedback']
-    for comment in soup.find_all(class_=comment_classes):
-        comment.decompose()
-
-    # Remove elements containing certain keywords
-    keywords_to_remove = [
-        "Play Video", "Mute", "Comment", "Review", "Submit Review", "Audio", "Video",
-        "Post Comment", "Leave a Comment", "Unable to add item to List",
-        "The video showcases", "The video guides", "Play", "Chapters", "Descriptions"
-    ]
-    for element in soup.find_all(text=True):
-        if any(keyword in element for keyword in keywords_to_remove):
-            element.extract()
-
-    return str(soup)
-
-def html_to_markdown_with_readability(html_content: str) -> str:
+def html_to_markdown_with_readability(html_content: str, url: str = None, root=None) -> str:
     """
     Converts cleaned HTML content to Markdown format.
     """
-    #cleaned_html = clean_html(html_content)
+    if CLEAN_HTML_ENABLED or MAIN_CONTENT_ENABLED:
+        html_content = clean_html(html_content, url, root)
     converter = html2text.HTML2Text()
     converter.ignore_links = True
     markdown_content = converter.handle(html_content)
@@ -103,65 +80,203 @@ def html_to_markdown_with_readability(html_content: str) -> str:
 
 def remove_urls_from_text(text: str) -> str:
     """
-    Removes URLs from the provided text.
+    Removes URLs from the provided text and collapses the blank lines left behind,
+    with the precompiled matchers in scrapper_common/text_normalizer.py.
     """
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    cleaned_text = re.sub(url_pattern, '', text)
-    return cleaned_text
+    return normalize_text(text)
 
 
-def fetch_html_zenrows(url: str, api_key: str = None) -> str:
+def fetch_html_zenrows(url: str, api_key: str = None, premium_proxy: bool = True) -> str:
     """
     Fetch HTML content from the given URL using the ZenRows API.
 
+    Requests go through a shared async ZenRows client, so every fetch reuses one
+    connection pool and stays within the plan's concurrency (ZENROWS_CONCURRENCY).
+
     Args:
         url (str): The URL to fetch.
         api_key (str, optional): Your ZenRows API key. If not provided,
             it will try to fetch the key from the ZENROWS_API_KEY environment variable.
-            A default key is also provided for testing purposes.
+        premium_proxy (bool, optional): Route the request through ZenRows' premium
+            (residential) proxies. Costlier, but needed by sites that block datacenter IPs.
     
     Returns:
         str: The HTML content retrieved via ZenRows.
     """
-    # Use the provided api_key, or get it from the environment (or use the default provided key)
-    if api_key is None:
-        api_key = os.getenv("ZENROWS_API_KEY")
-    
-    client = ZenRowsClient(api_key)
-    params = {"js_render":"true","premium_proxy":"true","proxy_country":"sa"}
+    return get_zenrows_runner(api_key).fetch(url, js_render=True, premium_proxy=premium_proxy)
+
 
-    response = client.get(url, params=params)
-    # Depending on the ZenRows response structure, adjust accordingly.
-    # Here we assume the HTML content is available as text.
-    return response.text
+_page_cache = get_page_cache("price")
+_strategy_store = get_strategy_store("price")
+_signal_regex = re.compile(PRICE_SIGNAL_PATTERN)
+_site_plugins = PluginRegistry(SITE_PLUGINS, ALLOWED_DOMAINS, STRUCTURED_REQUIRED_FIELDS, SITE_PLUGIN_FAILURE_ALERT)
 
 
-def clean_text(url: str, method: str = "selenium") -> str:
+def is_page_cached(url: str) -> bool:
+    """
+    Returns True if process_url will serve this URL from the page cache.
     """
-    Fetches HTML content from a URL using the specified method ('selenium' or 'zenrows')
-    and returns cleaned text.
+    return _page_cache.has_fresh(url)
+
+
+def has_enough_content(html_content: str) -> bool:
+    """
+    Returns True if the HTML is complete enough to skip the next fetch tier
+    (it is not a JS shell and shows a price).
+    """
+    return is_content_sufficient(html_content, _signal_regex)
 
-    Args:
-        url (str): The URL to fetch.
-        method (str): The method to use: "selenium" or "zenrows".
+
+def fetch_html_auto(url: str) -> tuple:
+    """
+    Fetch HTML with the cheapest method that returns usable content for this domain.
+    The strategy store orders plain HTTP, the pooled browser and ZenRows (if a key is
+    configured) from what has worked for the domain before, and learns from every attempt.
 
     Returns:
-        str: Cleaned text extracted from the URL.
+        tuple: (html_content, method, validators) where validators holds the
+            ETag/Last-Modified headers when the plain-HTTP tier was used.
+    """
+    validators = {}
+
+    def fetch_http(page_url):
+        _, html_content, page_validators = fetch_page_http(page_url)
+        validators.update(page_validators)
+        return html_content
+
+    methods = {"http": fetch_http, "selenium": fetch_html_selenium}
+    if ZENROWS_API_KEY:
+        methods["zenrows"] = lambda page_url: fetch_html_zenrows(page_url, premium_proxy=False)
+        methods["zenrows_premium"] = fetch_html_zenrows
+
+    domain = domain_of(url)
+    tiers = [(name, methods[name]) for name in _strategy_store.plan(domain, list(methods))]
+    record = lambda name, success, latency: _strategy_store.record(domain, name, success, latency)
+    html_content, tier = fetch_html_tiered(url, tiers, has_enough_content, record)
+    print(f"Fetched {url} via {tier}")
+    return html_content, tier, validators if tier == "http" else {}
+
+
+def fetch_html(url: str, method: str = "auto") -> tuple:
+    """
+    Fetches HTML content from a URL using the specified method ("auto", "selenium" or "zenrows").
+
+    Returns:
+        tuple: (html_content, method_used, validators)
     """
     if method.lower() == "zenrows":
-        html_content = fetch_html_zenrows(url)
-    else:
-        html_content = fetch_html_selenium(url)
-    
-    markdown = html_to_markdown_with_readability(html_content)
+        return fetch_html_zenrows(url), "zenrows_premium", {}
+    if method.lower() == "auto":
+        return fetch_html_auto(url)
+    return fetch_html_selenium(url), "selenium", {}
+
+
+def html_to_text(html_content: str, url: str = None) -> str:
+    """
+    Converts fetched HTML into the cleaned text used for chunking.
+    """
+    markdown = html_to_markdown_with_readability(html_content, url)
     text = remove_urls_from_text(markdown)
     return text
 
 
+def html_bytes_to_text(html_bytes: bytes, url: str = None) -> str:
+    """
+    Cleaning-stage entry point: raw HTML bytes in, cleaned text out.
+    Runs in the cleaning process pool (see scrapper_common/clean_pool.py).
+    """
+    return html_to_text(html_bytes.decode("utf-8", errors="replace"), url)
+
+
+def clean_in_pool(html_content: str, url: str = None) -> str:
+    """
+    Converts fetched HTML into cleaned text in the cleaning process pool.
+    """
+    return run_clean_stage(html_bytes_to_text, html_content, url)
+
+
+def html_to_page(html_content: str, url: str = None) -> dict:
+    """
+    Converts fetched HTML into the cleaned text used for chunking, together with the
+    product records read without the LLM: from the site's plugin (SITE_PLUGINS) when
+    the URL has one and it finds complete records, otherwise from the schema.org data
+    embedded in the page (JSON-LD, microdata, OpenGraph). All of it comes from a single
+    parse of the page.
+
+    Returns:
+        dict: {"text": cleaned text, "structured_products": list of product records,
+            "plugin": {"name", "outcome"} if a site plugin ran, else None}
+    """
+    root = parse_html(html_content)
+    if root is None:
+        return {"text": "", "structured_products": [], "plugin": None}
+    # Read products first: cleaning drops the <script> blocks and page regions they use
+    products = []
+    plugin_run = None
+    plugin = _site_plugins.plugin_for(url) if SITE_PLUGINS_ENABLED and url else None
+    if plugin is not None:
+        products, outcome = _site_plugins.run(plugin, root)
+        plugin_run = {"name": plugin.name, "outcome": outcome}
+    if not products and STRUCTURED_DATA_ENABLED:
+        products = extract_structured_products(root)
+    markdown = html_to_markdown_with_readability(html_content, url, root)
+    return {"text": remove_urls_from_text(markdown), "structured_products": products, "plugin": plugin_run}
+
+
+def html_bytes_to_page(html_bytes: bytes, url: str = None) -> dict:
+    """
+    Cleaning-stage entry point for html_to_page; runs in the cleaning process pool.
+    """
+    return html_to_page(html_bytes.decode("utf-8", errors="replace"), url)
+
+
+def clean_page_in_pool(html_content: str, url: str = None) -> dict:
+    """
+    Converts fetched HTML into cleaned text and structured product records in the
+    cleaning process pool, and records how the site's plugin did.
+    """
+    page = run_clean_stage(html_bytes_to_page, html_content, url)
+    if page.get("plugin"):
+        _site_plugins.record(page["plugin"]["name"], page["plugin"]["outcome"], url)
+    return page
+
+
+def site_plugin_stats() -> dict:
+    """
+    Reports hit rates and failures of the per-site extractor plugins.
+    """
+    return _site_plugins.stats()
+
+
+def clean_text(url: str, method: str = "auto") -> str:
+    """
+    Fetches HTML content from a URL using the specified method and returns cleaned text.
+
+    Args:
+        url (str): The URL to fetch.
+        method (str): The method to use: "auto" (HTTP first, escalating to the browser
+            and then ZenRows), "selenium" or "zenrows".
+
+    Returns:
+        str: Cleaned text extracted from the URL.
+    """
+    html_content, _, _ = fetch_html(url, method)
+    return clean_in_pool(html_content, url)
+
+
 # utils.py (add this function)
 def process_url(url, method):
     try:
-        text_content = clean_text(url, method=method)
-        return Document(page_content=text_content, metadata={"source": url})
+        # Served from the page cache when this page was fetched recently
+        page = _page_cache.get_or_fetch(
+            url, lambda page_url: fetch_html(page_url, method),
+            lambda html_content: clean_page_in_pool(html_content, url),
+            has_enough_content
+        )
+        metadata = {"source": url}
+        if page.get("structured_products"):
+            # Popped by the /search endpoints, which skip the LLM for complete records
+            metadata["structured_products"] = page["structured_products"]
+        return Document(page_content=page["text"], metadata=metadata)
     except Exception as e:
-        return (url, str(e))
\ No newline at end of file
+        return (url, str(e))
@@ -0,0 +1,132 @@
+import re
+from collections import Counter
+import numpy as np
+from scipy.sparse import csr_matrix
+from quotaion_module.scrapper_common.config import BM25_K1, BM25_B
+
+TOKEN_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lowercase word tokens for BM25.
+    """
+    return TOKEN_REGEX.findall(text.lower())
+
+
+def idf_weights(document_frequencies: np.ndarray, total_documents: int) -> np.ndarray:
+    """
+    BM25 inverse document frequency, in the non-negative log(1 + ...) form so that
+    terms found in most documents still count a little instead of subtracting.
+    """
+    df = document_frequencies.astype(np.float64)
+    return np.log1p((total_documents - df + 0.5) / (df + 0.5))
+
+
+def bm25_matrix(indptr: np.ndarray, indices: np.ndarray, term_frequencies: np.ndarray,
+                idf: np.ndarray, average_length: float, n_terms: int,
+                k1: float = BM25_K1, b: float = BM25_B, lengths: np.ndarray = None) -> csr_matrix:
+    """
+    Build the document-term matrix of BM25 weights, so that a document's score for a
+    query is the dot product of its row with the query's term counts.
+
+    Args:
+        indptr, indices, term_frequencies: The documents' term counts in CSR layout
+            (row i holds the term ids indices[indptr[i]:indptr[i + 1]]).
+        idf (np.ndarray): Inverse document frequency per term id.
+        average_length (float): Average document length in tokens.
+        n_terms (int): Number of columns (size of the vocabulary).
+        lengths (np.ndarray): Document lengths in tokens, if already known.
+
+    Returns:
+        csr_matrix: One row per document, one column per term.
+    """
+    tf = term_frequencies.astype(np.float32)
+    n_documents = len(indptr) - 1
+    rows = np.repeat(np.arange(n_documents), np.diff(indptr))
+    if lengths is None:
+        lengths = np.bincount(rows, weights=tf, minlength=n_documents)
+    norm = k1 * (1 - b + b * lengths / (average_length or 1.0))
+    row_norm = norm[rows].astype(np.float32)
+    weights = idf.astype(np.float32)[indices] * tf * (k1 + 1) / (tf + row_norm)
+    return csr_matrix((weights, indices, indptr), shape=(n_documents, n_terms))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first. Ties keep document order, so
+    documents that match nothing come back in the order they were given.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(n)
+    return selected[np.lexsort((selected, -scores[selected]))]
+
+
+class SparseBM25Retriever:
+    """
+    A BM25 retriever that scores with one sparse matrix-vector product.
+
+    Documents are tokenized once into a CSR matrix of BM25 weights (idf and length
+    normalization folded in), so a query costs a mat-vec plus an argpartition for the
+    top k instead of Python loops over every document and token. It can replace
+    langchain's BM25Retriever: build it with from_documents, set k, and call
+    get_relevant_documents (or invoke).
+    """
+
+    def __init__(self, documents: list, matrix: csr_matrix, vocabulary: dict, k: int = 4):
+        self.documents = documents
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.k = k
+
+    @classmethod
+    def from_documents(cls, documents: list, k1: float = BM25_K1, b: float = BM25_B, **kwargs) -> "SparseBM25Retriever":
+        vocabulary = {}
+        indptr = [0]
+        indices = []
+        counts = []
+        for doc in documents:
+            for term, count in Counter(tokenize(doc.page_content)).items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int32)
+        counts = np.asarray(counts, dtype=np.float32)
+        df = np.bincount(indices, minlength=len(vocabulary))
+        average_length = counts.sum() / len(documents) if documents else 0.0
+        matrix = bm25_matrix(indptr, indices, counts, idf_weights(df, len(documents)),
+                             average_length, len(vocabulary), k1, b)
+        return cls(list(documents), matrix, vocabulary, **kwargs)
+
+    def score(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every document for the query.
+        """
+        query_vector = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        for term in tokenize(query):
+            column = self.vocabulary.get(term)
+            if column is not None:
+                query_vector[column] += 1
+        return self.matrix @ query_vector
+
+    def get_scored_documents(self, query: str) -> list:
+        """
+        Return up to k (Document, score) pairs, best first.
+        """
+        scores = self.score(query)
+        return [(self.documents[i], float(scores[i])) for i in top_k(scores, self.k)]
+
+    def get_relevant_documents(self, query: str) -> list:
+        return [doc for doc, _ in self.get_scored_documents(query)]
+
+    def invoke(self, query: str) -> list:
+        return self.get_relevant_documents(query)
@@ -0,0 +1,107 @@
+import threading
+import time
+from quotaion_module.scrapper_common.config import REQUEST_BUDGET_SECONDS, BUDGET_STAGE_SHARES
+
+
+class FetchCancelled(Exception):
+    """
+    Raised inside a fetch whose request has given up on it.
+    """
+
+
+class CancelToken:
+    """
+    Lets a request cancel work that is already running on a fetch worker.
+    Resources such as leased browsers register a callback that releases them
+    (e.g. quits the browser) when the token is cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled = False
+
+    def on_cancel(self, callback) -> None:
+        """
+        Run `callback` when the token is cancelled (immediately if it already is).
+        """
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error running cancel callback: {e}")
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise FetchCancelled("Fetch cancelled: the request ran out of time")
+
+
+_current = threading.local()
+
+
+def current_cancel_token() -> CancelToken:
+    """
+    Return the cancel token of the fetch running on this thread, if any.
+    """
+    return getattr(_current, "token", None)
+
+
+def set_current_cancel_token(token: CancelToken) -> None:
+    _current.token = token
+
+
+class RequestBudget:
+    """
+    An end-to-end latency budget for one /search request, split across its stages.
+
+    Each stage gets a share of the total (BUDGET_STAGE_SHARES). Stage deadlines are
+    cumulative from the start of the request, so a stage that finishes early leaves
+    its unused time to the stages after it.
+    """
+
+    def __init__(self, total_seconds: float = None, shares: dict = None):
+        self.total_seconds = total_seconds or REQUEST_BUDGET_SECONDS
+        shares = shares or BUDGET_STAGE_SHARES
+        self.started_at = time.time()
+        total_share = sum(shares.values())
+        self._deadlines = {}
+        elapsed_share = 0
+        for stage, share in shares.items():
+            elapsed_share += share
+            self._deadlines[stage] = self.started_at + self.total_seconds * elapsed_share / total_share
+
+    def deadline(self, stage: str) -> float:
+        """
+        Absolute time (time.time()) by which the stage must be done.
+        """
+        return self._deadlines[stage]
+
+    def remaining(self, stage: str = None) -> float:
+        """
+        Seconds left for the stage, or for the whole request if no stage is given.
+        """
+        end = self._deadlines[stage] if stage else self.started_at + self.total_seconds
+        return max(end - time.time(), 0)
+
+    def expired(self, stage: str = None) -> bool:
+        return self.remaining(stage) <= 0
+
+    def elapsed(self) -> float:
+        return time.time() - self.started_at
@@ -0,0 +1,294 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+import numpy as np
+from langchain.schema import Document
+from quotaion_module.scrapper_common.config import (
+    CHUNK_INDEX_MAX_CHUNKS,
+    BM25_K1,
+    BM25_B,
+)
+from quotaion_module.scrapper_common.bm25 import SparseBM25Retriever, tokenize, idf_weights, bm25_matrix
+from quotaion_module.scrapper_common.page_cache import canonical_url, domain_ttl
+
+
+class _Chunk:
+    __slots__ = ("text", "metadata", "term_ids", "counts", "length", "owners")
+
+    def __init__(self, text: str, metadata: dict, term_ids: np.ndarray, counts: np.ndarray, owners: set):
+        self.text = text
+        self.metadata = metadata
+        self.term_ids = term_ids
+        self.counts = counts
+        self.length = float(counts.sum())
+        self.owners = owners
+
+
+class ChunkIndex:
+    """
+    A long-lived BM25 inverted index over the chunks of recently fetched pages.
+
+    Chunks are added page by page as requests chunk them, and stay indexed until the
+    page goes stale (the page cache's per-domain TTL) or the index outgrows its
+    capacity, at which point the least recently used pages are evicted. Term counts and
+    corpus statistics are updated in place, so nothing is rebuilt per request. Each
+    chunk is tokenized once into term ids and counts; a query builds the BM25 matrix of
+    its candidate chunks from those arrays and scores it with one sparse mat-vec.
+
+    A chunk belongs to every page it was collected from: a chunk that survived
+    deduplication lists the merged pages under metadata["sources"], and stays indexed
+    until all of them are evicted.
+    """
+
+    def __init__(self, namespace: str, max_chunks: int = CHUNK_INDEX_MAX_CHUNKS,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.namespace = namespace
+        self.max_chunks = max_chunks
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._pages = OrderedDict()  # canonical URL -> {"chunk_ids", "added_at", "ttl"}, least recently used first
+        self._chunks = {}            # chunk id -> _Chunk
+        self._vocabulary = {}        # term -> term id
+        self._terms = []             # term id -> term (None once freed)
+        self._free_term_ids = []
+        self._df = np.zeros(1024, dtype=np.int64)  # term id -> number of chunks containing it
+        self._total_length = 0.0
+        self._next_id = 0
+        self._version = 0  # Bumped whenever chunks are added or removed
+        self._stats = {"fresh_hits": 0, "pages_added": 0, "pages_evicted": 0, "queries": 0}
+
+    def has_fresh(self, url: str) -> bool:
+        """
+        Returns True if the page's chunks are indexed and still fresh, so the page
+        need not be fetched again.
+        """
+        key = canonical_url(url)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                return False
+            if time.time() - page["added_at"] >= page["ttl"]:
+                self._evict(key)
+                return False
+            self._pages.move_to_end(key)
+            self._stats["fresh_hits"] += 1
+            return True
+
+    def add_chunks(self, chunks: list) -> None:
+        """
+        Index the chunks of freshly fetched pages, replacing whatever was indexed for
+        those pages before.
+
+        Args:
+            chunks (list): Dicts with "page_content" and "metadata" (with a "source",
+                and "sources" when near-duplicate pages were merged).
+        """
+        by_page = OrderedDict()
+        for chunk in chunks:
+            metadata = chunk["metadata"]
+            owners = {canonical_url(source) for source in metadata.get("sources") or [metadata["source"]]}
+            for owner in owners:
+                by_page.setdefault(owner, []).append((chunk, owners))
+
+        with self._lock:
+            for key in by_page:
+                if key in self._pages:
+                    self._evict(key)
+            added = {}
+            now = time.time()
+            for key, page_chunks in by_page.items():
+                chunk_ids = []
+                for chunk, owners in page_chunks:
+                    # A chunk shared by several pages is indexed once
+                    chunk_id = added.get(id(chunk))
+                    if chunk_id is None:
+                        chunk_id = self._insert(chunk["page_content"], chunk["metadata"], owners)
+                        added[id(chunk)] = chunk_id
+                    chunk_ids.append(chunk_id)
+                self._pages[key] = {"chunk_ids": chunk_ids, "added_at": now, "ttl": domain_ttl(key)}
+                self._stats["pages_added"] += 1
+            self._evict_to_capacity()
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._vocabulary.get(term)
+        if term_id is not None:
+            return term_id
+        # Ids of terms no longer in any chunk are reused, so the vocabulary stays bounded
+        if self._free_term_ids:
+            term_id = self._free_term_ids.pop()
+            self._terms[term_id] = term
+        else:
+            term_id = len(self._terms)
+            self._terms.append(term)
+            if term_id >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int64)])
+        self._vocabulary[term] = term_id
+        return term_id
+
+    def _insert(self, text: str, metadata: dict, owners: set) -> int:
+        chunk_id = self._next_id
+        self._next_id += 1
+        terms = Counter(tokenize(text))
+        term_ids = np.fromiter((self._term_id(term) for term in terms), dtype=np.int32, count=len(terms))
+        counts = np.fromiter(terms.values(), dtype=np.float32, count=len(terms))
+        chunk = _Chunk(text, metadata, term_ids, counts, set(owners))
+        self._chunks[chunk_id] = chunk
+        self._total_length += chunk.length
+        self._df[term_ids] += 1
+        self._version += 1
+        return chunk_id
+
+    def _remove(self, chunk_id: int) -> None:
+        chunk = self._chunks.pop(chunk_id)
+        self._total_length -= chunk.length
+        self._df[chunk.term_ids] -= 1
+        self._version += 1
+        for term_id in chunk.term_ids[self._df[chunk.term_ids] == 0].tolist():
+            del self._vocabulary[self._terms[term_id]]
+            self._terms[term_id] = None
+            self._free_term_ids.append(term_id)
+
+    def _evict(self, key: str) -> None:
+        page = self._pages.pop(key, None)
+        if page is None:
+            return
+        for chunk_id in page["chunk_ids"]:
+            chunk = self._chunks.get(chunk_id)
+            if chunk is None:
+                continue
+            chunk.owners.discard(key)
+            if not chunk.owners:
+                self._remove(chunk_id)
+        self._stats["pages_evicted"] += 1
+
+    def evict(self, url: str) -> None:
+        """
+        Drop a page's chunks from the index (chunks shared with other indexed pages stay).
+        """
+        with self._lock:
+            self._evict(canonical_url(url))
+
+    def _evict_to_capacity(self) -> None:
+        while len(self._chunks) > self.max_chunks and len(self._pages) > 1:
+            self._evict(next(iter(self._pages)))
+
+    def _chunk_ids(self, sources: list) -> list:
+        chunk_ids = {}
+        for source in sources:
+            page = self._pages.get(canonical_url(source))
+            if page is None:
+                continue
+            for chunk_id in page["chunk_ids"]:
+                if chunk_id in self._chunks:
+                    chunk_ids[chunk_id] = None
+        return list(chunk_ids)
+
+    def _scorer(self, sources: list) -> SparseBM25Retriever:
+        """
+        Build the BM25 matrix of the given pages' chunks from their stored term counts,
+        weighted with the whole index's document frequencies and average length.
+        Must be called with the lock held; the result is valid until the index changes.
+        """
+        chunks = [self._chunks[chunk_id] for chunk_id in self._chunk_ids(sources)]
+        total = len(self._chunks)
+        n_terms = len(self._terms)
+        indptr = np.zeros(len(chunks) + 1, dtype=np.int64)
+        np.cumsum([len(chunk.term_ids) for chunk in chunks], out=indptr[1:])
+        matrix = bm25_matrix(
+            indptr,
+            np.concatenate([chunk.term_ids for chunk in chunks] or [np.empty(0, dtype=np.int32)]),
+            np.concatenate([chunk.counts for chunk in chunks] or [np.empty(0, dtype=np.float32)]),
+            idf_weights(self._df[:n_terms], total),
+            self._total_length / total if total else 0.0,
+            n_terms,
+            self.k1,
+            self.b,
+            np.fromiter((chunk.length for chunk in chunks), dtype=np.float64, count=len(chunks)),
+        )
+        documents = [Document(page_content=chunk.text, metadata=chunk.metadata) for chunk in chunks]
+        return SparseBM25Retriever(documents, matrix, self._vocabulary)
+
+    def search(self, query: str, sources: list, k: int) -> list:
+        """
+        Rank the chunks of the given pages against the query with BM25.
+
+        Only chunks of the given pages are scored; document frequencies and average
+        length come from the whole index. Like BM25Retriever, up to k chunks are
+        returned even if some do not match any query term.
+
+        Args:
+            query (str): The search query.
+            sources (list): URLs of the pages whose chunks may be returned.
+            k (int): Number of chunks to return.
+
+        Returns:
+            list: Up to k (Document, score) pairs, best first.
+        """
+        return self.retriever(sources, k).get_scored_documents(query)
+
+    def retriever(self, sources: list, k: int = 4) -> "IndexRetriever":
+        """
+        Return a retriever limited to the given pages, used like BM25Retriever.
+        """
+        return IndexRetriever(self, sources, k)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._stats,
+                namespace=self.namespace,
+                pages=len(self._pages),
+                chunks=len(self._chunks),
+                terms=len(self._vocabulary),
+            )
+
+
+class IndexRetriever:
+    """
+    A view of a ChunkIndex restricted to one request's pages, with the parts of the
+    BM25Retriever interface the servers use (k and get_relevant_documents). The BM25
+    matrix of the pages is built on the first query and reused until the index changes.
+    """
+
+    def __init__(self, index: ChunkIndex, sources: list, k: int = 4):
+        self.index = index
+        self.sources = list(sources)
+        self.k = k
+        self._scorer = None
+        self._version = None
+
+    def get_scored_documents(self, query: str) -> list:
+        """
+        Return up to k (Document, score) pairs, best first.
+        """
+        index = self.index
+        with index._lock:
+            index._stats["queries"] += 1
+            if self._scorer is None or self._version != index._version:
+                self._scorer = index._scorer(self.sources)
+                self._version = index._version
+            self._scorer.k = self.k
+            # Term ids in the shared vocabulary only change along with the version
+            return self._scorer.get_scored_documents(query)
+
+    def get_relevant_documents(self, query: str) -> list:
+        return [doc for doc, _ in self.get_scored_documents(query)]
+
+    def invoke(self, query: str) -> list:
+        return self.get_relevant_documents(query)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(namespace: str) -> ChunkIndex:
+    """
+    Return the process-wide chunk index for a scraper ("price" or "email").
+    Each scraper chunks pages differently, so each keeps its own index.
+    """
+    with _indexes_lock:
+        if namespace not in _indexes:
+            _indexes[namespace] = ChunkIndex(namespace)
+        return _indexes[namespace]
@@ -0,0 +1,80 @@
+import re
+import numpy as np
+
+
+class SignalScorer:
+    """
+    Scores chunks by how much evidence they carry of what the LLM is asked to extract
+    (for prices: currency tokens, amounts, "add to cart" and VAT cues).
+
+    Built from a dict of {signal: {"pattern": regex, "weight": float}}; patterns are
+    matched case-insensitively. A chunk's score is the weighted sum of log(1 + count)
+    over the signals, so a few matches count almost as much as many.
+    """
+
+    def __init__(self, signals: dict):
+        self.names = list(signals)
+        self.patterns = [re.compile(signals[name]["pattern"], re.IGNORECASE) for name in self.names]
+        self.weights = np.array([signals[name].get("weight", 1.0) for name in self.names], dtype=np.float64)
+
+    def counts(self, texts: list) -> np.ndarray:
+        """
+        Match counts, one row per text and one column per signal.
+        """
+        counts = np.zeros((len(texts), len(self.patterns)), dtype=np.float64)
+        for row, text in enumerate(texts):
+            for column, pattern in enumerate(self.patterns):
+                counts[row, column] = sum(1 for _ in pattern.finditer(text))
+        return counts
+
+    def score(self, counts: np.ndarray) -> np.ndarray:
+        return np.log1p(counts) @ self.weights
+
+
+def rerank_by_signals(scored_documents: list, scorer: SignalScorer, k: int,
+                      min_signal: float, signal_weight: float) -> tuple:
+    """
+    Drop chunks without enough signal evidence, then rank the rest by BM25 and signal
+    score combined.
+
+    Both scores are scaled to [0, 1] by their maximum over the candidates, and the
+    combined score is (1 - signal_weight) * bm25 + signal_weight * signal.
+
+    Args:
+        scored_documents (list): (Document, bm25_score) pairs from the retriever.
+        scorer (SignalScorer): The signals to look for.
+        k (int): Number of chunks to return.
+        min_signal (float): Signal score a chunk needs to be kept.
+        signal_weight (float): Share of the signal score in the combined score.
+
+    Returns:
+        tuple: (scored_documents, rows). scored_documents are up to k (Document,
+            combined_score) pairs, best first; rows hold every candidate's scores
+            (source, bm25, signal counts, signal, combined, kept) for debugging.
+    """
+    if not scored_documents:
+        return [], []
+    documents = [doc for doc, _ in scored_documents]
+    bm25 = np.array([score for _, score in scored_documents], dtype=np.float64)
+    counts = scorer.counts([doc.page_content for doc in documents])
+    signal = scorer.score(counts)
+    combined = (
+        (1 - signal_weight) * bm25 / (bm25.max() or 1.0)
+        + signal_weight * signal / (signal.max() or 1.0)
+    )
+    eligible = np.flatnonzero(signal >= min_signal)
+    # Stable sort keeps the retriever's order between equal scores
+    ranked = eligible[np.argsort(-combined[eligible], kind="stable")][:k]
+    kept = set(ranked.tolist())
+    rows = [
+        {
+            "source": documents[i].metadata.get("source"),
+            "bm25": round(float(bm25[i]), 3),
+            "signals": {name: int(counts[i, column]) for column, name in enumerate(scorer.names)},
+            "signal": round(float(signal[i]), 3),
+            "combined": round(float(combined[i]), 3),
+            "kept": i in kept,
+        }
+        for i in range(len(documents))
+    ]
+    return [(documents[i], float(combined[i])) for i in ranked], rows
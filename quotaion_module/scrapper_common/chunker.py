@@ -0,0 +1,177 @@
+import math
+import re
+from quotaion_module.scrapper_common.config import CHUNK_MIN_TOKENS
+
+# Pieces a BPE tokenizer (Qwen, Llama 3) emits at least one token for: runs of ASCII
+# letters, single digits, runs of other letters (Arabic etc.) and single symbols
+TOKEN_PIECE_REGEX = re.compile(r"[A-Za-z]+|\d|[^\W\d_A-Za-z]+|\S")
+HEADING_REGEX = re.compile(r"^\s{0,3}#{1,6}\s")
+LIST_ITEM_REGEX = re.compile(r"^\s*(?:[-*+]|\d{1,3}[.)])\s")
+TABLE_ROW_REGEX = re.compile(r"^\s*\|")
+WORD_REGEX = re.compile(r"\S+\s*")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate how many tokens the model's tokenizer turns the text into.
+
+    The models are served through Ollama and Groq, which expose no tokenizer, so this
+    errs on the high side: an English word of up to 4 letters counts as one token and
+    longer words as one per 4 letters, every digit and symbol is a token, and other
+    scripts count one token per 2 letters.
+    """
+    tokens = 0
+    for piece in TOKEN_PIECE_REGEX.findall(text):
+        first = piece[0]
+        if first.isascii() and first.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif first.isalpha():
+            tokens += math.ceil(len(piece) / 2)
+        else:
+            tokens += 1
+    return tokens
+
+
+def chunk_token_budget(context_tokens: int, prompt_tokens: int, response_tokens: int) -> int:
+    """
+    Tokens left for a chunk once the prompt and the model's answer are accounted for.
+    """
+    return max(context_tokens - prompt_tokens - response_tokens, CHUNK_MIN_TOKENS)
+
+
+def _split_oversized(text: str, max_tokens: int) -> list:
+    """
+    Split a block too large for one chunk between words, and a word too large for one
+    chunk every max_tokens characters (no character counts as more than one token).
+    """
+    chunks = []
+    current = []
+    used = 0
+    for word in WORD_REGEX.findall(text):
+        for start in range(0, len(word), max_tokens):
+            part = word[start:start + max_tokens]
+            cost = count_tokens(part)
+            if current and used + cost > max_tokens:
+                chunks.append("".join(current).strip())
+                current, used = [], 0
+            current.append(part)
+            used += cost
+    if current:
+        chunks.append("".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def _blocks(lines: list) -> list:
+    """
+    Group markdown lines into blocks that should not be split: headings, paragraphs,
+    list items (with their continuation lines) and table rows. Blank lines stay with
+    the block before them.
+
+    Returns:
+        list: (start_line, end_line, is_heading) tuples covering every line.
+    """
+    blocks = []
+    start = 0
+    for i, line in enumerate(lines):
+        if i == start:
+            continue
+        previous = lines[i - 1]
+        if not line.strip():
+            continue
+        starts_block = (
+            not previous.strip()
+            or HEADING_REGEX.match(line)
+            or HEADING_REGEX.match(previous)
+            or LIST_ITEM_REGEX.match(line)
+            or TABLE_ROW_REGEX.match(line)
+        )
+        if starts_block:
+            blocks.append((start, i, bool(HEADING_REGEX.match(lines[start]))))
+            start = i
+    if lines:
+        blocks.append((start, len(lines), bool(HEADING_REGEX.match(lines[start]))))
+    return blocks
+
+
+def chunk_markdown(text: str, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """
+    Split markdown into chunks of at most max_tokens (as counted by count_tokens),
+    breaking only between blocks so product cards, list items and table rows stay
+    whole.
+
+    Blocks are packed greedily. When a chunk is full it is cut before the last heading
+    it contains (if that leaves it at least half full), so sections start new chunks.
+    A chunk that starts inside a section repeats the section's heading. Up to
+    overlap_tokens of trailing blocks are repeated at the start of the next chunk.
+    A single block larger than max_tokens is split between words as a last resort.
+
+    Args:
+        text (str): The page as markdown.
+        max_tokens (int): Token budget per chunk (see chunk_token_budget).
+        overlap_tokens (int): Tokens of context carried over between chunks.
+
+    Returns:
+        list: The chunk texts.
+    """
+    lines = text.split("\n")
+    blocks = [
+        (start, end, is_heading, count_tokens("\n".join(lines[start:end])))
+        for start, end, is_heading in _blocks(lines)
+    ]
+    # Heading block in effect at each block, to repeat in continuation chunks
+    headings = []
+    current = None
+    for index, block in enumerate(blocks):
+        if block[2]:
+            current = index
+        headings.append(current)
+
+    def render(first: int, last: int) -> str:
+        body = "\n".join(lines[blocks[first][0]:blocks[last - 1][1]]).strip("\n")
+        heading = headings[first]
+        if heading is not None and heading != first:
+            return "\n".join(lines[blocks[heading][0]:blocks[heading][1]]).strip("\n") + "\n\n" + body
+        return body
+
+    def heading_cost(first: int) -> int:
+        heading = headings[first]
+        return blocks[heading][3] if heading is not None and heading != first else 0
+
+    chunks = []
+    first = 0
+    previous_end = 0  # Blocks before this were already in a chunk; only overlap may repeat them
+    while first < len(blocks):
+        if blocks[first][3] + heading_cost(first) > max_tokens:
+            chunks.extend(_split_oversized(render(first, first + 1), max_tokens))
+            first += 1
+            previous_end = first
+            continue
+        used = heading_cost(first)
+        last = first
+        while last < len(blocks) and used + blocks[last][3] <= max_tokens:
+            used += blocks[last][3]
+            last += 1
+        if last < len(blocks):
+            # Prefer to end the chunk before a heading, keeping its section together
+            for cut in range(last - 1, max(first, previous_end), -1):
+                if blocks[cut][2]:
+                    if sum(block[3] for block in blocks[first:cut]) * 2 >= max_tokens:
+                        last = cut
+                    break
+        text_chunk = render(first, last)
+        if text_chunk.strip():
+            chunks.append(text_chunk)
+        if last >= len(blocks):
+            break
+        # Carry trailing blocks over as overlap, never the whole chunk, and only if the
+        # next block still fits after them
+        next_first = last
+        carried = 0
+        while next_first - 1 > first and not blocks[next_first - 1][2]:
+            carried += blocks[next_first - 1][3]
+            if carried > overlap_tokens or carried + heading_cost(next_first - 1) + blocks[last][3] > max_tokens:
+                break
+            next_first -= 1
+        previous_end = last
+        first = next_first
+    return chunks
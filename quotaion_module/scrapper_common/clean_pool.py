@@ -0,0 +1,67 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from quotaion_module.scrapper_common.config import (
+    CLEAN_POOL_ENABLED,
+    CLEAN_POOL_WORKERS,
+    CLEAN_POOL_START_METHOD,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_clean_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool that runs the HTML -> text stage.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=CLEAN_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(CLEAN_POOL_START_METHOD)
+            )
+            atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+        return _executor
+
+
+def _reset_clean_pool(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def run_clean_stage(convert, html_content: str, *args) -> str:
+    """
+    Convert fetched HTML into cleaned text in the cleaning process pool.
+
+    Parsing and markdown conversion are CPU-bound pure Python, so running them in
+    separate processes lets cleaning scale across cores while the fetch threads only
+    wait on I/O.
+
+    Args:
+        convert (callable): A module-level function taking raw HTML bytes and returning
+            cleaned text (it must be importable by the worker processes).
+        html_content (str): The fetched HTML.
+        *args: Extra picklable arguments passed to convert after the bytes (e.g. the URL).
+
+    Returns:
+        str: The cleaned text.
+    """
+    html_bytes = html_content.encode("utf-8")
+    if not CLEAN_POOL_ENABLED:
+        return convert(html_bytes, *args)
+    pool = get_clean_pool()
+    try:
+        return pool.submit(convert, html_bytes, *args).result()
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory on a huge page); start a fresh pool next
+        # time and clean this page in the current process
+        print(f"Cleaning pool broke, cleaning in-process: {e}")
+        _reset_clean_pool(pool)
+        return convert(html_bytes, *args)
@@ -0,0 +1,211 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Shared settings for the price and email scrapers.
+
+# Selenium Chrome options shared by every pooled browser
+CHROME_OPTIONS = [
+    "--headless=new",  # Use modern headless mode
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+]
+CHROME_EXPERIMENTAL_OPTIONS = {
+    "excludeSwitches": ["enable-automation"],
+    "useAutomationExtension": False,
+    "prefs": {
+        "profile.managed_default_content_settings.javascript": 1,
+        "profile.default_content_setting_values.javascript": 1,
+        "network.http.referer.default_policy": 2
+    }
+}
+
+# Chrome WebDriver pool settings
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "5"))              # Max browsers alive at once
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "50"))             # Recycle a browser after this many pages
+DRIVER_MAX_HEAP_MB = int(os.getenv("DRIVER_MAX_HEAP_MB", "512"))        # Recycle when the JS heap grows past this
+DRIVER_LEASE_TIMEOUT = float(os.getenv("DRIVER_LEASE_TIMEOUT", "120"))  # Seconds to wait for a free browser
+DRIVER_PAGE_LOAD_TIMEOUT = float(os.getenv("DRIVER_PAGE_LOAD_TIMEOUT", "30"))
+
+# Plain-HTTP fetch tier settings
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))  # Number of hosts kept alive
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))          # Keep-alive connections per host
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,ar;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br"
+}
+
+# Content-sufficiency check used to decide when to escalate to the browser
+HTTP_MIN_BODY_BYTES = int(os.getenv("HTTP_MIN_BODY_BYTES", "2048"))
+JS_SHELL_MARKERS = [
+    "you need to enable javascript to run this app",
+    "please enable javascript to continue",
+    "javascript is required",
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    "<title>just a moment...</title>",
+    "cf-browser-verification",
+    "/cdn-cgi/challenge-platform",
+    "captcha-delivery.com"
+]
+
+# On-disk page cache (compressed HTML + cleaned text, keyed by canonical URL)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", ".page_cache")
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "21600"))  # Default freshness in seconds (6 hours)
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # Disk bound per scraper; oldest entries are evicted past it
+# Per-domain freshness overrides, matched against the host like ALLOWED_DOMAINS
+PAGE_CACHE_DOMAIN_TTLS = {
+    "amazon": 1800,
+    "noon": 1800,
+    "jarir": 3600,
+    "ebay": 1800,
+    "bestbuy": 3600
+}
+# Query parameters that never change page content and are dropped from cache keys
+TRACKING_PARAMS = [
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "gclid", "fbclid", "msclkid", "srsltid", "ref", "ref_", "_encoding", "psc"
+]
+
+# Process-wide fetch scheduler (replaces the per-request ThreadPoolExecutor)
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "10"))        # Pages fetched at once across all requests
+FETCH_DOMAIN_CONCURRENCY = int(os.getenv("FETCH_DOMAIN_CONCURRENCY", "2"))   # Pages fetched at once per domain
+FETCH_DOMAIN_INTERVAL = float(os.getenv("FETCH_DOMAIN_INTERVAL", "0.5"))    # Seconds between fetch starts per domain
+FETCH_BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE", "5"))            # First pause after a 429/503
+FETCH_BACKOFF_MAX = float(os.getenv("FETCH_BACKOFF_MAX", "120"))
+# Stricter limits for domains that throttle aggressively, matched against the host
+FETCH_DOMAIN_OVERRIDES = {
+    "amazon": {"concurrency": 1, "interval": 2.0},
+    "noon": {"concurrency": 1, "interval": 1.5},
+    "jarir": {"concurrency": 1, "interval": 1.5}
+}
+THROTTLE_STATUS_CODES = [429, 503]
+
+# Browser page-readiness detection
+PAGE_READY_DEADLINE = float(os.getenv("PAGE_READY_DEADLINE", "15"))  # Hard cap per page, including navigation
+PAGE_READY_QUIET_MS = int(os.getenv("PAGE_READY_QUIET_MS", "500"))   # DOM and network must be still this long
+PAGE_READY_POLL_MS = int(os.getenv("PAGE_READY_POLL_MS", "100"))
+# Optional "content ready" CSS selectors per domain, matched against the host.
+# When a page's selector is present it is returned without waiting for quiescence.
+# Only the email scraper's browser fetch waits for readiness, so an entry should
+# match the part of a contact page that holds the addresses and renders last, e.g.
+#     "example-wholesaler": "#contact-details a[href^='mailto:']"
+# A selector that can match before that (a mailto link in the site header) would
+# return the page early. Domains without an entry wait for quiescence.
+PAGE_READY_SELECTORS = {}
+
+# Per-domain fetch-strategy learning
+STRATEGY_STORE_DIR = os.getenv("STRATEGY_STORE_DIR", ".fetch_strategy")
+# Relative cost of each fetch method; routing prefers the cheapest one that works
+FETCH_METHOD_COSTS = {
+    "http": 1,
+    "selenium": 10,
+    "zenrows": 25,          # ZenRows with js_render
+    "zenrows_premium": 50   # ZenRows with js_render and premium_proxy
+}
+STRATEGY_MIN_SAMPLES = int(os.getenv("STRATEGY_MIN_SAMPLES", "3"))          # Attempts before a method is judged
+STRATEGY_MIN_SUCCESS = float(os.getenv("STRATEGY_MIN_SUCCESS", "0.5"))      # Success score a method needs to be used
+STRATEGY_EWMA_ALPHA = float(os.getenv("STRATEGY_EWMA_ALPHA", "0.3"))        # Weight of the newest outcome
+STRATEGY_REPROBE_SECONDS = int(os.getenv("STRATEGY_REPROBE_SECONDS", "86400"))  # Retry a skipped method after this long
+STRATEGY_FLUSH_EVERY = int(os.getenv("STRATEGY_FLUSH_EVERY", "50"))          # Write the store after this many new attempts
+STRATEGY_FLUSH_SECONDS = float(os.getenv("STRATEGY_FLUSH_SECONDS", "30"))    # ...or once this long has passed since the last write
+
+# End-to-end latency budget for a /search request
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "300"))
+# Share of the budget each stage may use. Deadlines are cumulative, so time a stage
+# does not use rolls over to the stages after it.
+BUDGET_STAGE_SHARES = {
+    "search": 0.05,
+    "fetch": 0.45,
+    "clean": 0.05,
+    "retrieve": 0.05,
+    "llm": 0.40
+}
+
+# ZenRows API client
+ZENROWS_API_URL = os.getenv("ZENROWS_API_URL", "https://api.zenrows.com/v1/")  # Point at a local stand-in for tests
+ZENROWS_CONCURRENCY = int(os.getenv("ZENROWS_CONCURRENCY", "5"))  # Concurrent requests allowed by the ZenRows plan
+ZENROWS_TIMEOUT = float(os.getenv("ZENROWS_TIMEOUT", "60"))
+ZENROWS_MAX_RETRIES = int(os.getenv("ZENROWS_MAX_RETRIES", "2"))
+ZENROWS_RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+ZENROWS_PROXY_COUNTRY = "sa"
+
+# Process pool for the CPU-bound HTML -> text stage
+CLEAN_POOL_ENABLED = os.getenv("CLEAN_POOL_ENABLED", "true").lower() == "true"
+CLEAN_POOL_WORKERS = int(os.getenv("CLEAN_POOL_WORKERS", str(os.cpu_count() or 2)))
+CLEAN_POOL_START_METHOD = os.getenv("CLEAN_POOL_START_METHOD", "spawn")  # Fetch threads are running, so avoid fork
+
+# Main-content extraction (see scrapper_common/content_extractor.py)
+MAIN_CONTENT_LINK_DENSITY = float(os.getenv("MAIN_CONTENT_LINK_DENSITY", "0.5"))  # Link text share that marks a block as navigation
+MAIN_CONTENT_MIN_LINKS = int(os.getenv("MAIN_CONTENT_MIN_LINKS", "3"))            # Links a block needs before link density counts
+MAIN_CONTENT_MIN_DENSITY = float(os.getenv("MAIN_CONTENT_MIN_DENSITY", "2"))      # Non-link characters per element below which a block is markup
+MAIN_CONTENT_MIN_BLOCK_TAGS = int(os.getenv("MAIN_CONTENT_MIN_BLOCK_TAGS", "10")) # Elements a block needs before text density counts
+MAIN_CONTENT_MIN_CHARS = int(os.getenv("MAIN_CONTENT_MIN_CHARS", "200"))          # Keep the whole page if extraction leaves less than this
+# Tags and class/id hints that mark page chrome rather than content. A scraper's own
+# keep hints win over these (e.g. "product-header" is kept).
+BOILERPLATE_TAGS = ["nav", "aside"]
+BOILERPLATE_HINTS = [
+    "nav", "menu", "breadcrumb", "cookie", "consent", "banner", "newsletter", "subscribe",
+    "social", "share", "sidebar", "popup", "modal", "footer", "header"
+]
+# Hints of recommendation widgets. These win over keep hints, since the widgets are
+# usually named after what they show (e.g. "related-products").
+RECOMMENDATION_HINTS = ["related", "recommend", "similar", "carousel", "sponsored", "promo"]
+CHARS_PER_TOKEN = 4  # Rough size of an LLM token in characters, for reporting
+
+# Near-duplicate collapse of fetched pages and chunks (see scrapper_common/dedup.py)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))              # Words per shingle
+DEDUP_MIN_SHINGLES = int(os.getenv("DEDUP_MIN_SHINGLES", "16"))             # Shorter texts only collapse when identical
+DEDUP_DOC_MAX_DISTANCE = int(os.getenv("DEDUP_DOC_MAX_DISTANCE", "3"))      # SimHash bits two pages may differ by
+DEDUP_CHUNK_MAX_DISTANCE = int(os.getenv("DEDUP_CHUNK_MAX_DISTANCE", "3"))  # SimHash bits two chunks may differ by
+
+# Chunk index: BM25 postings for recently fetched pages, kept across requests
+CHUNK_INDEX_MAX_CHUNKS = int(os.getenv("CHUNK_INDEX_MAX_CHUNKS", "50000"))  # Least recently used pages are evicted past this
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))  # Term frequency saturation
+BM25_B = float(os.getenv("BM25_B", "0.75"))   # Chunk length normalization
+
+# Token-aware chunking (see scrapper_common/chunker.py); each scraper sets its model's context
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "512"))  # Floor when the prompt leaves less room than this
+
+# How many retrieved chunks go to the LLM stage (see scrapper_common/retrieval_depth.py):
+# "scores" cuts at the knee / relative score of the ranking, "latency" takes as many as
+# the LLM time budget allows, "fixed" always takes each route's maximum
+RETRIEVAL_DEPTH_MODE = os.getenv("RETRIEVAL_DEPTH_MODE", "scores")
+LLM_CHUNK_SECONDS = float(os.getenv("LLM_CHUNK_SECONDS", "10"))            # Expected LLM time per chunk before any is measured
+LLM_LATENCY_EWMA_ALPHA = float(os.getenv("LLM_LATENCY_EWMA_ALPHA", "0.3"))  # Weight of the newest measurement
+
+# Concurrent LLM stage (see scrapper_common/llm_stage.py): calls in flight at once per
+# backend, shared by all requests in the process
+LLM_CONCURRENCY = {
+    "groq": int(os.getenv("LLM_CONCURRENCY_GROQ", "4")),      # Hosted, limited by the account's rate limit
+    "ollama": int(os.getenv("LLM_CONCURRENCY_OLLAMA", "2")),  # Local, limited by OLLAMA_NUM_PARALLEL and the GPU
+    "fake": int(os.getenv("LLM_CONCURRENCY_FAKE", "8"))       # Offline stand-in, for load tests
+}
+
+# Persistent LLM response cache (see scrapper_common/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))  # Least recently used answers are evicted past this
+
+# LLM backends (see scrapper_common/llm_backends.py). Clients are built once per process
+# and reused, so their HTTP connection pools are too.
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11435")
+LLM_TIMEOUTS = {  # Seconds one call may take, per provider
+    "groq": float(os.getenv("LLM_TIMEOUT_GROQ", "60")),
+    "ollama": float(os.getenv("LLM_TIMEOUT_OLLAMA", "300")),
+    "fake": float(os.getenv("LLM_TIMEOUT_FAKE", "60"))
+}
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))  # Client-side retries on connection errors and 429s (Groq)
+# The "fake" backend replays canned answers offline, to load-test the pipeline without Groq or Ollama
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "2.0"))       # Seconds per call
+LLM_FAKE_JITTER = float(os.getenv("LLM_FAKE_JITTER", "0.5"))         # Latency varies by up to this share, per prompt
+LLM_FAKE_RESPONSES_FILE = os.getenv("LLM_FAKE_RESPONSES_FILE", "")   # JSON list of answers; the scraper's default if empty
@@ -0,0 +1,228 @@
+import re
+from quotaion_module.scrapper_common.config import (
+    MAIN_CONTENT_LINK_DENSITY,
+    MAIN_CONTENT_MIN_LINKS,
+    MAIN_CONTENT_MIN_DENSITY,
+    MAIN_CONTENT_MIN_BLOCK_TAGS,
+    MAIN_CONTENT_MIN_CHARS,
+    BOILERPLATE_TAGS,
+    BOILERPLATE_HINTS,
+    RECOMMENDATION_HINTS,
+    CHARS_PER_TOKEN,
+)
+
+# Elements that hold the page itself and are never dropped
+ROOT_TAGS = {"html", "body"}
+
+# Blocks at most this long are also checked for a signal as a whole, so a value split
+# across inline elements (e.g. <span>SAR</span><span>3,999</span>) is still found
+SHORT_BLOCK_CHARS = 64
+
+
+def _hint_regex(hints: list):
+    if not hints:
+        return None
+    # A hint matches at the start of a class or id word: "nav" matches "navbar" and
+    # "top-nav" but not "canvas"
+    return re.compile(r"(?<![a-z])(?:" + "|".join(re.escape(hint.lower()) for hint in hints) + ")")
+
+
+class ContentProfile:
+    """
+    A compiled description of which regions of a page matter to a scraper.
+
+    Built from a dict with any of these keys:
+        "keep_hints":     class/id words of regions to keep whole (e.g. "product", "contact")
+        "keep_pattern":   regex; blocks whose text matches it are never pruned for density
+        "keep_hrefs":     href prefixes that count as a match of keep_pattern (e.g. "mailto:")
+        "drop_hints":     class/id words of page chrome, overridden by keep_hints;
+                          defaults to BOILERPLATE_HINTS
+        "noise_hints":    class/id words of recommendation widgets, which override
+                          keep_hints; defaults to RECOMMENDATION_HINTS
+        "drop_tags":      tags of page chrome; defaults to BOILERPLATE_TAGS
+        "min_links":      links a block needs before its link density counts; defaults
+                          to MAIN_CONTENT_MIN_LINKS
+        "signal_overrides_hints": if True, a block matching keep_pattern is kept even
+                          when its class/id marks it as chrome (e.g. a footer with an email)
+    """
+
+    def __init__(self, profile: dict):
+        self.keep_regex = _hint_regex(profile.get("keep_hints", []))
+        self.drop_regex = _hint_regex(profile.get("drop_hints", BOILERPLATE_HINTS))
+        self.noise_regex = _hint_regex(profile.get("noise_hints", RECOMMENDATION_HINTS))
+        self.drop_tags = set(profile.get("drop_tags", BOILERPLATE_TAGS))
+        pattern = profile.get("keep_pattern")
+        self.signal_regex = re.compile(pattern) if pattern else None
+        self.keep_hrefs = tuple(profile.get("keep_hrefs", []))
+        self.min_links = profile.get("min_links", MAIN_CONTENT_MIN_LINKS)
+        self.signal_overrides_hints = profile.get("signal_overrides_hints", False)
+
+    def has_signal(self, text: str) -> bool:
+        return self.signal_regex is not None and self.signal_regex.search(text) is not None
+
+
+_compiled = {}
+
+
+def compile_profile(profile: dict) -> ContentProfile:
+    """
+    Compile a profile dict once and reuse it for every page.
+    """
+    key = id(profile)
+    if key not in _compiled:
+        _compiled[key] = ContentProfile(profile)
+    return _compiled[key]
+
+
+class BlockStats:
+    """
+    Text statistics for one element and everything under it.
+    """
+    __slots__ = ("chars", "link_chars", "links", "tags", "signal")
+
+    def __init__(self):
+        self.chars = 0
+        self.link_chars = 0
+        self.links = 0
+        self.tags = 1
+        self.signal = False
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / self.chars if self.chars else 0.0
+
+    @property
+    def text_density(self) -> float:
+        """
+        Non-link characters per element.
+        """
+        return (self.chars - self.link_chars) / self.tags
+
+
+def _block_stats(elements: list, profile: ContentProfile) -> dict:
+    """
+    Compute BlockStats for every element, children before parents.
+    """
+    stats = {}
+    for element in reversed(elements):
+        block = BlockStats()
+        strings = [element.text] + [child.tail for child in element]
+        for text in strings:
+            if text:
+                block.chars += len(text.strip())
+                if not block.signal and profile.has_signal(text):
+                    block.signal = True
+        for child in element:
+            child_block = stats.get(child)
+            if child_block is None:
+                continue
+            block.chars += child_block.chars
+            block.link_chars += child_block.link_chars
+            block.links += child_block.links
+            block.tags += child_block.tags
+            block.signal = block.signal or child_block.signal
+        if element.tag == "a":
+            block.links += 1
+            block.link_chars = block.chars
+            if profile.keep_hrefs and (element.get("href") or "").startswith(profile.keep_hrefs):
+                block.signal = True
+        if not block.signal and 0 < block.chars <= SHORT_BLOCK_CHARS and profile.has_signal(element.text_content()):
+            block.signal = True
+        stats[element] = block
+    return stats
+
+
+def _decide(element, block: BlockStats, profile: ContentProfile, in_kept_region: bool) -> tuple:
+    """
+    Decide what to do with one element. Returns (drop, keep_whole).
+    """
+    hints = f"{element.get('class', '')} {element.get('id', '')}".lower()
+    keep_hint = profile.keep_regex is not None and profile.keep_regex.search(hints) is not None
+    drop_hint = profile.drop_regex is not None and profile.drop_regex.search(hints) is not None
+    noise_hint = profile.noise_regex is not None and profile.noise_regex.search(hints) is not None
+
+    if (noise_hint or (drop_hint and not keep_hint)) and not (profile.signal_overrides_hints and block.signal):
+        return True, False
+    if keep_hint or in_kept_region:
+        return False, True
+    if block.signal:
+        return False, False
+    if element.tag in profile.drop_tags:
+        return True, False
+    if block.links >= profile.min_links and block.link_density > MAIN_CONTENT_LINK_DENSITY:
+        return True, False
+    if block.tags >= MAIN_CONTENT_MIN_BLOCK_TAGS and block.text_density < MAIN_CONTENT_MIN_DENSITY:
+        return True, False
+    return False, False
+
+
+def extract_main_content(root, profile: dict) -> dict:
+    """
+    Prune a parsed page down to its main content, in place.
+
+    Every block is scored by its link density (share of its text inside links) and
+    text density (non-link characters per element). Blocks that read as navigation,
+    empty markup or page chrome (nav, menus, cookie banners, related-product
+    carousels) are removed. Regions the profile names, and blocks whose text carries
+    the profile's signal (a price, an email address), are kept. If a page without any
+    signal would be pruned to almost nothing, it is left untouched.
+
+    Args:
+        root: The root element returned by html_cleaner.parse_html.
+        profile (dict): The scraper's content profile (see ContentProfile).
+
+    Returns:
+        dict: total_chars, kept_chars, saved_chars, saved_tokens, blocks_dropped and
+            fallback (True if the page was left untouched).
+    """
+    compiled = compile_profile(profile)
+    elements = [element for element in root.iter() if isinstance(element.tag, str)]
+    stats = _block_stats(elements, compiled)
+
+    dropped = []
+    stack = [(root, False)]
+    while stack:
+        element, in_kept_region = stack.pop()
+        keep_whole = in_kept_region
+        if element.tag not in ROOT_TAGS and element is not root:
+            drop, keep_whole = _decide(element, stats[element], compiled, in_kept_region)
+            if drop:
+                dropped.append(element)
+                continue
+        for child in reversed(element):
+            if isinstance(child.tag, str):
+                stack.append((child, keep_whole))
+
+    total_chars = stats[root].chars
+    kept_chars = total_chars - sum(stats[element].chars for element in dropped)
+    # A page showing the profile's signal keeps its signal blocks, however small; a page
+    # without one falls back to the whole page rather than a few stray paragraphs
+    fallback = bool(dropped) and not stats[root].signal and kept_chars < min(MAIN_CONTENT_MIN_CHARS, total_chars)
+    if fallback:
+        kept_chars = total_chars
+    else:
+        for element in dropped:
+            element.drop_tree()
+
+    saved_chars = total_chars - kept_chars
+    return {
+        "total_chars": total_chars,
+        "kept_chars": kept_chars,
+        "saved_chars": saved_chars,
+        "saved_tokens": saved_chars // CHARS_PER_TOKEN,
+        "blocks_dropped": 0 if fallback else len(dropped),
+        "fallback": fallback
+    }
+
+
+def format_report(url: str, report: dict) -> str:
+    """
+    One log line describing how much of a page main-content extraction removed.
+    """
+    if report["fallback"]:
+        return f"Main content for {url}: nothing clear enough to extract, kept all {report['total_chars']} chars"
+    return (
+        f"Main content for {url}: kept {report['kept_chars']} of {report['total_chars']} chars, "
+        f"saved {report['saved_chars']} chars (~{report['saved_tokens']} tokens) "
+        f"in {report['blocks_dropped']} blocks"
+    )
@@ -0,0 +1,136 @@
+import hashlib
+import re
+import numpy as np
+from quotaion_module.scrapper_common.config import (
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_MIN_SHINGLES,
+    DEDUP_DOC_MAX_DISTANCE,
+    DEDUP_CHUNK_MAX_DISTANCE,
+)
+
+TOKEN_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """
+    64-bit hashes of the text's overlapping word shingles (repeats included, so
+    frequent shingles weigh more). blake2b rather than hash(), which is salted per
+    process, so a text gets the same fingerprint in every worker and across restarts.
+    """
+    tokens = TOKEN_REGEX.findall(text.lower())
+    size = min(DEDUP_SHINGLE_SIZE, len(tokens)) or 1
+    shingles = (" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 0)))
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+         for shingle in shingles),
+        dtype=np.uint64
+    )
+
+
+def simhash(text: str) -> tuple:
+    """
+    Compute the 64-bit SimHash of a text. Texts that share most of their shingles get
+    fingerprints a few bits apart.
+
+    Returns:
+        tuple: (fingerprint, shingle_count)
+    """
+    hashes = _shingle_hashes(text)
+    if not len(hashes):
+        return 0, 0
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    fingerprint = int(np.packbits(majority, bitorder="little").view("<u8")[0])
+    return fingerprint, len(hashes)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _merge_sources(survivor: dict, duplicate: dict) -> dict:
+    """
+    Metadata for the survivor of a duplicate pair: its own, with every source URL of
+    both collected under "sources".
+    """
+    sources = list(survivor.get("sources") or [survivor.get("source")])
+    for source in duplicate.get("sources") or [duplicate.get("source")]:
+        if source not in sources:
+            sources.append(source)
+    return dict(survivor, sources=sources)
+
+
+def _collapse(items: list, text_of, metadata_of, rebuild, max_distance: int) -> list:
+    """
+    Keep one item per group of near-duplicates, in first-seen order. The survivor is
+    the longest text of its group and carries every source URL of the group.
+    Texts too short for a reliable fingerprint are only collapsed when identical.
+    """
+    survivors = []  # [fingerprint, shingle_count, item]
+    for item in items:
+        text = text_of(item)
+        fingerprint, count = simhash(text)
+        reliable = count >= DEDUP_MIN_SHINGLES
+        for entry in survivors:
+            kept = entry[2]
+            if reliable and entry[1] >= DEDUP_MIN_SHINGLES:
+                same = hamming_distance(fingerprint, entry[0]) <= max_distance
+            else:
+                same = text == text_of(kept)
+            if not same:
+                continue
+            if len(text) > len(text_of(kept)):
+                entry[0], entry[1] = fingerprint, count
+                entry[2] = rebuild(item, _merge_sources(metadata_of(item), metadata_of(kept)))
+            else:
+                entry[2] = rebuild(kept, _merge_sources(metadata_of(kept), metadata_of(item)))
+            break
+        else:
+            survivors.append([fingerprint, count, item])
+    return [entry[2] for entry in survivors]
+
+
+def dedupe_documents(documents: list, max_distance: int = DEDUP_DOC_MAX_DISTANCE) -> list:
+    """
+    Collapse near-duplicate cleaned pages (mobile/desktop variants, tracking-parameter
+    variants, syndicated listings) before they are chunked.
+
+    Args:
+        documents (list): langchain Documents with a "source" in their metadata.
+        max_distance (int): Largest SimHash Hamming distance still treated as the same page.
+
+    Returns:
+        list: The surviving Documents; each lists all merged URLs under metadata["sources"].
+    """
+    def rebuild(doc, metadata):
+        doc.metadata = metadata
+        return doc
+
+    survivors = _collapse(documents, lambda doc: doc.page_content, lambda doc: doc.metadata, rebuild, max_distance)
+    if len(survivors) < len(documents):
+        print(f"Collapsed {len(documents) - len(survivors)} near-duplicate pages into {len(survivors)}")
+    return survivors
+
+
+def dedupe_chunks(chunks: list, max_distance: int = DEDUP_CHUNK_MAX_DISTANCE) -> list:
+    """
+    Collapse near-duplicate chunks (e.g. the same product description on two sites)
+    before they are indexed for retrieval.
+
+    Args:
+        chunks (list): Dicts with "page_content" and "metadata".
+        max_distance (int): Largest SimHash Hamming distance still treated as the same chunk.
+
+    Returns:
+        list: The surviving chunks; each lists all merged URLs under metadata["sources"].
+    """
+    survivors = _collapse(
+        chunks,
+        lambda chunk: chunk["page_content"],
+        lambda chunk: chunk["metadata"],
+        lambda chunk, metadata: {"page_content": chunk["page_content"], "metadata": metadata},
+        max_distance
+    )
+    if len(survivors) < len(chunks):
+        print(f"Collapsed {len(chunks) - len(survivors)} near-duplicate chunks into {len(survivors)}")
+    return survivors
@@ -0,0 +1,232 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from quotaion_module.scrapper_common.config import (
+    CHROME_OPTIONS,
+    CHROME_EXPERIMENTAL_OPTIONS,
+    DRIVER_POOL_SIZE,
+    DRIVER_MAX_PAGES,
+    DRIVER_MAX_HEAP_MB,
+    DRIVER_LEASE_TIMEOUT,
+    DRIVER_PAGE_LOAD_TIMEOUT,
+)
+from quotaion_module.scrapper_common.budget import current_cancel_token
+
+
+def build_chrome_options() -> Options:
+    """
+    Build the Chrome options used for every pooled browser.
+    """
+    chrome_options = Options()
+    for opt in CHROME_OPTIONS:
+        chrome_options.add_argument(opt)
+    for name, value in CHROME_EXPERIMENTAL_OPTIONS.items():
+        chrome_options.add_experimental_option(name, value)
+    return chrome_options
+
+
+class PooledDriver:
+    """
+    A Chrome WebDriver together with the bookkeeping the pool needs to recycle it.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+        self.killed = False
+
+
+class DriverPool:
+    """
+    A bounded pool of long-lived Chrome WebDrivers.
+
+    At most `size` browsers exist at once. Idle browsers are kept warm and handed
+    out again on the next lease; each one is health-checked on checkout, wiped of
+    cookies and storage on return, and recycled after `max_pages` pages or once its
+    JS heap exceeds `max_heap_mb`.
+    """
+
+    def __init__(self, size: int = DRIVER_POOL_SIZE, max_pages: int = DRIVER_MAX_PAGES,
+                 max_heap_mb: int = DRIVER_MAX_HEAP_MB, lease_timeout: float = DRIVER_LEASE_TIMEOUT,
+                 options_factory=build_chrome_options):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.lease_timeout = lease_timeout
+        self.options_factory = options_factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+        self._stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0, "killed": 0}
+
+    def _create(self) -> PooledDriver:
+        driver = webdriver.Chrome(options=self.options_factory())
+        driver.set_page_load_timeout(DRIVER_PAGE_LOAD_TIMEOUT)
+        with self._lock:
+            self._stats["created"] += 1
+        return PooledDriver(driver)
+
+    def _discard(self, pooled: PooledDriver) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Error quitting pooled driver: {e}")
+
+    def _kill(self, pooled: PooledDriver) -> None:
+        """
+        Quit a leased browser from another thread, aborting whatever page it is loading.
+        """
+        pooled.killed = True
+        self._discard(pooled)
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    def _heap_mb(self, pooled: PooledDriver) -> float:
+        try:
+            used = pooled.driver.execute_script(
+                "return (window.performance && performance.memory) ? performance.memory.usedJSHeapSize : 0"
+            )
+            return (used or 0) / (1024 * 1024)
+        except WebDriverException:
+            return 0
+
+    def _needs_recycle(self, pooled: PooledDriver) -> bool:
+        if pooled.pages >= self.max_pages:
+            return True
+        return self._heap_mb(pooled) >= self.max_heap_mb
+
+    def _reset(self, pooled: PooledDriver) -> None:
+        """
+        Clear cookies, storage and per-lease timeouts left by the previous page so
+        leases do not leak state.
+        """
+        driver = pooled.driver
+        try:
+            origin = driver.execute_script("return window.location.origin")
+            if origin and origin != "null":
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        except WebDriverException:
+            driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.delete_all_cookies()
+        driver.set_page_load_timeout(DRIVER_PAGE_LOAD_TIMEOUT)
+        driver.get("about:blank")
+
+    def _checkout(self) -> PooledDriver:
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                return self._create()
+            if self._is_healthy(pooled):
+                with self._lock:
+                    self._stats["reused"] += 1
+                return pooled
+            with self._lock:
+                self._stats["unhealthy"] += 1
+            self._discard(pooled)
+
+    def _checkin(self, pooled: PooledDriver) -> None:
+        pooled.pages += 1
+        if pooled.killed:
+            with self._lock:
+                self._stats["killed"] += 1
+            return
+        recycle = self._closed or self._needs_recycle(pooled)
+        if not recycle:
+            try:
+                self._reset(pooled)
+            except WebDriverException as e:
+                print(f"Could not reset pooled driver, discarding it: {e}")
+                recycle = True
+        if recycle:
+            with self._lock:
+                self._stats["recycled"] += 1
+            self._discard(pooled)
+            return
+        with self._lock:
+            self._idle.append(pooled)
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        """
+        Borrow a driver for one page. The driver goes back to the pool when the
+        `with` block exits, whether or not the block raised. If the fetch running on
+        this thread is cancelled meanwhile, the browser is quit instead.
+
+        Usage:
+            with get_driver_pool().lease() as driver:
+                driver.get(url)
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        token = current_cancel_token()
+        if not self._slots.acquire(timeout=self.lease_timeout if timeout is None else timeout):
+            raise TimeoutError("Timed out waiting for a free browser in the driver pool")
+        try:
+            pooled = self._checkout()
+            kill = lambda: self._kill(pooled)
+            if token is not None:
+                token.on_cancel(kill)
+            try:
+                if token is not None:
+                    token.raise_if_cancelled()
+                yield pooled.driver
+            finally:
+                if token is not None:
+                    token.remove_callback(kill)
+                self._checkin(pooled)
+        finally:
+            self._slots.release()
+
+    def warm(self, count: int = None) -> None:
+        """
+        Start up to `count` browsers ahead of time so the first requests skip Chrome startup.
+        """
+        count = self.size if count is None else min(count, self.size)
+        with self._lock:
+            missing = count - len(self._idle)
+        for _ in range(max(missing, 0)):
+            pooled = self._create()
+            with self._lock:
+                self._idle.append(pooled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle), size=self.size)
+
+    def close(self) -> None:
+        """
+        Quit every idle browser. Leased browsers are quit when they are returned.
+        """
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """
+    Return the process-wide driver pool shared by the price and email scrapers.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,136 @@
+import lxml.html
+from lxml import etree
+from quotaion_module.scrapper_common.text_normalizer import KeywordMatcher
+
+# Elements whose text is never page content; html2text drops them anyway, so removing
+# them early only saves work
+NON_CONTENT_TAGS = ["script", "style", "noscript", "template"]
+
+
+class CleanRules:
+    """
+    A compiled, declarative rule set for clean_html_fast.
+
+    Built from a dict with any of these keys:
+        "tags":          tag names whose whole subtree is dropped
+        "classes":       class names; an element with any of them is dropped
+        "ids":           element ids that are dropped
+        "href_patterns": substrings; links whose href contains one are dropped
+        "text_keywords": UI labels; a text run is removed when its whole (stripped)
+                         text is one of them, or when it contains a multi-word
+                         label as whole words (matched with a single Aho-Corasick
+                         automaton). A single word never removes a longer text, so
+                         "Mute" does not blank a product title that mentions it.
+    """
+
+    def __init__(self, rules: dict):
+        self.tags = set(rules.get("tags", [])) | set(NON_CONTENT_TAGS)
+        self.classes = set(rules.get("classes", []))
+        self.ids = set(rules.get("ids", []))
+        self.href_patterns = list(rules.get("href_patterns", []))
+        keywords = [keyword.strip() for keyword in rules.get("text_keywords", []) if keyword.strip()]
+        self.text_labels = set(keywords)
+        self.text_keywords = KeywordMatcher([keyword for keyword in keywords if " " in keyword])
+
+    def drops(self, element) -> bool:
+        """
+        Returns True if the element's whole subtree should be removed.
+        """
+        if element.tag in self.tags:
+            return True
+        if self.ids and element.get("id") in self.ids:
+            return True
+        if self.classes:
+            class_attr = element.get("class")
+            if class_attr and not self.classes.isdisjoint(class_attr.split()):
+                return True
+        if self.href_patterns and element.tag == "a":
+            href = element.get("href")
+            if href and any(pattern in href for pattern in self.href_patterns):
+                return True
+        return False
+
+    def has_keyword(self, text: str) -> bool:
+        return text.strip() in self.text_labels or self.text_keywords.search(text, whole_words=True)
+
+
+_compiled = {}
+
+
+def compile_rules(rules: dict) -> CleanRules:
+    """
+    Compile a rule dict once and reuse it for every page.
+    """
+    key = id(rules)
+    if key not in _compiled:
+        _compiled[key] = CleanRules(rules)
+    return _compiled[key]
+
+
+def parse_html(html_content: str):
+    """
+    Parse HTML with lxml's C parser (comments dropped). Returns the root element, or
+    None if the document has no elements.
+    """
+    parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    try:
+        return lxml.html.fromstring(html_content.encode("utf-8"), parser=parser)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def serialize_html(root) -> str:
+    return lxml.html.tostring(root, encoding="unicode")
+
+
+def clean_tree(root, rules: dict) -> None:
+    """
+    Remove unwanted subtrees and text from a parsed page in place, in a single traversal.
+
+    The tree is walked depth-first; a subtree that matches the rules is marked and not
+    descended into, and text runs that are UI labels are blanked as they are visited.
+    Marked subtrees are then detached (their tail text, which belongs to the parent,
+    is kept).
+
+    Args:
+        root: The root element returned by parse_html.
+        rules (dict): The declarative rule set (see CleanRules).
+    """
+    compiled = compile_rules(rules)
+    dropped = []
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str):
+            # Processing instructions and entities carry no content
+            continue
+        if element is not root and compiled.drops(element):
+            dropped.append(element)
+            continue
+        if compiled.text_labels:
+            if element.text and compiled.has_keyword(element.text):
+                element.text = None
+            if element.tail and compiled.has_keyword(element.tail):
+                element.tail = None
+        stack.extend(reversed(element))
+
+    for element in dropped:
+        element.drop_tree()
+
+
+def clean_html_fast(html_content: str, rules: dict) -> str:
+    """
+    Remove unwanted subtrees and text from HTML in a single traversal (see clean_tree).
+
+    Args:
+        html_content (str): The HTML to clean.
+        rules (dict): The declarative rule set (see CleanRules).
+
+    Returns:
+        str: The cleaned HTML.
+    """
+    root = parse_html(html_content)
+    if root is None:
+        return ""
+    clean_tree(root, rules)
+    return serialize_html(root)
@@ -0,0 +1,149 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from quotaion_module.scrapper_common.budget import FetchCancelled, current_cancel_token
+from quotaion_module.scrapper_common.config import (
+    HTTP_TIMEOUT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_HEADERS,
+    HTTP_MIN_BODY_BYTES,
+    JS_SHELL_MARKERS,
+    THROTTLE_STATUS_CODES,
+)
+
+
+class HTTPFetchError(Exception):
+    """
+    Raised when a plain-HTTP fetch returns an error status.
+    """
+
+    def __init__(self, url: str, status_code: int):
+        super().__init__(f"HTTP {status_code} fetching {url}")
+        self.url = url
+        self.status_code = status_code
+
+
+_session = None
+_session_lock = threading.Lock()
+_status_listeners = []
+
+
+def add_status_listener(listener) -> None:
+    """
+    Register a callable invoked as listener(url, status_code, retry_after) after every
+    plain-HTTP response. The fetch scheduler uses this to back off throttled domains.
+    """
+    _status_listeners.append(listener)
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide keep-alive session used by the plain-HTTP tier.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(HTTP_HEADERS)
+            _session = session
+        return _session
+
+
+def fetch_page_http(url: str, etag: str = None, last_modified: str = None, timeout: float = HTTP_TIMEOUT) -> tuple:
+    """
+    Fetch a page with a pooled plain-HTTP GET, optionally as a conditional request.
+
+    Returns:
+        tuple: (status_code, html_content, validators) where validators holds the
+            response's ETag and Last-Modified headers. html_content is None on 304.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = get_http_session().get(url, headers=headers, timeout=timeout)
+    for listener in _status_listeners:
+        listener(url, response.status_code, response.headers.get("Retry-After"))
+    if response.status_code >= 400:
+        raise HTTPFetchError(url, response.status_code)
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified")
+    }
+    if response.status_code == 304:
+        return 304, None, validators
+    return response.status_code, response.text, validators
+
+
+def fetch_html_http(url: str, timeout: float = HTTP_TIMEOUT) -> str:
+    """
+    Fetch HTML content from the given URL with a pooled, compressed plain-HTTP GET.
+    """
+    _, html_content, _ = fetch_page_http(url, timeout=timeout)
+    return html_content
+
+
+def is_content_sufficient(html_content: str, signal_pattern) -> bool:
+    """
+    Decide whether a page fetched without a browser is good enough to use.
+
+    A page is insufficient when its body is tiny, when it looks like a JavaScript
+    shell or bot-check page, or when `signal_pattern` (a compiled regex for price
+    or email signals) finds nothing in it.
+    """
+    if not html_content or len(html_content) < HTTP_MIN_BODY_BYTES:
+        return False
+    lowered = html_content.lower()
+    if any(marker in lowered for marker in JS_SHELL_MARKERS):
+        return False
+    return signal_pattern.search(html_content) is not None
+
+
+def fetch_html_tiered(url: str, tiers: list, is_sufficient, record=None) -> tuple:
+    """
+    Try each fetch tier in order and stop at the first one whose HTML is sufficient.
+
+    Args:
+        url (str): The URL to fetch.
+        tiers (list): (name, fetch_function) pairs, cheapest first.
+        is_sufficient (callable): Takes the HTML and returns True if it can be used.
+        record (callable, optional): Called as record(name, success, latency) after
+            every tier attempt, e.g. to feed the per-domain strategy store.
+
+    Returns:
+        tuple: (html_content, tier_name). If no tier was sufficient, the HTML from the
+            last tier that answered is returned.
+    """
+    errors = []
+    fallback = None
+    token = current_cancel_token()
+    for name, fetch in tiers:
+        if token is not None:
+            token.raise_if_cancelled()
+        started = time.time()
+        try:
+            html_content = fetch(url)
+        except Exception as e:
+            if token is not None and token.cancelled:
+                raise FetchCancelled(f"Fetch of {url} cancelled: the request ran out of time")
+            errors.append(f"{name}: {e}")
+            # Throttling says we were too fast, not that the method cannot fetch the site
+            throttled = isinstance(e, HTTPFetchError) and e.status_code in THROTTLE_STATUS_CODES
+            if record and not throttled:
+                record(name, False, time.time() - started)
+            continue
+        sufficient = is_sufficient(html_content)
+        if record:
+            record(name, sufficient, time.time() - started)
+        if sufficient:
+            return html_content, name
+        fallback = (html_content, name)
+    if fallback is not None:
+        return fallback
+    raise Exception(f"All fetch tiers failed for {url}: {'; '.join(errors)}")
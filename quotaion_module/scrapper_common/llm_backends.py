@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from langchain_core.messages import AIMessage
+from quotaion_module.scrapper_common.config import (
+    LLM_CONCURRENCY,
+    LLM_TIMEOUTS,
+    LLM_FAKE_LATENCY,
+    LLM_FAKE_JITTER,
+    LLM_FAKE_RESPONSES_FILE,
+)
+
+
+def _prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(str(getattr(message, "content", message)) for message in prompt)
+
+
+class FakeChatModel:
+    """
+    A deterministic stand-in for a chat model, for load-testing the pipeline offline.
+
+    Each call sleeps for the configured latency and returns one of the canned
+    answers. Both are picked by a hash of the prompt, so the same prompt always gets
+    the same answer after the same delay, whatever order concurrent calls run in.
+    """
+
+    def __init__(self, responses: list, latency: float = LLM_FAKE_LATENCY, jitter: float = LLM_FAKE_JITTER,
+                 model_name: str = "fake"):
+        self.responses = responses
+        self.latency = latency
+        self.jitter = jitter
+        self.model_name = model_name
+        self.temperature = 0
+        self.calls = 0
+
+    def _answer(self, prompt) -> tuple:
+        digest = int(hashlib.sha256(_prompt_text(prompt).encode("utf-8")).hexdigest(), 16)
+        response = self.responses[digest % len(self.responses)]
+        # Spread the latency over [1 - jitter, 1 + jitter] times the base
+        spread = (digest >> 64) % 1000 / 999 * 2 - 1
+        return response, max(self.latency * (1 + self.jitter * spread), 0.0)
+
+    def invoke(self, prompt, **kwargs) -> AIMessage:
+        response, delay = self._answer(prompt)
+        self.calls += 1
+        time.sleep(delay)
+        return AIMessage(content=response)
+
+    async def ainvoke(self, prompt, **kwargs) -> AIMessage:
+        response, delay = self._answer(prompt)
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return AIMessage(content=response)
+
+
+def load_fake_responses(default: list) -> list:
+    """
+    Canned answers for the fake backend: the JSON list in LLM_FAKE_RESPONSES_FILE if
+    set, otherwise the scraper's default.
+    """
+    if not LLM_FAKE_RESPONSES_FILE:
+        return default
+    with open(LLM_FAKE_RESPONSES_FILE, "r", encoding="utf-8") as f:
+        responses = json.load(f)
+    return [response if isinstance(response, str) else json.dumps(response) for response in responses]
+
+
+class LLMBackend:
+    """
+    A configured LLM client with the limits it is used under: the provider whose
+    concurrency limit (LLM_CONCURRENCY) it shares and the timeout of one call.
+    Answers of the fake provider are canned, so they are never written to (or served
+    from) the LLM answer cache.
+    """
+
+    def __init__(self, name: str, provider: str, client, timeout: float = None):
+        self.name = name
+        self.provider = provider
+        self.client = client
+        self.timeout = timeout if timeout is not None else LLM_TIMEOUTS.get(provider)
+        self.concurrency = LLM_CONCURRENCY.get(provider, 1)
+        self.cacheable = provider != "fake"
+        self.created_at = time.time()
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "provider": self.provider,
+            "model": getattr(self.client, "model_name", None) or getattr(self.client, "model", None),
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "cacheable": self.cacheable,
+        }
+
+
+_factories = {}
+_backends = {}
+_lock = threading.Lock()
+
+
+def register_backend(namespace: str, name: str, provider: str, factory) -> None:
+    """
+    Register how to build a scraper's backend. factory takes no arguments and returns
+    the client; it runs once, when the backend is first used or at startup.
+    """
+    with _lock:
+        _factories[(namespace, name)] = (provider, factory)
+
+
+def get_llm_backend(namespace: str, name: str) -> LLMBackend:
+    """
+    Return the process-wide backend `name` of a scraper ("price" or "email"),
+    building its client on first use.
+    """
+    with _lock:
+        key = (namespace, name)
+        if key not in _backends:
+            if key not in _factories:
+                known = sorted(backend for ns, backend in _factories if ns == namespace)
+                raise ValueError(f"Unknown LLM backend {name!r} for {namespace}; expected one of {known}")
+            provider, factory = _factories[key]
+            _backends[key] = LLMBackend(name, provider, factory())
+        return _backends[key]
+
+
+def configure_llm_backends(selected: dict) -> None:
+    """
+    Build the selected backends at startup, so configuration errors show up in the
+    log before the first request and no request pays for creating a client. A
+    backend that fails to build is retried (and fails) on first use instead.
+
+    Args:
+        selected (dict): {namespace: [backend names]}.
+    """
+    for namespace, names in selected.items():
+        for name in dict.fromkeys(names):
+            try:
+                backend = get_llm_backend(namespace, name)
+                print(f"LLM backend ready: {namespace} {backend.describe()}")
+            except Exception as e:
+                print(f"Could not set up LLM backend {namespace}/{name}: {e}")
+
+
+def backend_stats() -> list:
+    with _lock:
+        return [dict(backend.describe(), namespace=namespace) for (namespace, _), backend in _backends.items()]
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from quotaion_module.scrapper_common.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DIR,
+    LLM_CACHE_MAX_ENTRIES,
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query so trivially different spellings share cache entries:
+    Unicode NFKC, lowercase, and runs of whitespace collapsed to one space.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query).lower()).strip()
+
+
+def llm_identity(llm) -> tuple:
+    """
+    (model name, temperature) of a langchain chat model, for cache keys.
+    ChatGroq calls the model `model_name`, ChatOllama calls it `model`.
+    """
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return model, getattr(llm, "temperature", None)
+
+
+def decoding_options(llm) -> dict:
+    """
+    Settings of a langchain chat model that change its answers besides the model and
+    temperature: Ollama's output format (JSON schema) and context size, and the
+    response_format sent to Groq.
+    """
+    return {
+        "format": getattr(llm, "format", None),
+        "response_format": (getattr(llm, "model_kwargs", None) or {}).get("response_format"),
+        "num_ctx": getattr(llm, "num_ctx", None),
+    }
+
+
+def chunk_fingerprint(content: str, metadata: dict) -> str:
+    """
+    Hash of a chunk as the prompt shows it: its text and its metadata (the source
+    URL goes into the answer, so the same text from another page is another entry).
+    """
+    digest = hashlib.sha256(content.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def call_fingerprint(documents: list) -> str:
+    """
+    Hash of the (content, metadata) chunks one call sends, in the order it sends
+    them. A call with one chunk has that chunk's fingerprint.
+    """
+    if len(documents) == 1:
+        return chunk_fingerprint(*documents[0])
+    digest = hashlib.sha256()
+    for content, metadata in documents:
+        digest.update(chunk_fingerprint(content, metadata).encode("ascii"))
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    A persistent cache of LLM answers, one SQLite file per scraper.
+
+    An answer is keyed by the model, its temperature and decoding options, the prompt
+    template version, the normalized query and the chunk fingerprint, so it is reused
+    only for a call that would send the same prompt to the same model. Only successful
+    answers are stored. Past max_entries the least recently used answers are evicted.
+
+    Hits do not write to the database one by one: their last-used times are batched
+    and written every TOUCH_BATCH hits or with the next store.
+    """
+
+    TOUCH_BATCH = 64
+
+    def __init__(self, namespace: str, directory: str = LLM_CACHE_DIR,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, enabled: bool = LLM_CACHE_ENABLED):
+        self.namespace = namespace
+        self.path = os.path.join(directory, f"{namespace}.sqlite3")
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+        self._db = None
+        self._entries = 0
+        self._touched = {}  # key -> last-used time not yet written
+        if enabled:
+            self._open()
+
+    def _open(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, model TEXT, created_at REAL, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+            self._db.commit()
+            self._entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Could not open LLM cache {self.path}, continuing without it: {e}")
+            self._db = None
+
+    @staticmethod
+    def make_key(model: str, temperature, prompt_version: str, query: str, fingerprint: str,
+                 options: dict = None) -> str:
+        raw = json.dumps(
+            [model, temperature, options or {}, prompt_version, normalize_query(query), fingerprint],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str:
+        """
+        Return the cached answer for the key, or None, counting the hit or miss.
+        """
+        if self._db is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT response FROM answers WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+                self._touched[key] = time.time()
+                if len(self._touched) >= self.TOUCH_BATCH:
+                    self._write_touches()
+                    self._db.commit()
+                self._stats["hits"] += 1
+                return row[0]
+            except sqlite3.Error as e:
+                print(f"Could not read LLM cache entry: {e}")
+                self._stats["errors"] += 1
+                return None
+
+    def _write_touches(self) -> None:
+        """
+        Write the batched last-used times of cache hits (call with the lock held).
+        """
+        if self._touched:
+            self._db.executemany(
+                "UPDATE answers SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def put(self, key: str, response: str, model: str = None) -> None:
+        """
+        Store an answer, evicting the least recently used ones past max_entries.
+        """
+        if self._db is None:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                # Eviction below needs the last-used times of recent hits
+                self._write_touches()
+                existed = self._db.execute("SELECT 1 FROM answers WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, response, model, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)", (key, response, model, now, now)
+                )
+                if existed is None:
+                    self._entries += 1
+                excess = self._entries - self.max_entries
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM answers WHERE key IN "
+                        "(SELECT key FROM answers ORDER BY last_used LIMIT ?)", (excess,)
+                    )
+                    self._entries -= excess
+                    self._stats["evictions"] += excess
+                self._db.commit()
+                self._stats["stores"] += 1
+            except sqlite3.Error as e:
+                print(f"Could not write LLM cache entry: {e}")
+                self._stats["errors"] += 1
+
+    def keys_for(self, llm, prompt_version: str, query: str, calls: list, output_mode: str = None) -> list:
+        """
+        Cache keys for a batch of LLM calls made for the query.
+
+        Args:
+            calls (list): Per call, the list of (content, metadata) chunks it sends,
+                in rank order. Only the chunks are fingerprinted, not the rendered
+                prompt, so the query counts only in its normalized form.
+            output_mode (str): The caller's answer mode (e.g. LLM_OUTPUT_MODE), which
+                decides how an answer is parsed.
+        """
+        model, temperature = llm_identity(llm)
+        options = dict(decoding_options(llm), output_mode=output_mode)
+        return [
+            self.make_key(model, temperature, prompt_version, query, call_fingerprint(documents), options)
+            for documents in calls
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, entries=self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["enabled"] = self._db is not None
+        stats["namespace"] = self.namespace
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(namespace: str) -> LLMCache:
+    """
+    Return the process-wide LLM answer cache for a scraper ("price" or "email").
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = LLMCache(namespace)
+        return _caches[namespace]
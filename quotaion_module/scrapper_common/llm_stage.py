@@ -0,0 +1,145 @@
+import asyncio
+import time
+import weakref
+from quotaion_module.scrapper_common.llm_cache import llm_identity
+from quotaion_module.scrapper_common.llm_backends import LLMBackend
+
+# Semaphores belong to the event loop they were first used on, so keep one set per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_llm_semaphore(backend: LLMBackend) -> asyncio.Semaphore:
+    """
+    Return the process-wide semaphore that bounds the calls in flight to a backend's
+    provider (LLM_CONCURRENCY), so concurrent requests share the limit instead of
+    each sending its own batch.
+    """
+    semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if backend.provider not in semaphores:
+        semaphores[backend.provider] = asyncio.Semaphore(max(backend.concurrency, 1))
+    return semaphores[backend.provider]
+
+
+async def _invoke_chunk(backend: LLMBackend, index: int, prompt: str, metadata: dict, semaphore: asyncio.Semaphore,
+                        deadline: float, invoke_kwargs: dict, latency, cache, cache_key: str) -> dict:
+    llm = backend.client
+    result = {"index": index, "response": None, "metadata": metadata, "error": None, "skipped": False, "cached": False}
+    if cache is not None and cache_key:
+        # A cached answer needs no slot, and is served even when the budget is spent.
+        # SQLite calls block, so they run off the event loop
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            result.update(response=cached, cached=True, seconds=0.0)
+            return result
+    async with semaphore:
+        remaining = deadline - time.time() if deadline else None
+        if remaining is not None and remaining <= 0:
+            result.update(error="time budget spent before the call started", skipped=True)
+            return result
+        budget_bound = remaining is not None and (backend.timeout is None or remaining < backend.timeout)
+        timeout = remaining if budget_bound else backend.timeout
+        started = time.time()
+        try:
+            response = await asyncio.wait_for(llm.ainvoke(prompt, **invoke_kwargs), timeout=timeout)
+            result["response"] = response.content
+            if latency is not None:
+                # Depth is chosen in chunks, and a packed call answers several of them
+                latency.observe((time.time() - started) / metadata.get("chunks", 1))
+            if cache is not None and cache_key:
+                await asyncio.to_thread(cache.put, cache_key, response.content, llm_identity(llm)[0])
+        except asyncio.TimeoutError:
+            if budget_bound:
+                result["error"] = "time budget spent during the call"
+            else:
+                result["error"] = f"{backend.name} call timed out after {backend.timeout}s"
+        except Exception as e:
+            result["error"] = str(e)
+        result["seconds"] = round(time.time() - started, 3)
+        return result
+
+
+async def stream_llm_stage(backend: LLMBackend, prompts: list, deadline: float = None,
+                           invoke_kwargs: dict = None, latency=None, cache=None, cache_keys: list = None):
+    """
+    Send the chunk prompts to the LLM concurrently and yield each result as it finishes.
+
+    At most LLM_CONCURRENCY[provider] calls are in flight across the process. A call
+    that has not started by the deadline is skipped, and one still running at the
+    deadline or past the backend's timeout is cancelled. Errors are captured per chunk
+    rather than raised. With a cache, a chunk whose answer is cached skips the call,
+    and new answers are stored; the cache is ignored for a backend that is not
+    cacheable (the fake backend).
+
+    Args:
+        backend (LLMBackend): The client to call (see get_llm_backend).
+        prompts (list): (prompt, metadata) pairs, in retrieval order. A prompt is a
+            string or a list of messages.
+        deadline (float): Absolute time (time.time()) the stage must finish by.
+        invoke_kwargs (dict): Extra arguments for ainvoke (e.g. Ollama options).
+        latency (LatencyTracker): Fed the time per chunk of each successful call
+            (metadata["chunks"] says how many chunks a call packs).
+        cache (LLMCache): Answer cache to read and fill.
+        cache_keys (list): The cache key of each prompt (see LLMCache.keys_for).
+
+    Yields:
+        dict: {"index", "response", "metadata", "error", "skipped", "cached", "seconds"},
+            in completion order; index is the prompt's position in prompts.
+    """
+    semaphore = get_llm_semaphore(backend)
+    if not backend.cacheable:
+        cache = None
+    tasks = [
+        asyncio.create_task(
+            _invoke_chunk(backend, index, prompt, metadata, semaphore, deadline, invoke_kwargs or {}, latency,
+                          cache, cache_keys[index] if cache_keys else None)
+        )
+        for index, (prompt, metadata) in enumerate(prompts)
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Reached early when the client disconnects from a stream
+        for task in tasks:
+            task.cancel()
+
+
+async def run_llm_stage(backend: LLMBackend, prompts: list, deadline: float = None,
+                        invoke_kwargs: dict = None, latency=None, cache=None, cache_keys: list = None) -> list:
+    """
+    Run stream_llm_stage to the end and return the results in prompt order.
+    """
+    results = [
+        result async for result in
+        stream_llm_stage(backend, prompts, deadline, invoke_kwargs, latency, cache, cache_keys)
+    ]
+    return sorted(results, key=lambda result: result["index"])
+
+
+def summarize_llm_results(results: list) -> tuple:
+    """
+    Split ordered stage results into the responses for extraction and the failures.
+
+    Returns:
+        tuple: (responses, errors). responses are {"response", "metadata"} dicts in
+            prompt order; errors are {"call", "source", "error"} dicts, call being
+            1-based.
+    """
+    responses = []
+    errors = []
+    for result in results:
+        if result["error"] is None:
+            responses.append({"response": result["response"], "metadata": result["metadata"]})
+        else:
+            errors.append({
+                "call": result["index"] + 1,
+                "source": result["metadata"].get("source"),
+                "error": result["error"],
+            })
+            if not result["skipped"]:
+                print(f"Error processing LLM call {result['index'] + 1}: {result['error']}")
+    skipped = sum(1 for result in results if result["skipped"])
+    cached = sum(1 for result in results if result.get("cached"))
+    print(f"LLM stage: {len(responses)} answered ({cached} from cache), {len(errors) - skipped} failed, "
+          f"{skipped} skipped for time")
+    return responses, errors
@@ -0,0 +1,318 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from quotaion_module.scrapper_common.config import (
+    PAGE_CACHE_ENABLED,
+    PAGE_CACHE_DIR,
+    PAGE_CACHE_TTL,
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_DOMAIN_TTLS,
+    TRACKING_PARAMS,
+)
+from quotaion_module.scrapper_common.http_fetch import fetch_page_http
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different links to the same page share a cache key.
+    Lowercases the scheme and host, drops default ports, fragments and tracking
+    parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith("utm_")
+    ]
+    query.sort()
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def domain_ttl(url: str) -> int:
+    """
+    Return the freshness lifetime in seconds for the URL's domain.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    for domain, ttl in PAGE_CACHE_DOMAIN_TTLS.items():
+        if domain in host:
+            return ttl
+    return PAGE_CACHE_TTL
+
+
+class PageCache:
+    """
+    A persistent page cache keyed by canonical URL.
+
+    Each entry is one gzip-compressed JSON file holding the raw HTML, the cleaned
+    text produced from it (plus anything else the clean step extracted), when and how
+    it was fetched, and the ETag/Last-Modified validators from plain-HTTP fetches so
+    stale entries can be revalidated cheaply.
+
+    The files of a namespace are kept under `max_bytes`: once a write pushes them past
+    it, the entries fetched longest ago are deleted until they fit again.
+    """
+
+    # Evict down to this fraction of max_bytes so eviction does not run on every write
+    EVICT_TO = 0.9
+
+    def __init__(self, namespace: str, directory: str = PAGE_CACHE_DIR, enabled: bool = PAGE_CACHE_ENABLED,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.namespace = namespace
+        self.directory = os.path.join(directory, namespace)
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._bytes = None  # Size of the files on disk, counted on the first write
+        self._stats = {
+            "hits": 0, "misses": 0, "revalidated": 0, "stale": 0, "stores": 0,
+            "skipped": 0, "evictions": 0, "errors": 0
+        }
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, url: str) -> dict:
+        """
+        Return the cached entry for the URL, or None if there is none.
+        """
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read page cache entry for {url}: {e}")
+            self._record("errors")
+            return None
+
+    def put(self, url: str, html_content: str, text, method: str, validators: dict = None) -> dict:
+        """
+        Store the fetched HTML and its cleaned text for the URL. `text` may also be a
+        dict with a "text" key, whose other keys are stored alongside it.
+        """
+        validators = validators or {}
+        extras = None
+        if isinstance(text, dict):
+            extras = {key: value for key, value in text.items() if key != "text"}
+            text = text["text"]
+        entry = {
+            "url": url,
+            "canonical_url": canonical_url(url),
+            "fetched_at": time.time(),
+            "ttl": domain_ttl(url),
+            "method": method,
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "html": html_content,
+            "text": text
+        }
+        if extras is not None:
+            entry["extras"] = extras
+        self._write(url, entry)
+        self._record("stores")
+        return entry
+
+    def _write(self, url: str, entry: dict) -> None:
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(entry, f)
+            added = os.path.getsize(tmp_path)
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write page cache entry for {url}: {e}")
+            self._record("errors")
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._disk_usage()
+            else:
+                self._bytes += added - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _entries(self) -> list:
+        """
+        List the cache files of this namespace as (mtime, size, path) tuples.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        return entries
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """
+        Delete the entries fetched longest ago (file mtime tracks fetched_at) until the
+        namespace is back under EVICT_TO of max_bytes.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return  # Another thread is already evicting
+        try:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * self.EVICT_TO
+            evicted = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            with self._lock:
+                self._bytes = total
+                self._stats["evictions"] += evicted
+        finally:
+            self._evict_lock.release()
+
+    @staticmethod
+    def _result(entry: dict):
+        """
+        Rebuild what the clean step returned: the text, or a dict if it returned one.
+        """
+        if "extras" in entry:
+            return dict(entry["extras"], text=entry["text"])
+        return entry["text"]
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < entry["ttl"]
+
+    def has_fresh(self, url: str) -> bool:
+        """
+        Returns True if the URL can be served from the cache without touching the network.
+        """
+        if not self.enabled:
+            return False
+        # Entries are rewritten whenever they are fetched or revalidated, so the
+        # file's mtime tracks fetched_at without decompressing the entry
+        try:
+            age = time.time() - os.path.getmtime(self._path(url))
+        except OSError:
+            return False
+        return age < domain_ttl(url)
+
+    def _store(self, url: str, html_content: str, result, method: str, validators: dict, is_sufficient) -> None:
+        """
+        Cache a fetched page unless it failed the sufficiency check: a bot-check page or
+        JS shell cached for the domain TTL would hide the real page until it expired.
+        """
+        if is_sufficient is not None and not is_sufficient(html_content):
+            self._record("skipped")
+            return
+        self.put(url, html_content, result, method, validators)
+
+    def _revalidate(self, url: str, entry: dict, clean, is_sufficient=None) -> str:
+        """
+        Revalidate a stale plain-HTTP entry with a conditional GET.
+        Returns the clean step's result, or None if the entry could not be revalidated.
+        """
+        if entry.get("method") != "http" or not (entry.get("etag") or entry.get("last_modified")):
+            return None
+        try:
+            status, html_content, validators = fetch_page_http(url, entry.get("etag"), entry.get("last_modified"))
+        except Exception as e:
+            print(f"Revalidation failed for {url}: {e}")
+            return None
+        if status == 304:
+            entry["fetched_at"] = time.time()
+            entry["ttl"] = domain_ttl(url)
+            self._write(url, entry)
+            self._record("revalidated")
+            return self._result(entry)
+        result = clean(html_content)
+        self._store(url, html_content, result, "http", validators, is_sufficient)
+        return result
+
+    def get_or_fetch(self, url: str, fetch, clean, is_sufficient=None):
+        """
+        Return the cleaned text for the URL, fetching and cleaning only on a cache miss.
+
+        Args:
+            url (str): The URL to load.
+            fetch (callable): Takes the URL and returns (html_content, method, validators).
+            clean (callable): Takes the HTML and returns the cleaned text, or a dict with
+                the text under "text" and anything else worth caching with it.
+            is_sufficient (callable, optional): Takes the HTML and returns False if the
+                page should not be cached (e.g. a bot-check page or an empty JS shell).
+
+        Returns:
+            str | dict: What clean returned for the page. An entry cached by a clean step
+                that returned plain text comes back as plain text.
+        """
+        if not self.enabled:
+            html_content, _, _ = fetch(url)
+            return clean(html_content)
+
+        entry = self.get(url)
+        if entry is not None:
+            if self.is_fresh(entry):
+                self._record("hits")
+                return self._result(entry)
+            self._record("stale")
+            result = self._revalidate(url, entry, clean, is_sufficient)
+            if result is not None:
+                return result
+        else:
+            self._record("misses")
+
+        html_content, method, validators = fetch(url)
+        result = clean(html_content)
+        self._store(url, html_content, result, method, validators, is_sufficient)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        served = stats["hits"] + stats["revalidated"]
+        stats["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        stats["namespace"] = self.namespace
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_page_cache(namespace: str) -> PageCache:
+    """
+    Return the process-wide page cache for a scraper ("price" or "email").
+    Each scraper cleans pages differently, so each keeps its own namespace.
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = PageCache(namespace)
+        return _caches[namespace]
@@ -0,0 +1,79 @@
+import time
+from urllib.parse import urlsplit
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from quotaion_module.scrapper_common.config import (
+    PAGE_READY_DEADLINE,
+    PAGE_READY_QUIET_MS,
+    PAGE_READY_POLL_MS,
+    PAGE_READY_SELECTORS,
+)
+
+# Counts DOM mutations from the moment it is installed. Together with the number of
+# resource timing entries it tells us whether the page is still changing or loading.
+_ACTIVITY_SCRIPT = """
+if (!window.__pageActivity) {
+    window.__pageActivity = {mutations: 0};
+    new MutationObserver(function (records) {
+        window.__pageActivity.mutations += records.length;
+    }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+return [
+    document.readyState,
+    window.__pageActivity.mutations,
+    performance.getEntriesByType('resource').length
+];
+"""
+
+
+def ready_selector_for(url: str) -> str:
+    """
+    Return the registered "content ready" CSS selector for the URL's domain, if any.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    for domain, selector in PAGE_READY_SELECTORS.items():
+        if domain in host:
+            return selector
+    return None
+
+
+def wait_for_page_ready(driver, url: str, deadline: float = None) -> bool:
+    """
+    Wait until the loaded page is stable enough to read.
+
+    The page is ready as soon as its domain's content selector is present, or once
+    the document is complete and neither the DOM nor the list of loaded resources has
+    changed for PAGE_READY_QUIET_MS. Never waits past `deadline` (an absolute
+    time.time() value, defaulting to PAGE_READY_DEADLINE from now).
+
+    Returns:
+        bool: True if the page became ready, False if the deadline was hit.
+    """
+    if deadline is None:
+        deadline = time.time() + PAGE_READY_DEADLINE
+    selector = ready_selector_for(url)
+    quiet_for = PAGE_READY_QUIET_MS / 1000
+    poll = PAGE_READY_POLL_MS / 1000
+    last_activity = None
+    stable_since = None
+
+    while time.time() < deadline:
+        try:
+            if selector and driver.find_elements(By.CSS_SELECTOR, selector):
+                return True
+            ready_state, mutations, resources = driver.execute_script(_ACTIVITY_SCRIPT)
+        except WebDriverException as e:
+            print(f"Readiness check failed for {url}: {e}")
+            return False
+
+        now = time.time()
+        activity = (mutations, resources)
+        if ready_state != "complete" or activity != last_activity:
+            last_activity = activity
+            stable_since = now
+        elif now - stable_since >= quiet_for:
+            return True
+        time.sleep(min(poll, max(deadline - now, 0)))
+
+    print(f"Page readiness deadline reached for {url}")
+    return False
@@ -0,0 +1,40 @@
+def tag_document(content: str, metadata: dict) -> str:
+    """
+    Wrap a chunk in a <document> tag carrying its source URL and other metadata, so
+    the LLM can attribute what it extracts when several chunks share one call.
+    """
+    details = {key: value for key, value in metadata.items() if key != "source"}
+    header = f'<document source="{metadata.get("source")}">'
+    if details:
+        header += f"\nMetadata: {details}"
+    return f"{header}\n{content}\n</document>"
+
+
+def pack_chunks(costs: list, budget: int, max_per_pack: int) -> list:
+    """
+    Group chunks into as few LLM calls as fit the token budget.
+
+    Chunks are placed in rank order, each into the first pack with room for it (first
+    fit), so the best chunk opens the first pack and packs stay ordered by their best
+    chunk. A chunk larger than the budget gets a pack of its own.
+
+    Args:
+        costs (list): Tokens each chunk adds to a call (tag included), best chunk first.
+        budget (int): Tokens a call has for chunks.
+        max_per_pack (int): Most chunks in one call, which bounds the answer's length.
+
+    Returns:
+        list: Lists of chunk indices, one per call.
+    """
+    packs = []
+    used = []
+    for index, cost in enumerate(costs):
+        for pack_index, pack in enumerate(packs):
+            if len(pack) < max_per_pack and used[pack_index] + cost <= budget:
+                pack.append(index)
+                used[pack_index] += cost
+                break
+        else:
+            packs.append([index])
+            used.append(cost)
+    return packs
@@ -0,0 +1,130 @@
+import math
+import threading
+import numpy as np
+from quotaion_module.scrapper_common.config import (
+    RETRIEVAL_DEPTH_MODE,
+    LLM_CHUNK_SECONDS,
+    LLM_LATENCY_EWMA_ALPHA,
+)
+
+# Depth rules used when a scraper does not set its own
+DEFAULT_DEPTH_RULES = {
+    "min_k": 1,                 # Never send fewer chunks than this (if there are that many)
+    "min_relative_score": 0.0,  # Drop chunks scoring below this share of the best score
+    "knee": False,              # Cut where the score curve flattens out
+    "source_cap": None          # Most chunks taken from one page
+}
+
+
+def knee_cutoff(scores: np.ndarray) -> int:
+    """
+    Number of leading scores to keep before the knee of a descending score curve.
+
+    The curve is scaled to the unit square and the knee is the point farthest from
+    the straight line between the best score and the worst (the Kneedle method). A
+    curve that drops early and then flattens keeps the scores before the flat tail;
+    one that holds up and then drops keeps the scores up to the drop. A curve without
+    a knee (flat, or falling in a straight line) keeps every score.
+    """
+    n = len(scores)
+    if n < 3 or scores[0] <= scores[-1]:
+        return n
+    x = np.linspace(0.0, 1.0, n)
+    y = (scores - scores[-1]) / (scores[0] - scores[-1])
+    gap = (1.0 - x) - y
+    below = int(np.argmax(gap))
+    above = int(np.argmin(gap))
+    if max(gap[below], -gap[above]) <= 1e-9:
+        return n
+    if gap[below] >= -gap[above]:
+        return max(below, 1)
+    return above + 1
+
+
+def choose_depth(scored_documents: list, max_k: int, rules: dict = None, mode: str = RETRIEVAL_DEPTH_MODE,
+                 time_left: float = None, seconds_per_chunk: float = None) -> tuple:
+    """
+    Decide how many of the ranked chunks go to the LLM stage.
+
+    In "scores" mode the cut comes from the score distribution: the knee of the
+    curve and a minimum score relative to the best, whichever is smaller. In
+    "latency" mode it is the most chunks expected to finish in the time left, at the
+    observed seconds per chunk. Either way at most max_k chunks are taken, at least
+    min_k if there are that many, and no more than source_cap from one page.
+
+    Args:
+        scored_documents (list): (Document, score) pairs, best first.
+        max_k (int): Upper bound on the number of chunks.
+        rules (dict): Overrides of DEFAULT_DEPTH_RULES.
+        mode (str): "scores", "latency" or "fixed" (take max_k, as before).
+        time_left (float): Seconds left for the LLM stage (latency mode).
+        seconds_per_chunk (float): Expected LLM time per chunk (latency mode).
+
+    Returns:
+        tuple: (documents, report). report says how the depth was chosen.
+    """
+    rules = dict(DEFAULT_DEPTH_RULES, **(rules or {}))
+    scores = np.array([score for _, score in scored_documents], dtype=np.float64)
+    report = {"mode": mode, "candidates": len(scores), "max_k": max_k}
+    cutoff = min(len(scores), max_k)
+
+    if mode == "scores" and len(scores):
+        if rules["knee"]:
+            report["knee"] = knee_cutoff(scores)
+            cutoff = min(cutoff, report["knee"])
+        if rules["min_relative_score"] > 0 and scores[0] > 0:
+            report["above_relative"] = int(np.count_nonzero(scores >= rules["min_relative_score"] * scores[0]))
+            cutoff = min(cutoff, report["above_relative"])
+    elif mode == "latency" and time_left is not None and seconds_per_chunk:
+        report["time_fit"] = int(math.floor(time_left / seconds_per_chunk))
+        cutoff = min(cutoff, report["time_fit"])
+    cutoff = max(cutoff, min(rules["min_k"], len(scores), max_k))
+
+    selected = []
+    per_source = {}
+    cap = rules["source_cap"]
+    for doc, _ in scored_documents[:cutoff]:
+        source = doc.metadata.get("source")
+        if cap and per_source.get(source, 0) >= cap:
+            continue
+        per_source[source] = per_source.get(source, 0) + 1
+        selected.append(doc)
+    report["k"] = len(selected)
+    print(f"Retrieval depth: {report}")
+    return selected, report
+
+
+class LatencyTracker:
+    """
+    Running estimate (EWMA) of how long one chunk takes in the LLM stage, used by the
+    latency depth mode.
+    """
+
+    def __init__(self, initial_seconds: float = LLM_CHUNK_SECONDS, alpha: float = LLM_LATENCY_EWMA_ALPHA):
+        self._lock = threading.Lock()
+        self._estimate = initial_seconds
+        self.alpha = alpha
+        self.samples = 0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._estimate = seconds if not self.samples else self.alpha * seconds + (1 - self.alpha) * self._estimate
+            self.samples += 1
+
+    def estimate(self) -> float:
+        with self._lock:
+            return self._estimate
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """
+    Return the process-wide latency tracker for an LLM stage (e.g. "price-ollama").
+    """
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
@@ -0,0 +1,265 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from urllib.parse import urlsplit
+from quotaion_module.scrapper_common.config import (
+    FETCH_MAX_CONCURRENCY,
+    FETCH_DOMAIN_CONCURRENCY,
+    FETCH_DOMAIN_INTERVAL,
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_MAX,
+    FETCH_DOMAIN_OVERRIDES,
+    THROTTLE_STATUS_CODES,
+)
+from quotaion_module.scrapper_common.budget import CancelToken, set_current_cancel_token
+from quotaion_module.scrapper_common.http_fetch import add_status_listener
+
+
+def domain_of(url: str) -> str:
+    """
+    Return the host a URL points at, without a leading "www.".
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _discard_outcome(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+async def as_completed_async(futures, timeout: float = None):
+    """
+    Async counterpart of concurrent.futures.as_completed for scheduler futures: yields
+    each future as it finishes, waiting on the event loop instead of blocking it.
+
+    Raises:
+        concurrent.futures.TimeoutError: If some futures are still pending at the timeout.
+    """
+    deadline = time.time() + timeout if timeout is not None else None
+    pending = {asyncio.wrap_future(future): future for future in futures}
+    try:
+        while pending:
+            remaining = deadline - time.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                raise FuturesTimeoutError(f"{len(pending)} of {len(futures)} futures unfinished")
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for wrapped in done:
+                yield pending.pop(wrapped)
+    finally:
+        # Nobody awaits the stragglers any more; consume their outcome so asyncio does not log it
+        for wrapped in pending:
+            wrapped.add_done_callback(_discard_outcome)
+
+
+class FetchTask:
+    """
+    One scheduled call of `fn(*args)` for a URL, resolved through `future`.
+    """
+
+    def __init__(self, request_id: str, url: str, fn, args: tuple, polite: bool):
+        self.request_id = request_id
+        self.url = url
+        self.domain = domain_of(url)
+        self.fn = fn
+        self.args = args
+        self.polite = polite
+        self.future = Future()
+        self.token = CancelToken()
+
+
+class FetchScheduler:
+    """
+    A process-wide scheduler for page fetches.
+
+    A fixed set of worker threads caps how many pages are fetched at once across all
+    requests. Tasks are queued per request and picked round-robin, so one large
+    request cannot starve the others. Each domain has its own concurrency cap and
+    minimum interval between fetch starts, and a domain that answers 429/503 is paused
+    with exponential backoff (or for its Retry-After) before it is fetched again.
+    """
+
+    def __init__(self, max_concurrency: int = FETCH_MAX_CONCURRENCY,
+                 domain_concurrency: int = FETCH_DOMAIN_CONCURRENCY,
+                 domain_interval: float = FETCH_DOMAIN_INTERVAL):
+        self.max_concurrency = max_concurrency
+        self.domain_concurrency = domain_concurrency
+        self.domain_interval = domain_interval
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._domain_active = {}
+        self._domain_next_start = {}
+        self._domain_backoff = {}
+        self._running = {}
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "throttled": 0, "cancelled": 0}
+        for i in range(max_concurrency):
+            threading.Thread(target=self._worker, name=f"fetch-worker-{i}", daemon=True).start()
+
+    def _limits(self, domain: str) -> tuple:
+        for name, limits in FETCH_DOMAIN_OVERRIDES.items():
+            if name in domain:
+                return limits.get("concurrency", self.domain_concurrency), limits.get("interval", self.domain_interval)
+        return self.domain_concurrency, self.domain_interval
+
+    def submit(self, request_id: str, url: str, fn, *args, polite: bool = True) -> Future:
+        """
+        Queue `fn(*args)` for the URL on behalf of a request.
+
+        Args:
+            request_id (str): Identifies the request, used for fair interleaving.
+            url (str): The URL being fetched; its domain decides the politeness limits.
+            fn (callable): The work to run on a fetch worker.
+            polite (bool): False for work that will not touch the site (e.g. a cache
+                hit), which skips the per-domain limits.
+
+        Returns:
+            Future: Resolves to fn's return value.
+        """
+        task = FetchTask(request_id, url, fn, args, polite)
+        with self._cond:
+            self._queues.setdefault(request_id, deque()).append(task)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return task.future
+
+    def _eligible(self, task: FetchTask, now: float) -> bool:
+        if not task.polite:
+            return True
+        concurrency, _ = self._limits(task.domain)
+        if self._domain_active.get(task.domain, 0) >= concurrency:
+            return False
+        return now >= self._domain_next_start.get(task.domain, 0)
+
+    def _next_task(self) -> FetchTask:
+        """
+        Pop the next runnable task, visiting requests round-robin. Must hold the lock.
+        Returns None if nothing can start yet.
+        """
+        now = time.time()
+        for request_id in list(self._queues):
+            queue = self._queues[request_id]
+            for task in queue:
+                if self._eligible(task, now):
+                    queue.remove(task)
+                    # Move the request to the back so the next pick serves someone else
+                    self._queues.move_to_end(request_id)
+                    if not queue:
+                        del self._queues[request_id]
+                    return task
+        return None
+
+    def _wait_time(self) -> float:
+        """
+        Seconds until a rate-limited or backed-off domain may start again. Must hold the lock.
+        """
+        now = time.time()
+        waits = [start - now for start in self._domain_next_start.values() if start > now]
+        return min(waits) if waits else None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    self._cond.wait(timeout=self._wait_time())
+                    task = self._next_task()
+                if task.polite:
+                    _, interval = self._limits(task.domain)
+                    self._domain_active[task.domain] = self._domain_active.get(task.domain, 0) + 1
+                    self._domain_next_start[task.domain] = max(
+                        self._domain_next_start.get(task.domain, 0), time.time() + interval
+                    )
+                self._running.setdefault(task.request_id, set()).add(task)
+            self._run(task)
+
+    def _run(self, task: FetchTask) -> None:
+        if not task.future.set_running_or_notify_cancel():
+            self._finish(task)
+            return
+        set_current_cancel_token(task.token)
+        try:
+            result = task.fn(*task.args)
+        except BaseException as e:
+            self._finish(task, failed=True)
+            task.future.set_exception(e)
+        else:
+            self._finish(task, failed=isinstance(result, tuple))
+            task.future.set_result(result)
+        finally:
+            set_current_cancel_token(None)
+
+    def _finish(self, task: FetchTask, failed: bool = False) -> None:
+        with self._cond:
+            if task.polite:
+                self._domain_active[task.domain] -= 1
+            running = self._running.get(task.request_id)
+            if running is not None:
+                running.discard(task)
+                if not running:
+                    del self._running[task.request_id]
+            if task.token.cancelled:
+                self._stats["cancelled"] += 1
+            else:
+                self._stats["failed" if failed else "completed"] += 1
+            self._cond.notify_all()
+
+    def cancel_request(self, request_id: str) -> None:
+        """
+        Drop a request's queued fetches and cancel the ones already running, which
+        quits any browser they have leased.
+        """
+        with self._cond:
+            queued = self._queues.pop(request_id, deque())
+            running = list(self._running.get(request_id, ()))
+            self._stats["cancelled"] += len(queued)
+        for task in queued:
+            task.future.cancel()
+        for task in running:
+            task.token.cancel()
+
+    def record_status(self, url: str, status_code: int, retry_after: str = None) -> None:
+        """
+        Back off a domain that answered with a throttling status, and relax the
+        backoff again once it answers normally.
+        """
+        domain = domain_of(url)
+        with self._cond:
+            if status_code in THROTTLE_STATUS_CODES:
+                backoff = min(FETCH_BACKOFF_MAX, max(FETCH_BACKOFF_BASE, self._domain_backoff.get(domain, 0) * 2))
+                if retry_after and retry_after.isdigit():
+                    backoff = min(FETCH_BACKOFF_MAX, float(retry_after))
+                self._domain_backoff[domain] = backoff
+                self._domain_next_start[domain] = max(self._domain_next_start.get(domain, 0), time.time() + backoff)
+                self._stats["throttled"] += 1
+                print(f"{domain} answered {status_code}, pausing it for {backoff:.0f}s")
+            elif status_code < 400 and domain in self._domain_backoff:
+                self._domain_backoff[domain] /= 2
+                if self._domain_backoff[domain] < FETCH_BACKOFF_BASE:
+                    del self._domain_backoff[domain]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return dict(
+                self._stats,
+                queued=sum(len(queue) for queue in self._queues.values()),
+                active=sum(self._domain_active.values()),
+                backed_off={domain: backoff for domain, backoff in self._domain_backoff.items()}
+            )
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_fetch_scheduler() -> FetchScheduler:
+    """
+    Return the process-wide fetch scheduler shared by all /search endpoints.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+            add_status_listener(_scheduler.record_status)
+        return _scheduler
@@ -0,0 +1,165 @@
+import re
+import threading
+import time
+from lxml import etree
+from quotaion_module.scrapper_common.scheduler import domain_of
+from quotaion_module.scrapper_common.structured_data import is_complete
+
+# Currency markers recognised in extracted price text, in the order they are tried
+CURRENCY_PATTERNS = [
+    ("SAR", re.compile(r"SAR|ر\.س|ريال")),
+    ("AED", re.compile(r"AED|د\.إ")),
+    ("USD", re.compile(r"USD|US\s?\$|\$")),
+    ("EUR", re.compile(r"EUR|€")),
+    ("GBP", re.compile(r"GBP|£")),
+]
+
+# Plugin run outcomes; everything but "hit" counts as a failure
+OUTCOMES = ["hit", "partial", "miss", "error"]
+
+
+def detect_currency(text: str) -> str:
+    for code, pattern in CURRENCY_PATTERNS:
+        if pattern.search(text):
+            return code
+    return None
+
+
+def _first_text(results) -> str:
+    """
+    Reduce an XPath result to the first non-empty piece of text.
+    """
+    if not isinstance(results, list):
+        results = [results]
+    for result in results:
+        if isinstance(result, etree._Element):
+            result = result.text_content()
+        text = " ".join(str(result).split()) if result is not None else ""
+        if text:
+            return text
+    return None
+
+
+class SitePlugin:
+    """
+    A declarative, XPath-based product extractor for one site.
+
+    Built from a dict with these keys:
+        "items":    XPath selecting one element per product (a search result card or
+                    the product block of a detail page); the whole page if left out
+        "fields":   {field: XPath, or list of XPaths tried in order, relative to the
+                    item}; field names are the ones process_product reads
+                    (product_name, price, currency, ...)
+        "defaults": {field: value} used when a field's XPath finds nothing
+    If no currency is found, it is read from the price text, then taken from defaults.
+    """
+
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.items = etree.XPath(spec["items"]) if spec.get("items") else None
+        self.fields = {
+            field: [etree.XPath(path) for path in ([paths] if isinstance(paths, str) else paths)]
+            for field, paths in spec.get("fields", {}).items()
+        }
+        self.defaults = dict(spec.get("defaults", {}))
+
+    def extract(self, root) -> list:
+        """
+        Extract product records from a parsed (uncleaned) page.
+        """
+        items = self.items(root) if self.items is not None else [root]
+        records = []
+        for item in items:
+            record = {}
+            for field, paths in self.fields.items():
+                for path in paths:
+                    value = _first_text(path(item))
+                    if value:
+                        record[field] = value
+                        break
+            if not record.get("product_name"):
+                continue
+            if not record.get("currency") and record.get("price"):
+                currency = detect_currency(record["price"])
+                if currency:
+                    record["currency"] = currency
+            for field, value in self.defaults.items():
+                record.setdefault(field, value)
+            records.append(record)
+        return records
+
+
+class PluginRegistry:
+    """
+    Per-domain site plugins, plus how well each one is doing.
+
+    A URL is matched against the registered names the same way ALLOWED_DOMAINS is
+    ("noon" matches www.noon.com). Every plugin run is recorded as a hit (at least one
+    complete record), partial (records, but none with all required fields), miss
+    (nothing found) or error, and a plugin that keeps failing is reported so a broken
+    selector is noticed quickly.
+    """
+
+    def __init__(self, specs: dict, domains: list = None, required_fields: list = None,
+                 failure_alert: int = 3):
+        names = [name for name in (domains or specs) if name in specs]
+        self.plugins = {name: SitePlugin(name, specs[name]) for name in names}
+        self.required_fields = required_fields or []
+        self.failure_alert = failure_alert
+        self._lock = threading.Lock()
+        self._stats = {
+            name: dict({outcome: 0 for outcome in OUTCOMES}, consecutive_failures=0, last_failure=None)
+            for name in self.plugins
+        }
+
+    def plugin_for(self, url: str) -> SitePlugin:
+        domain = domain_of(url)
+        for name, plugin in self.plugins.items():
+            if name in domain:
+                return plugin
+        return None
+
+    def run(self, plugin: SitePlugin, root) -> tuple:
+        """
+        Run a plugin on a parsed page. Returns (records, outcome); only complete
+        records are returned (e.g. out-of-stock cards without a price are left out).
+        """
+        try:
+            records = plugin.extract(root)
+        except Exception as e:
+            print(f"Site plugin {plugin.name} raised: {e}")
+            return [], "error"
+        if not records:
+            return [], "miss"
+        complete = [record for record in records if is_complete(record, self.required_fields)]
+        if not complete:
+            return [], "partial"
+        return complete, "hit"
+
+    def record(self, name: str, outcome: str, url: str = None) -> None:
+        """
+        Count one plugin run. Runs happen in the cleaning processes, so the outcome is
+        recorded by the caller in the server process.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                return
+            stats[outcome] += 1
+            if outcome == "hit":
+                stats["consecutive_failures"] = 0
+                return
+            stats["consecutive_failures"] += 1
+            stats["last_failure"] = {"url": url, "outcome": outcome, "at": time.time()}
+            failures = stats["consecutive_failures"]
+        if failures == self.failure_alert:
+            print(f"Site plugin {name} failed {failures} times in a row (last: {outcome} on {url}); "
+                  f"its selectors may be out of date")
+
+    def stats(self) -> dict:
+        with self._lock:
+            report = {}
+            for name, stats in self._stats.items():
+                runs = sum(stats[outcome] for outcome in OUTCOMES)
+                report[name] = dict(stats, runs=runs, hit_rate=round(stats["hit"] / runs, 3) if runs else 0.0)
+            return report
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from quotaion_module.scrapper_common.config import (
+    STRATEGY_STORE_DIR,
+    FETCH_METHOD_COSTS,
+    STRATEGY_MIN_SAMPLES,
+    STRATEGY_MIN_SUCCESS,
+    STRATEGY_EWMA_ALPHA,
+    STRATEGY_REPROBE_SECONDS,
+    STRATEGY_FLUSH_EVERY,
+    STRATEGY_FLUSH_SECONDS,
+)
+
+
+class StrategyStore:
+    """
+    Persistent per-domain statistics about which fetch methods work.
+
+    For every (domain, method) pair it keeps the number of attempts, an exponentially
+    weighted success score (a fetch succeeds when it returns sufficient content) and an
+    exponentially weighted latency. `plan` uses them to order the fetch tiers so each
+    domain starts at the cheapest method that has worked for it.
+
+    Attempts are recorded in memory and written to disk every `flush_every` attempts
+    or `flush_seconds` after the last write, whichever comes first, and by `flush`
+    at shutdown.
+    """
+
+    def __init__(self, namespace: str, directory: str = STRATEGY_STORE_DIR,
+                 flush_every: int = STRATEGY_FLUSH_EVERY, flush_seconds: float = STRATEGY_FLUSH_SECONDS):
+        self.namespace = namespace
+        self.path = os.path.join(directory, f"{namespace}.json")
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._domains = self._load()
+        self._unsaved = 0
+        self._saved_at = time.time()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Could not load fetch strategy store {self.path}: {e}")
+            return {}
+
+    def _save(self, snapshot: str) -> None:
+        """
+        Write a serialized snapshot of the store to disk atomically.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save fetch strategy store {self.path}: {e}")
+
+    def flush(self) -> None:
+        """
+        Write the store to disk if it has unsaved attempts.
+        """
+        # Writes are serialized, and the file is written outside the main lock so
+        # fetch workers recording attempts never wait on disk I/O
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                snapshot = json.dumps(self._domains)
+                self._unsaved = 0
+                self._saved_at = time.time()
+            self._save(snapshot)
+
+    def record(self, domain: str, method: str, success: bool, latency: float) -> None:
+        """
+        Record the outcome of one fetch attempt.
+        """
+        with self._lock:
+            stats = self._domains.setdefault(domain, {}).setdefault(
+                method, {"attempts": 0, "success": 0.0, "latency": latency, "last_attempt": 0}
+            )
+            if stats["attempts"] == 0:
+                stats["success"] = 1.0 if success else 0.0
+            else:
+                stats["success"] += STRATEGY_EWMA_ALPHA * ((1.0 if success else 0.0) - stats["success"])
+                stats["latency"] += STRATEGY_EWMA_ALPHA * (latency - stats["latency"])
+            stats["attempts"] += 1
+            stats["last_attempt"] = time.time()
+            self._unsaved += 1
+            due = self._unsaved >= self.flush_every or time.time() - self._saved_at >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def plan(self, domain: str, methods: list) -> list:
+        """
+        Order the available fetch methods for a domain.
+
+        Methods that are proven to fail for the domain are dropped, unless they have
+        not been tried for STRATEGY_REPROBE_SECONDS, in which case they are re-probed.
+        The rest stay in cost order, so the cheapest method that works (or has not
+        been judged yet) is tried first and the others remain as fallbacks.
+        """
+        now = time.time()
+        with self._lock:
+            known = dict(self._domains.get(domain, {}))
+        ordered = sorted(methods, key=lambda method: FETCH_METHOD_COSTS.get(method, 100))
+        plan = []
+        for method in ordered:
+            stats = known.get(method)
+            failing = (
+                stats is not None
+                and stats["attempts"] >= STRATEGY_MIN_SAMPLES
+                and stats["success"] < STRATEGY_MIN_SUCCESS
+            )
+            if failing and now - stats["last_attempt"] < STRATEGY_REPROBE_SECONDS:
+                continue
+            plan.append(method)
+        # Always keep the most capable method as a last resort
+        if not plan and ordered:
+            plan.append(ordered[-1])
+        return plan
+
+    def stats(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._domains))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_strategy_store(namespace: str) -> StrategyStore:
+    """
+    Return the process-wide strategy store for a scraper ("price" or "email").
+    The scrapers judge content sufficiency differently, so each learns separately.
+    """
+    with _stores_lock:
+        if namespace not in _stores:
+            _stores[namespace] = StrategyStore(namespace)
+        return _stores[namespace]
+
+
+def flush_strategy_stores() -> None:
+    """
+    Write every strategy store's unsaved attempts to disk (called at shutdown).
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
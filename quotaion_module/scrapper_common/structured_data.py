@@ -0,0 +1,255 @@
+import json
+from lxml import etree
+
+# schema.org types whose records describe a product for sale
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct", "ProductModel"}
+OFFER_TYPES = {"Offer", "AggregateOffer"}
+
+# Longest product description kept as features_of_product
+MAX_FEATURES_CHARS = 1000
+
+
+def _types(node: dict) -> set:
+    value = node.get("@type", [])
+    if isinstance(value, str):
+        value = [value]
+    # Accept full IRIs such as "http://schema.org/Product"
+    return {str(name).rstrip("/").rsplit("/", 1)[-1] for name in value}
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value) -> str:
+    """
+    Reduce a schema.org value (string, number, nested thing or list) to plain text.
+    """
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@value")
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def _walk(node, found: list) -> None:
+    """
+    Collect every product node in a JSON-LD document, including products nested in
+    @graph arrays, ItemList entries and ListItem wrappers.
+    """
+    if isinstance(node, list):
+        for item in node:
+            _walk(item, found)
+        return
+    if not isinstance(node, dict):
+        return
+    if _types(node) & PRODUCT_TYPES:
+        found.append(node)
+        # Variants of a ProductGroup are products too
+        _walk(node.get("hasVariant"), found)
+        return
+    for key in ("@graph", "itemListElement", "item", "mainEntity", "mainEntityOfPage"):
+        if key in node:
+            _walk(node[key], found)
+
+
+def _offer_price(offer: dict) -> tuple:
+    """
+    Return (price, currency, vat_included) for an Offer or AggregateOffer.
+    """
+    price = offer.get("price")
+    if price is None and "AggregateOffer" in _types(offer):
+        price = offer.get("lowPrice")
+    currency = offer.get("priceCurrency")
+    vat_included = None
+    for spec in _as_list(offer.get("priceSpecification")):
+        if not isinstance(spec, dict):
+            continue
+        if price is None:
+            price = spec.get("price")
+        currency = currency or spec.get("priceCurrency")
+        if spec.get("valueAddedTaxIncluded") is not None:
+            vat_included = str(spec.get("valueAddedTaxIncluded")).lower() in ("true", "1")
+    return _text(price), _text(currency), vat_included
+
+
+def _rating(product: dict) -> str:
+    rating = product.get("aggregateRating")
+    if isinstance(rating, list):
+        rating = rating[0] if rating else None
+    if not isinstance(rating, dict) or rating.get("ratingValue") is None:
+        return None
+    text = f"{_text(rating.get('ratingValue'))}/{_text(rating.get('bestRating')) or '5'}"
+    count = _text(rating.get("reviewCount")) or _text(rating.get("ratingCount"))
+    return f"{text} ({count} ratings)" if count else text
+
+
+def product_records(product: dict, site_name: str = None) -> list:
+    """
+    Turn one schema.org Product into records with the fields process_product reads,
+    one record per offer.
+    """
+    name = _text(product.get("name"))
+    brand = _text(product.get("brand"))
+    if name and brand and brand.lower() not in name.lower():
+        name = f"{brand} {name}"
+    description = _text(product.get("description"))
+    base = {"product_name": name}
+    if description:
+        base["features_of_product"] = description[:MAX_FEATURES_CHARS]
+    rating = _rating(product)
+    if rating:
+        base["customer_rating"] = rating
+
+    records = []
+    offers = [offer for offer in _as_list(product.get("offers")) if isinstance(offer, dict)]
+    # An AggregateOffer may list its individual offers
+    expanded = []
+    for offer in offers:
+        inner = [item for item in _as_list(offer.get("offers")) if isinstance(item, dict)]
+        expanded.extend(inner or [offer])
+    for offer in expanded:
+        price, currency, vat_included = _offer_price(offer)
+        record = dict(base, price=price, currency=currency)
+        seller = _text(offer.get("seller")) or site_name
+        if seller:
+            record["vendor_name"] = seller
+        if vat_included is not None:
+            record["vat_status"] = "after vat" if vat_included else "before vat"
+        records.append(record)
+    if not records:
+        records.append(dict(base, price=None, currency=None))
+    return records
+
+
+def _json_ld_products(root) -> list:
+    found = []
+    for script in root.iter("script"):
+        if (script.get("type") or "").strip().lower() != "application/ld+json" or not script.text:
+            continue
+        try:
+            document = json.loads(script.text.strip().rstrip(";"))
+        except ValueError:
+            continue
+        _walk(document, found)
+    return found
+
+
+def _microdata_value(element):
+    if element.get("itemscope") is not None:
+        return _microdata_item(element)
+    for attribute in ("content", "value"):
+        if element.get(attribute) is not None:
+            return element.get(attribute)
+    if element.tag in ("a", "link"):
+        return element.get("href")
+    if element.tag in ("img", "source"):
+        return element.get("src")
+    if element.tag in ("meta",):
+        return element.get("content")
+    return element.text_content()
+
+
+def _microdata_item(scope) -> dict:
+    """
+    Read one itemscope element into a JSON-LD-like dict.
+    """
+    item = {"@type": (scope.get("itemtype") or "").split()}
+    stack = list(scope)
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str):
+            continue
+        prop = element.get("itemprop")
+        if prop:
+            value = _microdata_value(element)
+            for name in prop.split():
+                item.setdefault(name, []).append(value)
+        # Properties of a nested item belong to that item
+        if element.get("itemscope") is None:
+            stack.extend(element)
+    return {name: values[0] if isinstance(values, list) and len(values) == 1 else values
+            for name, values in item.items()}
+
+
+def _microdata_products(root) -> list:
+    found = []
+    for scope in root.iter():
+        if not isinstance(scope.tag, str) or scope.get("itemscope") is None or scope.get("itemprop"):
+            continue
+        # Top-level items only; nested ones are read through their parent
+        _walk(_microdata_item(scope), found)
+    return found
+
+
+def _meta_properties(root) -> dict:
+    properties = {}
+    for meta in root.iter("meta"):
+        name = meta.get("property") or meta.get("name")
+        if name and meta.get("content") is not None:
+            properties.setdefault(name.lower(), meta.get("content"))
+    return properties
+
+
+def _open_graph_products(meta: dict) -> list:
+    if not (meta.get("og:type") or "").lower().startswith("product"):
+        return []
+    price = meta.get("product:price:amount") or meta.get("og:price:amount")
+    if price is None:
+        return []
+    return [{
+        "@type": "Product",
+        "name": meta.get("og:title"),
+        "description": meta.get("og:description"),
+        "offers": {
+            "@type": "Offer",
+            "price": price,
+            "priceCurrency": meta.get("product:price:currency") or meta.get("og:price:currency")
+        }
+    }]
+
+
+def extract_structured_products(root) -> list:
+    """
+    Read schema.org Product/Offer data embedded in a parsed page.
+
+    JSON-LD blocks and microdata are read first; OpenGraph product tags are used only
+    when neither has a product. The page is not modified, so this must run before
+    cleaning (which removes <script> elements).
+
+    Args:
+        root: The root element returned by html_cleaner.parse_html.
+
+    Returns:
+        list: One record per product offer, using the field names process_product
+            reads (product_name, price, currency, vendor_name, vat_status,
+            features_of_product, customer_rating). Missing values are None.
+    """
+    meta = _meta_properties(root)
+    site_name = meta.get("og:site_name")
+    products = _json_ld_products(root) + _microdata_products(root)
+    if not products:
+        products = _open_graph_products(meta)
+
+    records = []
+    seen = set()
+    for product in products:
+        for record in product_records(product, site_name):
+            key = (record.get("product_name"), record.get("price"), record.get("currency"), record.get("vendor_name"))
+            if key in seen:
+                continue
+            seen.add(key)
+            records.append(record)
+    return records
+
+
+def is_complete(record: dict, required_fields: list) -> bool:
+    """
+    Returns True if the record has a value for every required field.
+    """
+    return all(record.get(field) not in (None, "") for field in required_fields)
@@ -0,0 +1,93 @@
+import re
+import ahocorasick
+
+# URLs as written in page text: RFC 3986 characters only. Parentheses are left out so
+# a markdown link "[label](https://...)" keeps its closing bracket, and a trailing
+# sentence mark is not treated as part of the URL.
+URL_REGEX = re.compile(
+    r"https?://[A-Za-z0-9\-._~:/?#\[\]@!$&'*+,;=%]*[A-Za-z0-9\-_~/#\[\]@$&*+=%]"
+)
+
+# Email addresses; the domain must be dot-separated labels ending in an alphabetic TLD
+EMAIL_REGEX = re.compile(
+    r"(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?\.)+[A-Za-z]{2,}"
+)
+
+# Three or more line breaks (html2text leaves long runs of them around removed blocks)
+BLANK_LINES_REGEX = re.compile(r"\n(?:[ \t]*\n){2,}")
+
+
+class KeywordMatcher:
+    """
+    Finds any of a fixed set of keywords in a text with one Aho-Corasick automaton,
+    so each text is scanned once regardless of how many keywords there are.
+    """
+
+    def __init__(self, keywords: list):
+        self.keywords = [keyword for keyword in keywords if keyword]
+        self._automaton = None
+        if self.keywords:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+    def __bool__(self) -> bool:
+        return self._automaton is not None
+
+    def search(self, text: str, whole_words: bool = False) -> bool:
+        """
+        Returns True if the text contains any keyword. With whole_words, a keyword
+        only counts where it is not part of a longer word ("Play" is not found in
+        "PlayStation").
+        """
+        if self._automaton is None or not text:
+            return False
+        for end, keyword in self._automaton.iter(text):
+            if not whole_words:
+                return True
+            start = end - len(keyword) + 1
+            if (start == 0 or not text[start - 1].isalnum()) and (end + 1 == len(text) or not text[end + 1].isalnum()):
+                return True
+        return False
+
+class TextNormalizer:
+    """
+    Normalizes the markdown produced from a page: URLs are removed and runs of blank
+    lines are collapsed to one.
+
+    Each step is a precompiled pattern substituted with a literal replacement, so the
+    whole scan stays in the regex engine. Folding the steps into one alternation would
+    cost re its literal-prefix search and is several times slower on real pages.
+    """
+
+    def __init__(self, strip_urls: bool = True, collapse_blank_lines: bool = True):
+        self._steps = []
+        if strip_urls:
+            self._steps.append((URL_REGEX, ""))
+        if collapse_blank_lines:
+            self._steps.append((BLANK_LINES_REGEX, "\n\n"))
+
+    def normalize(self, text: str) -> str:
+        if not text:
+            return text
+        for regex, replacement in self._steps:
+            text = regex.sub(replacement, text)
+        return text
+
+
+_default_normalizer = TextNormalizer()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Strip URLs and collapse blank lines in page text with the shared normalizer.
+    """
+    return _default_normalizer.normalize(text)
+
+
+def find_emails(text: str) -> list:
+    """
+    Return the email addresses in the text, in order of appearance.
+    """
+    return EMAIL_REGEX.findall(text)
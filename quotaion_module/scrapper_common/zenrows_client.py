@@ -0,0 +1,132 @@
+import asyncio
+import os
+import random
+import threading
+import httpx
+from quotaion_module.scrapper_common.budget import current_cancel_token
+from quotaion_module.scrapper_common.config import (
+    ZENROWS_API_URL,
+    ZENROWS_CONCURRENCY,
+    ZENROWS_TIMEOUT,
+    ZENROWS_MAX_RETRIES,
+    ZENROWS_RETRY_STATUS_CODES,
+    ZENROWS_PROXY_COUNTRY,
+)
+
+
+class ZenRowsError(Exception):
+    """
+    Raised when ZenRows answers with an error status, or keeps failing after retries.
+    """
+
+    def __init__(self, url: str, status_code: int, detail: str = ""):
+        super().__init__(f"ZenRows returned {status_code} for {url}: {detail[:200]}")
+        self.url = url
+        self.status_code = status_code
+
+
+class AsyncZenRowsClient:
+    """
+    An async ZenRows client that reuses one HTTP connection pool for every request and
+    never runs more than `concurrency` requests at once (ZenRows plans cap concurrency).
+    Retryable statuses and transport errors are retried with exponential backoff; other
+    errors fail immediately.
+
+    `base_url` can point at a local HTTP stand-in that accepts the same query parameters.
+    """
+
+    def __init__(self, api_key: str, base_url: str = ZENROWS_API_URL, concurrency: int = ZENROWS_CONCURRENCY,
+                 timeout: float = ZENROWS_TIMEOUT, max_retries: int = ZENROWS_MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _params(self, url: str, js_render: bool, premium_proxy: bool) -> dict:
+        params = {"apikey": self.api_key, "url": url}
+        if js_render:
+            params["js_render"] = "true"
+        if premium_proxy:
+            params["premium_proxy"] = "true"
+            params["proxy_country"] = ZENROWS_PROXY_COUNTRY
+        return params
+
+    async def fetch(self, url: str, js_render: bool = True, premium_proxy: bool = True) -> str:
+        """
+        Fetch one page through ZenRows and return its HTML.
+        """
+        params = self._params(url, js_render, premium_proxy)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            async with self._semaphore:
+                try:
+                    response = await self._client.get(self.base_url, params=params)
+                except httpx.TransportError as e:
+                    if last_attempt:
+                        raise
+                    print(f"ZenRows transport error for {url}, retrying: {e}")
+                    response = None
+            if response is not None:
+                if response.status_code < 400:
+                    return response.text
+                if response.status_code not in ZENROWS_RETRY_STATUS_CODES or last_attempt:
+                    raise ZenRowsError(url, response.status_code, response.text)
+            # Back off outside the semaphore so waiting retries do not hold a slot
+            await asyncio.sleep(0.5 * (2 ** attempt) + random.uniform(0, 0.5))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class ZenRowsRunner:
+    """
+    Runs an AsyncZenRowsClient on a dedicated event loop thread so the synchronous
+    fetch workers can share its connection pool and concurrency limit.
+
+    There is no batch call: ZenRows is one tier of a per-URL fetch that the strategy
+    store plans, so a request's URLs reach ZenRows from the scheduler's workers one
+    each, and their round-trips overlap on the loop up to the client's concurrency.
+    """
+
+    def __init__(self, api_key: str, **client_kwargs):
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="zenrows-loop", daemon=True).start()
+        self.client = self._call(self._create_client(api_key, client_kwargs))
+
+    async def _create_client(self, api_key: str, client_kwargs: dict) -> AsyncZenRowsClient:
+        # Created on the loop thread so the semaphore belongs to that loop
+        return AsyncZenRowsClient(api_key, **client_kwargs)
+
+    def _call(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        # A cancelled fetch stops waiting on ZenRows and frees its concurrency slot
+        token = current_cancel_token()
+        if token is not None:
+            token.on_cancel(future.cancel)
+        try:
+            return future.result()
+        finally:
+            if token is not None:
+                token.remove_callback(future.cancel)
+
+    def fetch(self, url: str, js_render: bool = True, premium_proxy: bool = True) -> str:
+        return self._call(self.client.fetch(url, js_render, premium_proxy))
+
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+
+def get_zenrows_runner(api_key: str = None) -> ZenRowsRunner:
+    """
+    Return the process-wide ZenRows runner for an API key (defaults to ZENROWS_API_KEY).
+    """
+    api_key = api_key or os.getenv("ZENROWS_API_KEY")
+    with _runners_lock:
+        if api_key not in _runners:
+            _runners[api_key] = ZenRowsRunner(api_key)
+        return _runners[api_key]
@@ -1,4 +1,6 @@
 import json
+import uuid
+import asyncio
 import requests
 import traceback
 
@@ -8,26 +10,33 @@ from typing import List
 
 from quotaion_module.email_scrapper.config import (
     SERPER_API_KEY,
-    LLM_API_KEY,
     SERPER_URL,
     SERPER_LOCATION,
     SERPER_GL,
     ALLOWED_DOMAINS,
-    CHUNK_SIZE,
-    CHUNK_OVERLAP,
+    LLM_CONTEXT_TOKENS,
+    LLM_RESPONSE_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    RETRIEVAL_QUERY,
+    RETRIEVAL_MAX_K,
 )
-from quotaion_module.email_scrapper.model import initialize_llm, extract_email_data
-from quotaion_module.email_scrapper.util import clean_text,process_url
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.retrievers import BM25Retriever
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from quotaion_module.email_scrapper.model import extract_email_data, build_prompt
+from quotaion_module.email_scrapper.util import clean_text,process_url,is_page_cached
+from quotaion_module.scrapper_common.page_cache import get_page_cache
+from quotaion_module.scrapper_common.chunker import chunk_markdown, chunk_token_budget, count_tokens
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from quotaion_module.scrapper_common.budget import RequestBudget
+from quotaion_module.scrapper_common.config import REQUEST_BUDGET_SECONDS, DEDUP_ENABLED
+from quotaion_module.scrapper_common.scheduler import get_fetch_scheduler, as_completed_async
+from quotaion_module.scrapper_common.dedup import dedupe_documents, dedupe_chunks
+from quotaion_module.scrapper_common.chunk_index import get_chunk_index
 
 router = APIRouter()
 class SearchRequest(BaseModel):
     query: str
+    budget_seconds: float = REQUEST_BUDGET_SECONDS  # End-to-end latency budget for this request
 
-def fetch_search_results(query: str) -> dict:
+def fetch_search_results(query: str, timeout: float = None) -> dict:
     """
     Uses the Serper API to fetch search results for the given query.
     """
@@ -40,7 +49,7 @@ def fetch_search_results(query: str) -> dict:
         "X-API-KEY": SERPER_API_KEY,
         "Content-Type": "application/json"
     }
-    response = requests.post(SERPER_URL, headers=headers, json=payload)
+    response = requests.post(SERPER_URL, headers=headers, json=payload, timeout=timeout)
     if response.status_code == 200:
         return response.json()
     else:
@@ -62,12 +71,29 @@ def filter_links(search_data: dict) -> List[str]:
     return unique_links
 
 
+@router.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Reports page cache hit/miss statistics for this scraper.
+    """
+    return get_page_cache("email").stats()
+
+
+@router.get("/index/stats")
+async def index_stats_endpoint():
+    """
+    Reports the size and reuse of this scraper's chunk index.
+    """
+    return get_chunk_index("email").stats()
+
+
 @router.post("/search")
 async def search_endpoint(request: SearchRequest):
     query = request.query
+    budget = RequestBudget(request.budget_seconds)
     try:
-        # Fetch search results from the Serper API
-        search_data = fetch_search_results(query)
+        # Fetch search results from the Serper API (in a thread: requests blocks the event loop)
+        search_data = await asyncio.to_thread(fetch_search_results, query, timeout=budget.remaining("search"))
         links = filter_links(search_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -75,19 +101,29 @@ async def search_endpoint(request: SearchRequest):
     if not links:
         raise HTTPException(status_code=404, detail="No matching links found for the query.")
 
+    # Pages whose chunks are already indexed and fresh are not fetched again
+    chunk_index = get_chunk_index("email")
+    indexed_links = [url for url in links if chunk_index.has_fresh(url)]
+    fetch_links = [url for url in links if url not in indexed_links]
+    if indexed_links:
+        print(f"Reusing indexed chunks of {len(indexed_links)} pages: {indexed_links}")
+
     # Process each link to extract cleaned text from the document
     documents = []
     errors = []
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(process_url, url, "notzenrows"): url
-            for url in links
-        }
-        
-        # Process results as they complete
-        for future in as_completed(futures):
+    # Fetch through the shared scheduler, which caps concurrency across requests and per domain
+    scheduler = get_fetch_scheduler()
+    request_id = str(uuid.uuid4())
+    futures = {
+        scheduler.submit(request_id, url, process_url, url, "auto", polite=not is_page_cached(url)): url
+        for url in fetch_links
+    }
+    
+    # Process results as they complete, giving up on stragglers once the fetch budget is spent
+    dropped_for_time = []
+    try:
+        async for future in as_completed_async(futures, timeout=budget.remaining("fetch")):
             url = futures[future]
             try:
                 result = future.result()
@@ -97,29 +133,22 @@ async def search_endpoint(request: SearchRequest):
                     documents.append(result)
             except Exception as e:
                 errors.append((url, str(e)))
+    except FuturesTimeoutError:
+        dropped_for_time = [url for future, url in futures.items() if not future.done()]
+        await asyncio.to_thread(scheduler.cancel_request, request_id)
+        print(f"Fetch budget spent, dropped {len(dropped_for_time)} slow pages: {dropped_for_time}")
 
     # Print errors after processing
     for url, error in errors:
         print(f"Error processing {url}: {error}")
     
-    if not documents:
+    if not documents and not indexed_links:
         raise HTTPException(status_code=404, detail="No documents could be processed.")
 
-    # Split documents into smaller chunks
-    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-    chunked_docs = []
-    for doc in documents:
-        chunks = splitter.split_text(doc.page_content)
-        for chunk in chunks:
-            chunked_docs.append({"page_content": chunk, "metadata": doc.metadata})
-    print(f"Total chunks created: {len(chunked_docs)}")
-    # Initialize BM25 Retriever on the document chunks
-    bm25_retriever = BM25Retriever.from_documents(
-        [Document(page_content=chunk["page_content"], metadata=chunk["metadata"]) for chunk in chunked_docs]
-    )
-    bm25_retriever.k = 40  # Retrieve top 10 relevant chunks
-    retrieved_chunks = bm25_retriever.get_relevant_documents("mail")
-    
+    # Collapse near-duplicate pages (URL variants, syndicated listings), merging their sources
+    if DEDUP_ENABLED:
+        documents = dedupe_documents(documents)
+
     # Define the detailed query prompt for extraction
     query_prompt = '''
     Extract all valid email addresses from the provided document. Do not guess or fabricate any details; only include information that is complete, unambiguous, and reliable. Provide the results in **JSON format** with the following specifications:
@@ -150,23 +179,38 @@ async def search_endpoint(request: SearchRequest):
       []
     '''
 
+    # Split documents into chunks that fill the model's context next to the prompt,
+    # keeping markdown blocks (product cards, list items, table rows) whole
+    chunked_docs = []
+    for doc in documents:
+        prompt_tokens = count_tokens(build_prompt(query_prompt, "", doc.metadata))
+        max_tokens = chunk_token_budget(LLM_CONTEXT_TOKENS, prompt_tokens, LLM_RESPONSE_TOKENS)
+        for chunk in chunk_markdown(doc.page_content, max_tokens, CHUNK_OVERLAP_TOKENS):
+            chunked_docs.append({"page_content": chunk, "metadata": doc.metadata})
+    if DEDUP_ENABLED:
+        chunked_docs = dedupe_chunks(chunked_docs)
+    print(f"Total chunks created: {len(chunked_docs)}")
+    # Add the new chunks to the shared index and retrieve from this request's pages only
+    chunk_index.add_chunks(chunked_docs)
+    sources = indexed_links + [
+        source for doc in documents for source in doc.metadata.get("sources") or [doc.metadata["source"]]
+    ]
+    bm25_retriever = chunk_index.retriever(sources)
+    bm25_retriever.k = RETRIEVAL_MAX_K
+    # Chunks go to a regex rather than the LLM, so every ranked chunk is scanned
+    retrieved_chunks = bm25_retriever.get_relevant_documents(RETRIEVAL_QUERY)
 
 
-    # Initialize the LLM (ChatGroq in this case)
-    llm = initialize_llm(api_key=LLM_API_KEY)
     final_responses = []
     print(len(retrieved_chunks))
-    print(f"Chunk size is {CHUNK_SIZE}")
     # Process each retrieved chunk using the LLM
     for i, chunk in enumerate(retrieved_chunks):
+        if budget.expired("llm"):
+            print(f"Time budget spent, skipping the last {len(retrieved_chunks) - i} chunks")
+            break
         context = chunk.page_content
         metadata = chunk.metadata
-        prompt_with_context = f"""
-Query: {query_prompt}
-Context: {context}
-Metadata: {metadata}
-Provide the most accurate and concise response based on the context and query:
-"""
+        prompt_with_context = build_prompt(query_prompt, context, metadata)
         try:
             #response = llm.invoke(prompt_with_context)
             #final_responses.append({"response": response.content, "metadata": metadata})
@@ -178,4 +222,4 @@ Provide the most accurate and concise response based on the context and query:
     # Extract product data from the LLM responses
     final_output = extract_email_data(final_responses)
     
-    return {"results": final_output}
\ No newline at end of file
+    return {"results": final_output, "dropped_for_time": dropped_for_time}
\ No newline at end of file
@@ -1,4 +1,6 @@
 import json
+import uuid
+import asyncio
 import requests
 import traceback
 
@@ -8,26 +10,40 @@ from typing import List
 
 from quotaion_module.price_scrapper.config import (
     SERPER_API_KEY,
-    LLM_API_KEY,
     SERPER_URL,
     SERPER_LOCATION,
     SERPER_GL,
     ALLOWED_DOMAINS,
-    CHUNK_SIZE,
-    CHUNK_OVERLAP,
+    LLM_CONTEXT_TOKENS,
+    LLM_RESPONSE_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    RETRIEVAL_DEPTH,
+    RETRIEVAL_MAX_K,
+    LLM_BACKEND,
+    LLM_OUTPUT_MODE,
 )
-from quotaion_module.price_scrapper.model import initialize_llm, extract_product_data,initialize_llm_ollam
-from quotaion_module.price_scrapper.util import clean_text,process_url
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.retrievers import BM25Retriever
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from quotaion_module.price_scrapper.model import extract_product_data,take_structured_products, build_messages, count_message_tokens, build_llm_requests, retrieve_price_chunks, PROMPT_VERSION
+from quotaion_module.price_scrapper.util import clean_text,process_url,is_page_cached,site_plugin_stats
+from quotaion_module.scrapper_common.page_cache import get_page_cache
+from quotaion_module.scrapper_common.chunker import chunk_markdown, chunk_token_budget
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from quotaion_module.scrapper_common.budget import RequestBudget
+from quotaion_module.scrapper_common.config import REQUEST_BUDGET_SECONDS, DEDUP_ENABLED
+from quotaion_module.scrapper_common.scheduler import get_fetch_scheduler, as_completed_async
+from quotaion_module.scrapper_common.dedup import dedupe_documents, dedupe_chunks
+from quotaion_module.scrapper_common.chunk_index import get_chunk_index
+from quotaion_module.scrapper_common.retrieval_depth import choose_depth, get_latency_tracker
+from quotaion_module.scrapper_common.llm_stage import run_llm_stage, summarize_llm_results
+from quotaion_module.scrapper_common.llm_cache import get_llm_cache
+from quotaion_module.scrapper_common.llm_backends import get_llm_backend, backend_stats
 
 router = APIRouter()
 class SearchRequest(BaseModel):
     query: str
+    budget_seconds: float = REQUEST_BUDGET_SECONDS  # End-to-end latency budget for this request
+    debug: bool = False  # Include per-chunk retrieval scores in the response
 
-def fetch_search_results(query: str) -> dict:
+def fetch_search_results(query: str, timeout: float = None) -> dict:
     """
     Uses the Serper API to fetch search results for the given query.
     """
@@ -40,7 +56,7 @@ def fetch_search_results(query: str) -> dict:
         "X-API-KEY": SERPER_API_KEY,
         "Content-Type": "application/json"
     }
-    response = requests.post(SERPER_URL, headers=headers, json=payload)
+    response = requests.post(SERPER_URL, headers=headers, json=payload, timeout=timeout)
     if response.status_code == 200:
         return response.json()
     else:
@@ -64,12 +80,53 @@ def filter_links(search_data: dict) -> List[str]:
 
 
 
+@router.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Reports page cache hit/miss statistics for this scraper.
+    """
+    return get_page_cache("price").stats()
+
+
+@router.get("/index/stats")
+async def index_stats_endpoint():
+    """
+    Reports the size and reuse of this scraper's chunk index.
+    """
+    return get_chunk_index("price").stats()
+
+
+@router.get("/llm_cache/stats")
+async def llm_cache_stats_endpoint():
+    """
+    Reports the size and hit rate of this scraper's LLM answer cache.
+    """
+    return get_llm_cache("price").stats()
+
+
+@router.get("/llm/backends")
+async def llm_backends_endpoint():
+    """
+    Lists the LLM backends in use, with their models, concurrency limits and timeouts.
+    """
+    return backend_stats()
+
+
+@router.get("/plugins/stats")
+async def plugin_stats_endpoint():
+    """
+    Reports per-site extractor plugin hit rates and recent failures.
+    """
+    return site_plugin_stats()
+
+
 @router.post("/search")
 async def search_endpoint(request: SearchRequest):
     query = request.query
+    budget = RequestBudget(request.budget_seconds)
     try:
-        # Fetch search results from the Serper API
-        search_data = fetch_search_results(query)
+        # Fetch search results from the Serper API (in a thread: requests blocks the event loop)
+        search_data = await asyncio.to_thread(fetch_search_results, query, timeout=budget.remaining("search"))
         links = filter_links(search_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -77,19 +134,29 @@ async def search_endpoint(request: SearchRequest):
     if not links:
         raise HTTPException(status_code=404, detail="No matching links found for the query.")
 
+    # Pages whose chunks are already indexed and fresh are not fetched again
+    chunk_index = get_chunk_index("price")
+    indexed_links = [url for url in links if chunk_index.has_fresh(url)]
+    fetch_links = [url for url in links if url not in indexed_links]
+    if indexed_links:
+        print(f"Reusing indexed chunks of {len(indexed_links)} pages: {indexed_links}")
+
     # Process each link to extract cleaned text from the document
     documents = []
     errors = []
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(process_url, url, "notzenrows"): url
-            for url in links
-        }
-        
-        # Process results as they complete
-        for future in as_completed(futures):
+    # Fetch through the shared scheduler, which caps concurrency across requests and per domain
+    scheduler = get_fetch_scheduler()
+    request_id = str(uuid.uuid4())
+    futures = {
+        scheduler.submit(request_id, url, process_url, url, "auto", polite=not is_page_cached(url)): url
+        for url in fetch_links
+    }
+    
+    # Process results as they complete, giving up on stragglers once the fetch budget is spent
+    dropped_for_time = []
+    try:
+        async for future in as_completed_async(futures, timeout=budget.remaining("fetch")):
             url = futures[future]
             try:
                 result = future.result()
@@ -99,107 +166,78 @@ async def search_endpoint(request: SearchRequest):
                     documents.append(result)
             except Exception as e:
                 errors.append((url, str(e)))
+    except FuturesTimeoutError:
+        dropped_for_time = [url for future, url in futures.items() if not future.done()]
+        await asyncio.to_thread(scheduler.cancel_request, request_id)
+        print(f"Fetch budget spent, dropped {len(dropped_for_time)} slow pages: {dropped_for_time}")
 
     # Print errors after processing
     for url, error in errors:
         print(f"Error processing {url}: {error}")
 
-    # Split documents into smaller chunks
-    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    # Pages with complete schema.org product data need no LLM; only the rest are chunked
+    structured_products, documents = take_structured_products(documents)
+
+    # Collapse near-duplicate pages (URL variants, syndicated listings), merging their sources
+    if DEDUP_ENABLED:
+        documents = dedupe_documents(documents)
+
+    # The query part of the prompt; the extraction instructions are a fixed system message
+    query_prompt = f"Extract details of {query} from the provided documents."
+
+    # Split documents into chunks that fill the model's context next to the prompt,
+    # keeping markdown blocks (product cards, list items, table rows) whole
     chunked_docs = []
     for doc in documents:
-        chunks = splitter.split_text(doc.page_content)
-        for chunk in chunks:
+        prompt_tokens = count_message_tokens(build_messages(query_prompt, [("", doc.metadata)]))
+        max_tokens = chunk_token_budget(LLM_CONTEXT_TOKENS, prompt_tokens, LLM_RESPONSE_TOKENS)
+        for chunk in chunk_markdown(doc.page_content, max_tokens, CHUNK_OVERLAP_TOKENS):
             chunked_docs.append({"page_content": chunk, "metadata": doc.metadata})
+    if DEDUP_ENABLED:
+        chunked_docs = dedupe_chunks(chunked_docs)
     
-    # Initialize BM25 Retriever on the document chunks
-    bm25_retriever = BM25Retriever.from_documents(
-        [Document(page_content=chunk["page_content"], metadata=chunk["metadata"]) for chunk in chunked_docs]
-    )
-    bm25_retriever.k = 50  # Retrieve top 10 relevant chunks
-    retrieved_chunks = bm25_retriever.get_relevant_documents(query)
-    
-    # Define the detailed query prompt for extraction
-    query_prompt = f'''
-    Extract details of {query} from the provided document. If any information is incomplete, ambiguous, or missing, do not guess or fabricate details. Only include information that you are confident is accurate and complete. Provide the results in **JSON format** with the following specifications:
-
-    ### Fields:
-    1. **"product_name"**: The full and properly formatted name of the product, including brand and relevant specifications. Avoid truncation or abbreviation. Exclude any entries where the product name is incomplete or unclear.
-    2. **"price"**: The exact total price of the product should be represented as a decimal number, reflecting the complete, one-time cost. **Do not include any monthly installment, financing, or partial payment amounts.** Ensure the number is preserved as it is without currency symbols, commas, or any other formatting characters.
-    3. **"currency"**: The currency in which the price is denominated, extracted from the document.
-    4. **"vat_status"**: A string indicating whether the price is after vat or before vat. Only include this field if the document explicitly provides this information.
-    5. **"payment_type"**: A string that indicates whether the payment is a "one time payment" or an "installment", based on explicit information in the document. If the payment type is not explicitly provided, do not include this field.
-    6. **"vendor_name"**: The name of the vendor selling the product, exactly as provided in the document. Exclude this field if the vendor name is incomplete or not explicitly stated.
-    7. **"features_of_product"**: Details on the features of the product as provided in the document. Include this field only if the information is complete and reliable.
-    8. **"source"**: The URL of the document from which the product details were extracted.
-    9. **"customer_rating"**: The customer rating for the product as provided in the document. Include this field only if the information is explicitly stated and complete.
-
-
-    ### Output Style:
-    [
-        {{
-            "product_name": "Full product name with accurate details",
-            "price": price,
-            "currency": "Currency code (e.g., USD, SAR)",
-            "vat_status": "after vat / before vat",
-            "payment_type": "one time payment / installment",
-            "vendor_name": "Vendor name as per document",
-            "features_of_product": "Product features details, if provided",
-            "source": "URL of the document",
-            "customer_rating": "Customer rating details if available"
-        }},
-        {{
-            "product_name": "Another valid product name",
-            "price": price,
-            "currency": "Currency code (e.g., USD, SAR)",
-            "vat_status": "after vat / before vat",
-            "payment_type": "one time payment / installment",
-            "vendor_name": "Vendor name as per document",
-            "features_of_product": "Product features details, if provided",
-            "source": "URL of the document",
-            "customer_rating": "Customer rating details if available"
-        }}
+    # Add the new chunks to the shared index and retrieve from this request's pages only
+    chunk_index.add_chunks(chunked_docs)
+    sources = indexed_links + [
+        source for doc in documents for source in doc.metadata.get("sources") or [doc.metadata["source"]]
     ]
+    bm25_retriever = chunk_index.retriever(sources)
+    bm25_retriever.k = RETRIEVAL_MAX_K
+    ranked_chunks, retrieval_scores = retrieve_price_chunks(bm25_retriever, query)
+    # Send only as many chunks as the scores (or the time left) justify; calls run
+    # LLM_CONCURRENCY at a time, so each chunk costs a fraction of a call
+    llm_backend = get_llm_backend("price", LLM_BACKEND)
+    llm_latency = get_latency_tracker(f"price-{llm_backend.name}")
+    retrieved_chunks, retrieval_depth = choose_depth(
+        ranked_chunks, bm25_retriever.k, RETRIEVAL_DEPTH,
+        time_left=budget.remaining("llm"), seconds_per_chunk=llm_latency.estimate() / llm_backend.concurrency
+    )
+
+    # Short chunks share a call; every call starts with the same system instructions
+    prompts = build_llm_requests(query_prompt, retrieved_chunks, LLM_CONTEXT_TOKENS, LLM_RESPONSE_TOKENS)
+    for i, (messages, metadata) in enumerate(prompts):
+        if count_message_tokens(messages) > LLM_CONTEXT_TOKENS - LLM_RESPONSE_TOKENS:
+            print(f"LLM call {i+1} from {metadata['source']} may not fit the model context")
+
+    # Process the calls concurrently; results come back in retrieval order
+    llm_cache = get_llm_cache("price")
+    cache_keys = llm_cache.keys_for(
+        llm_backend.client, PROMPT_VERSION, query, [metadata["documents"] for _, metadata in prompts],
+        output_mode=LLM_OUTPUT_MODE
+    )
+    llm_results = await run_llm_stage(
+        llm_backend, prompts, deadline=budget.deadline("llm"), latency=llm_latency,
+        cache=llm_cache, cache_keys=cache_keys
+    )
+    final_responses, llm_errors = summarize_llm_results(llm_results)
 
-    ### Important Notes:
-    1. Extract data strictly based on the provided document chunks. Do not infer or create information beyond what is present.
-    2. Include entries only when all fields are complete and reliable.
-    3. Properly format product names with capitalization and full details.
-    4. For the "price" field, ensure that only the full product price is provided, excluding any installment or financing details.
-    5. For the "currency" field, use the currency explicitly mentioned in the document.
-    6. For the "vat_status" field, extract the information indicating if the price is before vat or after vat as stated in the document. If not explicitly stated, do not include this field.
-    7. For the "payment_type" field, determine if the payment method is one time payment or installment as explicitly mentioned in the document. If not explicitly mentioned, do not include this field.
-    8. For the "vendor_name" field, include the vendor name exactly as it appears in the document if it is complete and reliable.
-    9. For the "product_quality_review" field, include product review or quality information only if it is explicitly provided and complete.
-    10. For the "source" field, use the URL provided in the document metadata.
-    11. If no valid information is available, output an empty JSON array.
-    '''
-
-
-
-    # Initialize the LLM (ChatGroq in this case)
-    #llm = initialize_llm(api_key=LLM_API_KEY)
-    llm=initialize_llm_ollam()
-    final_responses = []
-    
-    # Process each retrieved chunk using the LLM
-    for i, chunk in enumerate(retrieved_chunks):
-        context = chunk.page_content
-        metadata = chunk.metadata
-        prompt_with_context = f"""
-Query: {query_prompt}
-Context: {context}
-Metadata: {metadata}
-Provide the most accurate and concise response based on the context and query:
-"""
-        try:
-            response = llm.invoke(prompt_with_context, options={"num_ctx": 20000})
-            final_responses.append({"response": response.content, "metadata": metadata})
-            print(f"processing chunk {i+1}")
-        except Exception as e:
-            print(f"Error processing chunk {i+1}: {e}")
-    
     # Extract product data from the LLM responses
-    final_output = extract_product_data(final_responses)
+    final_output = extract_product_data(final_responses, structured_products)
     
-    return {"results": final_output}
+    response = {"results": final_output, "dropped_for_time": dropped_for_time}
+    if request.debug:
+        response["retrieval_scores"] = retrieval_scores
+        response["retrieval_depth"] = retrieval_depth
+        response["llm_errors"] = llm_errors
+        response["llm_cache_hits"] = sum(1 for result in llm_results if result["cached"])
+    return response
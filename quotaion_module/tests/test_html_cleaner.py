@@ -0,0 +1,29 @@
+from quotaion_module.price_scrapper.config import CLEAN_RULES
+from quotaion_module.email_scrapper.config import CLEAN_RULES as EMAIL_CLEAN_RULES
+from quotaion_module.scrapper_common.html_cleaner import clean_html_fast
+
+PRODUCT_PAGE = """
+<html><body>
+<h1>Sony PlayStation 5 Console (Disc Edition)</h1>
+<p>Ring Video Doorbell Pro 2 with Audio, Review the full specs below</p>
+<span>SAR 1,999</span>
+<button>Play Video</button>
+<button>Mute</button>
+<div>Submit Review</div>
+</body></html>
+"""
+
+
+def test_product_titles_survive_cleaning():
+    for rules in (CLEAN_RULES, EMAIL_CLEAN_RULES):
+        cleaned = clean_html_fast(PRODUCT_PAGE, rules)
+        assert "Sony PlayStation 5 Console (Disc Edition)" in cleaned
+        assert "Ring Video Doorbell Pro 2 with Audio" in cleaned
+        assert "SAR 1,999" in cleaned
+
+
+def test_ui_labels_are_removed():
+    cleaned = clean_html_fast(PRODUCT_PAGE, CLEAN_RULES)
+    assert "Play Video" not in cleaned
+    assert "Mute" not in cleaned
+    assert "Submit Review" not in cleaned
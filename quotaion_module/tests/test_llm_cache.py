@@ -0,0 +1,68 @@
+import asyncio
+from langchain.schema import Document
+from langchain_ollama import ChatOllama
+from quotaion_module.price_scrapper.model import build_llm_requests
+from quotaion_module.scrapper_common.llm_backends import LLMBackend, FakeChatModel
+from quotaion_module.scrapper_common.llm_cache import LLMCache
+from quotaion_module.scrapper_common.llm_stage import run_llm_stage
+
+CHUNKS = [("Sony Bravia 55 inch, SAR 2,499", {"source": "https://example.com/p"})]
+CALLS = [CHUNKS]
+
+
+def test_keys_change_with_decoding_options(tmp_path):
+    cache = LLMCache("price", str(tmp_path))
+    plain = ChatOllama(model="qwen2.5:14b", num_ctx=20000)
+    schema = ChatOllama(model="qwen2.5:14b", num_ctx=20000, format={"type": "object"})
+    smaller = ChatOllama(model="qwen2.5:14b", num_ctx=8000)
+    keys = {
+        cache.keys_for(llm, "3", "sony bravia", CALLS)[0] for llm in (plain, schema, smaller)
+    }
+    keys.add(cache.keys_for(plain, "3", "sony bravia", CALLS, output_mode="schema")[0])
+    assert len(keys) == 4
+
+
+def request_keys(cache, llm, query: str, pages: list) -> list:
+    chunks = [Document(page_content=content, metadata={"source": source}) for source, content in pages]
+    requests = build_llm_requests(f"Extract details of {query} from the provided documents.", chunks, 20000, 2000)
+    return cache.keys_for(llm, "3", query, [metadata["documents"] for _, metadata in requests])
+
+
+def test_repeated_chunks_hit_across_requests(tmp_path):
+    cache = LLMCache("price", str(tmp_path))
+    llm = ChatOllama(model="qwen2.5:14b", num_ctx=20000)
+    pages = [("https://example.com/p", "Sony Bravia 55 inch, SAR 2,499"),
+             ("https://example.com/q", "Sony Bravia 65 inch, SAR 3,999")]
+    for key in request_keys(cache, llm, "Sony Bravia", pages):
+        cache.put(key, '{"products": []}')
+    # The rendered prompt quotes the query as typed; the key only sees it normalized
+    for key in request_keys(cache, llm, "sony  BRAVIA", pages):
+        assert cache.get(key) is not None
+    # A chunk sent on its own is keyed by that chunk alone, whatever the request
+    single = request_keys(cache, llm, "Sony Bravia", pages[1:])
+    cache.put(single[0], '{"products": []}')
+    assert cache.get(request_keys(cache, llm, "SONY bravia", pages[1:])[0]) is not None
+    assert cache.stats()["hits"] == 2
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = LLMCache("price", str(tmp_path), max_entries=2)
+    cache.put("a", "answer a")
+    cache.put("b", "answer b")
+    assert cache.get("a") == "answer a"
+    # The hit on "a" is only batched, but eviction on the next store must still see it
+    cache.put("c", "answer c")
+    assert cache.get("a") == "answer a"
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_fake_backend_answers_are_not_cached(tmp_path):
+    cache = LLMCache("price", str(tmp_path))
+    backend = LLMBackend("fake", "fake", FakeChatModel(['{"products": []}'], latency=0.0))
+    prompts = [(content, metadata) for content, metadata in CHUNKS]
+    keys = cache.keys_for(backend.client, "3", "sony bravia", CALLS)
+    for _ in range(2):
+        results = asyncio.run(run_llm_stage(backend, prompts, cache=cache, cache_keys=keys))
+        assert not results[0]["cached"]
+    assert cache.stats()["stores"] == 0
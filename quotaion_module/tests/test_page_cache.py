@@ -0,0 +1,46 @@
+import os
+from quotaion_module.scrapper_common.page_cache import PageCache
+
+GOOD_PAGE = "<html><body>Price: SAR 1,999</body></html>"
+BOT_CHECK = "<html><body>Checking your browser</body></html>"
+
+
+def make_fetch(html_content, calls):
+    def fetch(url):
+        calls.append(url)
+        return html_content, "http", {}
+    return fetch
+
+
+def is_sufficient(html_content):
+    return "Price" in html_content
+
+
+def test_insufficient_pages_are_not_cached(tmp_path):
+    cache = PageCache("price", str(tmp_path))
+    calls = []
+    for _ in range(2):
+        cache.get_or_fetch("https://example.com/p", make_fetch(BOT_CHECK, calls), str.upper, is_sufficient)
+    assert len(calls) == 2
+    assert not cache.has_fresh("https://example.com/p")
+    assert cache.stats()["skipped"] == 2
+
+    calls = []
+    for _ in range(2):
+        cache.get_or_fetch("https://example.com/q", make_fetch(GOOD_PAGE, calls), str.upper, is_sufficient)
+    assert len(calls) == 1
+    assert cache.has_fresh("https://example.com/q")
+
+
+def test_oldest_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = PageCache("price", str(tmp_path), max_bytes=10_000)
+    urls = [f"https://example.com/p{i}" for i in range(20)]
+    for i, url in enumerate(urls):
+        # Incompressible enough that each entry is a few hundred bytes on disk
+        page = GOOD_PAGE + os.urandom(300).hex()
+        cache.put(url, page, page, "http")
+        os.utime(cache._path(url), (1000 + i, 1000 + i))
+    assert cache._disk_usage() <= 10_000
+    assert cache.stats()["evictions"] > 0
+    assert not os.path.exists(cache._path(urls[0]))
+    assert os.path.exists(cache._path(urls[-1]))
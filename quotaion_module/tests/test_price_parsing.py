@@ -0,0 +1,32 @@
+import json
+from quotaion_module.price_scrapper.model import _parse_free_text
+
+METADATA = {"source": "https://example.com/p", "sources": ["https://example.com/p"]}
+PRODUCT = {"product_name": "Sony Bravia 55 [2024 model]", "price": "2,499", "currency": "SAR",
+           "source": "https://example.com/p"}
+
+
+def parse(text: str) -> tuple:
+    final_data, invalid_data = [], []
+    stats = {"salvage_attempts": 0}
+    _parse_free_text({"response": text, "metadata": METADATA}, final_data, invalid_data, stats)
+    return final_data, invalid_data, stats["salvage_attempts"]
+
+
+def test_brackets_inside_fields_do_not_split_products():
+    final_data, invalid_data, salvaged = parse(f"Here you go [see below]:\n{json.dumps([PRODUCT, PRODUCT])}")
+    assert [product["product_name"] for product in final_data] == ["Sony Bravia 55 [2024 model]"] * 2
+    assert final_data[0]["price"] == 2499
+    assert invalid_data == [] and salvaged == 0
+
+
+def test_products_object_is_read_whole():
+    final_data, _, _ = parse(json.dumps({"products": [PRODUCT]}))
+    assert len(final_data) == 1
+
+
+def test_answer_cut_short_keeps_complete_products_apart():
+    text = json.dumps({"products": [PRODUCT, PRODUCT]})[:-30]
+    final_data, invalid_data, salvaged = parse(text)
+    assert final_data == []
+    assert len(invalid_data) == 1 and salvaged == 1
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import pytest
+from quotaion_module.scrapper_common.scheduler import FetchScheduler, as_completed_async
+
+
+def test_as_completed_async_keeps_the_event_loop_free():
+    scheduler = FetchScheduler(max_concurrency=4, domain_concurrency=4, domain_interval=0)
+    delays = {"https://a.example/fast": 0.05, "https://b.example/slow": 2.0}
+    futures = {
+        scheduler.submit("request", url, time.sleep, delay, polite=False): url
+        for url, delay in delays.items()
+    }
+
+    async def collect():
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.time())
+                await asyncio.sleep(0.01)
+
+        beating = asyncio.create_task(heartbeat())
+        finished = []
+        try:
+            with pytest.raises(FuturesTimeoutError):
+                async for future in as_completed_async(futures, timeout=0.3):
+                    finished.append(futures[future])
+        finally:
+            beating.cancel()
+        return finished, ticks
+
+    finished, ticks = asyncio.run(collect())
+    assert finished == ["https://a.example/fast"]
+    # The loop kept running other tasks while the fetches were pending
+    assert len(ticks) > 10
+    scheduler.cancel_request("request")
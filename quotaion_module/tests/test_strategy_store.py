@@ -0,0 +1,17 @@
+import json
+from quotaion_module.scrapper_common.strategy_store import StrategyStore
+
+
+def test_attempts_are_written_in_batches(tmp_path):
+    store = StrategyStore("price", str(tmp_path), flush_every=3, flush_seconds=3600)
+    path = tmp_path / "price.json"
+    store.record("example.com", "http", True, 0.2)
+    store.record("example.com", "http", False, 0.3)
+    assert not path.exists()
+    store.record("example.com", "selenium", True, 4.0)
+    assert json.loads(path.read_text())["example.com"]["http"]["attempts"] == 2
+
+    store.record("example.com", "http", True, 0.2)
+    store.flush()
+    assert json.loads(path.read_text())["example.com"]["http"]["attempts"] == 3
+    assert StrategyStore("price", str(tmp_path)).stats() == store.stats()
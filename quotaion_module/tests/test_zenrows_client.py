@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+from quotaion_module.scrapper_common.zenrows_client import ZenRowsRunner, ZenRowsError
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    A local stand-in for the ZenRows API: /flaky fails once with 503, /missing
+    answers 404, /slow takes a while, anything else echoes the target URL back as a page.
+    """
+    requests_seen = []
+    in_flight = 0
+    most_in_flight = 0
+    counter_lock = threading.Lock()
+
+    def do_GET(self):
+        params = {name: values[0] for name, values in parse_qs(urlsplit(self.path).query).items()}
+        StandIn.requests_seen.append(params)
+        target = params.get("url", "")
+        if "/slow" in target:
+            with StandIn.counter_lock:
+                StandIn.in_flight += 1
+                StandIn.most_in_flight = max(StandIn.most_in_flight, StandIn.in_flight)
+            time.sleep(0.2)
+            with StandIn.counter_lock:
+                StandIn.in_flight -= 1
+            self._answer(200, f"<html><body>{target}</body></html>")
+        elif target.endswith("/missing"):
+            self._answer(404, "not found")
+        elif target.endswith("/flaky") and sum(seen.get("url") == target for seen in StandIn.requests_seen) == 1:
+            self._answer(503, "busy")
+        else:
+            self._answer(200, f"<html><body>{target}</body></html>")
+
+    def _answer(self, status: int, body: str):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def runner():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield ZenRowsRunner("test-key", base_url=f"http://127.0.0.1:{server.server_port}/v1/", max_retries=1,
+                        concurrency=3)
+    server.shutdown()
+
+
+def test_fetch_sends_zenrows_params(runner):
+    html_content = runner.fetch("https://example.com/p", js_render=True, premium_proxy=False)
+    assert "https://example.com/p" in html_content
+    params = StandIn.requests_seen[-1]
+    assert params["apikey"] == "test-key"
+    assert params["js_render"] == "true"
+    assert "premium_proxy" not in params
+
+
+def test_fetch_retries_retryable_statuses(runner):
+    assert "https://example.com/flaky" in runner.fetch("https://example.com/flaky")
+
+
+def test_fetch_fails_fast_on_other_errors(runner):
+    with pytest.raises(ZenRowsError) as error:
+        runner.fetch("https://example.com/missing")
+    assert error.value.status_code == 404
+    assert sum(seen["url"] == "https://example.com/missing" for seen in StandIn.requests_seen) == 1
+
+
+def test_fetches_from_many_workers_overlap_up_to_the_quota(runner):
+    urls = [f"https://example.com/slow/{i}" for i in range(9)]
+    started = time.time()
+    # Like the scheduler's fetch workers, each thread fetches one URL
+    with ThreadPoolExecutor(max_workers=len(urls)) as workers:
+        pages = list(workers.map(runner.fetch, urls))
+    elapsed = time.time() - started
+    assert all(url in page for url, page in zip(urls, pages))
+    assert StandIn.most_in_flight == 3
+    # Three rounds of 0.2s, not nine
+    assert elapsed < 1.2